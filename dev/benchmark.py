@@ -0,0 +1,315 @@
+"""Reproducible performance benchmarks for the ingest/structure/summarize pipeline.
+
+Books are generated synthetically (seeded) and the summarizer runs against a
+deterministic stub, so the suite needs no network access, model weights or GPU.
+
+Usage:
+    python dev/benchmark.py --output bench_output.json
+    python dev/benchmark.py --baseline bench_baseline.json   # exit 1 on regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+import timeit
+
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+# Enable importing from the src directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ingest import clean_gutenberg_text
+from src.structure import detect_book_structure, split_into_chapters
+from src.chunking import RegexTokenizer, chunk_text
+from src.summarizer import chunk_by_tokens, summarize_long_text
+
+REFERENCE = "machine/reference_workload"
+STRUCTURES = ("letter_number", "multi_tier", "chapter_number", "roman_numeral")
+
+_WORDS = (
+    "the ship sailed north under a grey sky while the crew watched the ice "
+    "and I wrote to my sister of the strange figure we had seen across the "
+    "frozen sea that night my heart was heavy with fear and hope alike"
+).split()
+
+_ROMAN = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X"]
+
+
+def _roman(n: int) -> str:
+    tens, ones = divmod(n, 10)
+    return "X" * tens + (_ROMAN[ones - 1] if ones else "")
+
+
+def _paragraph(rng: random.Random, sentences: int = 5) -> str:
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+        out.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"]))
+    # Wrap like Gutenberg plain text (~70 columns)
+    text, line, lines = " ".join(out), "", []
+    for word in text.split():
+        if len(line) + len(word) + 1 > 70:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    lines.append(line)
+    return "\n".join(lines)
+
+
+def _heading(structure: str, n: int) -> str:
+    if structure == "letter_number":
+        return f"Letter {n}"
+    if structure == "roman_numeral":
+        return f"{_roman(n)}. The {_WORDS[n % len(_WORDS)].title()}"
+    return f"Chapter {n}. The {_WORDS[n % len(_WORDS)].title()}"
+
+
+def make_synthetic_book(
+    structure: str, chapters: int = 30, paragraphs: int = 20, seed: int = 0
+) -> str:
+    """Build a Gutenberg-style book with header, TOC, chapters and license footer."""
+    rng = random.Random(seed)
+    lines = [
+        "The Project Gutenberg eBook of A Synthetic Voyage",
+        "",
+        "This eBook is for the use of anyone anywhere at no cost.",
+        "",
+        "*** START OF THE PROJECT GUTENBERG EBOOK A SYNTHETIC VOYAGE ***",
+        "",
+        "A SYNTHETIC VOYAGE",
+        "",
+        "CONTENTS",
+        "",
+    ]
+    if structure == "multi_tier":
+        per_part = max(1, chapters // 3)
+        toc = [
+            f"PART {_roman(p + 1)}"
+            for p in range((chapters + per_part - 1) // per_part)
+        ]
+    else:
+        toc = [_heading(structure, n) for n in range(1, chapters + 1)]
+    lines.extend(f" {entry}" for entry in toc)
+    lines.extend(["", ""])
+
+    for n in range(1, chapters + 1):
+        if structure == "multi_tier" and (n - 1) % per_part == 0:
+            lines.extend([f"PART {_roman((n - 1) // per_part + 1)}", ""])
+        lines.extend([_heading(structure, n), ""])
+        for _ in range(paragraphs):
+            lines.extend([_paragraph(rng), ""])
+        lines.append("")
+
+    lines.extend(
+        [
+            "*** END OF THE PROJECT GUTENBERG EBOOK A SYNTHETIC VOYAGE ***",
+            "",
+            "Updated editions will replace the previous one--the old editions will be renamed.",
+            "START: FULL LICENSE",
+            "THE FULL PROJECT GUTENBERG LICENSE",
+        ]
+    )
+    lines.extend(_paragraph(rng) for _ in range(40))
+    return "\n".join(lines) + "\n"
+
+
+def stub_summarizer(texts, max_length=200, min_length=0, do_sample=False, batch_size=1):
+    """Deterministic stand-in for the BART pipeline: keeps the first max_length words."""
+    batch = [texts] if isinstance(texts, str) else texts
+    return [{"summary_text": " ".join(t.split()[:max_length])} for t in batch]
+
+
+def reference_workload(text: str = " ".join(_WORDS) * 200) -> int:
+    """Fixed regex/dict/sort work that no code change affects, timed to measure the machine's speed."""
+    counts = {}
+    for match in re.finditer(r"\w+", text):
+        word = match.group()
+        counts[word] = counts.get(word, 0) + 1
+    return len(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def _calibrate(fn, min_sample: float) -> int:
+    """Loops of `fn` needed for one sample to take at least `min_sample` seconds."""
+    started = time.process_time()
+    fn()  # also the warm-up: imports, regex compilation, caches
+    return max(1, math.ceil(min_sample / max(time.process_time() - started, 1e-6)))
+
+
+def _time_cases(cases: dict, repeat: int, min_sample: float = 0.05) -> dict:
+    """
+    Per-call CPU time of every case, looping each sample for at least `min_sample` seconds with GC off.
+
+    The cases are single-threaded and CPU-bound, so process time measures the
+    same work as wall time without counting time spent descheduled. Samples
+    are taken round-robin, one per case per round, so a stretch where the
+    machine runs slow lands on every case once instead of on all of one case's.
+    """
+    samples = {name: [] for name in cases}
+    with contextlib.redirect_stdout(io.StringIO()):
+        loops = {name: _calibrate(fn, min_sample) for name, fn in cases.items()}
+        timers = {
+            name: timeit.Timer(fn, timer=time.process_time)
+            for name, fn in cases.items()
+        }
+        for _ in range(repeat):
+            for name, timer in timers.items():
+                samples[name].append(timer.timeit(loops[name]) / loops[name])
+    return {
+        name: {
+            "min": min(times),
+            "median": statistics.median(times),
+            "loops": loops[name],
+            "repeat": repeat,
+        }
+        for name, times in samples.items()
+    }
+
+
+def run_benchmarks(
+    structures=STRUCTURES,
+    chapters: int = 60,
+    paragraphs: int = 20,
+    repeat: int = 7,
+    seed: int = 0,
+) -> dict:
+    cases, inputs, detected = {}, {}, {}
+    for structure in structures:
+        raw = make_synthetic_book(
+            structure, chapters=chapters, paragraphs=paragraphs, seed=seed
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            clean = clean_gutenberg_text(raw)
+        chapters_found = split_into_chapters(clean)
+        sample = max(
+            (c["content"] for c in chapters_found), key=len, default=clean[:20000]
+        )
+        size_mb = len(raw.encode("utf-8")) / 1e6
+
+        book_cases = {
+            "clean_gutenberg_text": lambda raw=raw: clean_gutenberg_text(raw),
+            "detect_book_structure": lambda clean=clean: detect_book_structure(clean),
+            "split_into_chapters": lambda clean=clean: split_into_chapters(clean),
+            "chunk_text": lambda clean=clean: chunk_text(
+                clean, RegexTokenizer(), max_tokens=400
+            ),
+            "chunk_by_tokens": lambda clean=clean: chunk_by_tokens(
+                clean, max_tokens=1024, overlap=100, tokenizer=RegexTokenizer()
+            ),
+            "summarize_long_text[stub]": lambda sample=sample: summarize_long_text(
+                sample,
+                tokenizer=RegexTokenizer(),
+                summarizer=stub_summarizer,
+                cache=False,
+            ),
+            "summarize_long_text[extractive]": lambda sample=sample: summarize_long_text(
+                sample, summarizer="extractive", cache=False
+            ),
+        }
+        for name, fn in book_cases.items():
+            cases[f"{structure}/{name}"] = fn
+            inputs[f"{structure}/{name}"] = round(
+                size_mb if "summarize" not in name else len(sample) / 1e6, 4
+            )
+        detected[f"{structure}/chapters_detected"] = {"count": len(chapters_found)}
+
+    cases[REFERENCE] = reference_workload
+    results = _time_cases(cases, repeat)
+    for name, timing in results.items():
+        timing["input_mb"] = inputs.get(name)
+    results.update(detected)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return a line per benchmark whose best time regressed beyond `tolerance`.
+
+    Minimums are compared after scaling the baseline by how much slower the
+    machine ran the reference workload this time (its median, as its samples
+    span the whole run), so a shared machine's slow stretches don't read as
+    regressions.
+    """
+    speed = 1.0
+    if baseline.get(REFERENCE) and results.get(REFERENCE):
+        speed = results[REFERENCE]["median"] / baseline[REFERENCE]["median"]
+    regressions = []
+    for name, timing in results.items():
+        base = baseline.get(name)
+        if name == REFERENCE or not base or "min" not in timing or not base.get("min"):
+            continue
+        ratio = timing["min"] / (base["min"] * speed)
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {base['min'] * 1e3:.2f}ms → {timing['min'] * 1e3:.2f}ms ({ratio:.2f}x, machine speed ×{speed:.2f})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--structures", nargs="+", default=list(STRUCTURES), choices=STRUCTURES
+    )
+    parser.add_argument("--chapters", type=int, default=60)
+    parser.add_argument(
+        "--paragraphs", type=int, default=20, help="paragraphs per chapter"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=7, help="samples per benchmark, taken round-robin"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown before failing"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.structures, args.chapters, args.paragraphs, args.repeat, args.seed
+    )
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "chapters": args.chapters,
+            "paragraphs": args.paragraphs,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, timing in results.items():
+        if "min" in timing:
+            print(f"  {name:<50} {timing['min'] * 1e3:9.2f} ms")
+    print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ Performance regressions:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("✅ No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
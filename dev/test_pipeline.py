@@ -7,15 +7,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from src.ingest import load_book
 from src.structure import split_into_chapters, clean_gutenberg_text
 from src.summarizer import summarize_long_text, save_summaries
+from src.cache import SummaryCache, get_default_cache, set_default_cache
 from tqdm import tqdm
-from transformers import pipeline
 
 book = "books/frankenstein.txt"
 book_output = "summaries/frankenstein.md"
 
-# Load summarizer pipeline
-summarizer_pipeline = pipeline("summarization", model="facebook/bart-large-cnn")
-
 # def refine_summary(text):
 #     return text.strip()
 
@@ -181,16 +178,19 @@ summarizer_pipeline = pipeline("summarization", model="facebook/bart-large-cnn")
 # forth the kind of relation in which she stood to me—my more than
 # sister, since till death she was to be mine only.
 #     """
-    
+
 #     summary = summarize_long_text(sample_text)
 #     print("\n✅ Summary of Frankenstein Chapter 1:\n")
 #     print(summary)
-    
+
 # # Run the test
 # test_summarizer_with_sample()
 
 if __name__ == "__main__":
 
+    # Reuse summaries from earlier runs unless SUMMARY_CACHE_DIR points elsewhere
+    if get_default_cache() is None:
+        set_default_cache(SummaryCache(".cache/summaries"))
 
     # Load raw book text
     with open(book, "r", encoding="utf-8") as f:
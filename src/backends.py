@@ -0,0 +1,164 @@
+"""Summarization backends that the summarizer functions dispatch through.
+
+A backend is called exactly like a Hugging Face summarization pipeline,
+`backend(texts, max_length=..., min_length=..., do_sample=False)` returning
+`[{"summary_text": ...}]`, so raw pipelines and test doubles still work
+wherever a backend is expected. Backends may also expose:
+
+- `model_name`: the name summary cache keys are filed under
+- `tokenizer`: the tokenizer their lengths are measured in
+- `uses_prompts`: whether instruction prompts should be prepended to inputs
+
+Choose one per call (`summarizer="extractive"`, `summarizer="bart-int8"`) or per
+run with the SUMMARIZER_BACKEND environment variable or `set_default_backend`.
+SUMMARIZER_QUANTIZATION (int8 or bf16) quantizes the plain "bart" backend too.
+"""
+
+import os
+import threading
+
+try:
+    from . import models
+    from .chunking import RegexTokenizer
+    from .extractive import extract_summary
+except ImportError:
+    import models
+    from chunking import RegexTokenizer
+    from extractive import extract_summary
+
+DEFAULT_BACKEND = "bart"
+
+
+class BartBackend:
+    """Abstractive summaries from the shared pipeline in the model registry."""
+
+    uses_prompts = True
+
+    def __init__(
+        self,
+        model_name: str = models.DEFAULT_MODEL,
+        device=None,
+        dtype=None,
+        quantization: str = None,
+    ):
+        if quantization is None:
+            quantization = os.environ.get("SUMMARIZER_QUANTIZATION") or None
+        models.check_quantization(quantization, device)
+        self.checkpoint = model_name
+        self.device = device
+        self.dtype = dtype
+        self.quantization = quantization
+        # Quantized models phrase summaries differently, so they get their own cache entries
+        self.model_name = f"{model_name}@{quantization}" if quantization else model_name
+
+    @property
+    def tokenizer(self):
+        return models.get_tokenizer(self.checkpoint)
+
+    def __call__(self, texts, **kwargs):
+        # The pipeline is only loaded on the first call, never on construction
+        pipeline = models.get_summarizer(
+            self.checkpoint,
+            device=self.device,
+            dtype=self.dtype,
+            quantization=self.quantization,
+        )
+        return pipeline(texts, **kwargs)
+
+
+class ExtractiveBackend:
+    """CPU-only TextRank sentence extraction; no model weights are loaded."""
+
+    uses_prompts = False
+
+    def __init__(self, damping: float = 0.85):
+        self.damping = damping
+        self.model_name = f"extractive-textrank-d{damping}"
+        self.tokenizer = RegexTokenizer()
+
+    def __call__(
+        self,
+        texts,
+        max_length: int = 200,
+        min_length: int = 0,
+        do_sample: bool = False,
+        **kwargs,
+    ):
+        batch = [texts] if isinstance(texts, str) else texts
+        return [
+            {
+                "summary_text": extract_summary(
+                    text,
+                    max_tokens=max_length,
+                    min_tokens=min_length,
+                    damping=self.damping,
+                )
+            }
+            for text in batch
+        ]
+
+
+_lock = threading.Lock()
+_factories = {
+    "bart": BartBackend,
+    "bart-int8": lambda: BartBackend(quantization="int8"),
+    "bart-bf16": lambda: BartBackend(quantization="bf16"),
+    "extractive": ExtractiveBackend,
+}
+_instances = {}
+_default_name = None
+
+
+def register_backend(name: str, factory) -> None:
+    """Make `factory()` available under `name` (replacing any existing backend)."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def available_backends() -> list[str]:
+    with _lock:
+        return sorted(_factories)
+
+
+def get_backend(name: str = None):
+    """Return the shared backend called `name`, or the configured default."""
+    if name is None:
+        name = _default_name or os.environ.get("SUMMARIZER_BACKEND") or DEFAULT_BACKEND
+    with _lock:
+        backend = _instances.get(name)
+        if backend is None:
+            if name not in _factories:
+                raise ValueError(
+                    f"Unknown summarizer backend {name!r}; choose from {', '.join(sorted(_factories))}"
+                )
+            backend = _instances[name] = _factories[name]()
+        return backend
+
+
+def set_default_backend(name: str = None) -> None:
+    """Use backend `name` wherever none is passed (None restores the env/default choice)."""
+    global _default_name
+    if name is not None and name not in available_backends():
+        raise ValueError(
+            f"Unknown summarizer backend {name!r}; choose from {', '.join(available_backends())}"
+        )
+    _default_name = name
+
+
+def model_name(summarizer) -> str:
+    """Name a backend or pipeline for cache keys and manifests."""
+    if getattr(summarizer, "model_name", None):
+        return summarizer.model_name
+    model = getattr(summarizer, "model", None)
+    name = getattr(model, "name_or_path", None) or getattr(
+        getattr(model, "config", None), "_name_or_path", None
+    )
+    return name or getattr(summarizer, "__name__", type(summarizer).__name__)
+
+
+def resolve(summarizer):
+    """Turn a `summarizer=` argument (None, a backend name or a callable) into a callable."""
+    if summarizer is None or isinstance(summarizer, str):
+        return get_backend(summarizer)
+    return summarizer
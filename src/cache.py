@@ -0,0 +1,172 @@
+"""Content-addressed on-disk cache for generated summaries.
+
+Entries are keyed by a hash of the input text, the model name and the
+generation parameters, so unchanged chunks are never summarized twice.
+Writes are atomic (write to a temp file, then rename), which keeps the cache
+safe to share between processes. Recency is tracked through file mtimes and
+the least recently used entries are evicted once the cache grows past its
+size or entry limits.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from .fsutil import atomic_write_text
+except ImportError:
+    from fsutil import atomic_write_text
+
+
+class SummaryCache:
+    """A directory of JSON summary entries with LRU eviction and hit/miss counters."""
+
+    def __init__(self, directory: str, max_bytes: int = None, max_entries: int = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._usage = None  # (bytes, entries), lazily scanned
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, model: str, params: dict) -> str:
+        """Hash the text, model and generation parameters into a cache key."""
+        payload = json.dumps({"model": model, "params": params}, sort_keys=True)
+        digest = hashlib.sha256(payload.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str):
+        """Return the cached summary for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summary = json.load(f)["summary"]
+        except (FileNotFoundError, ValueError, KeyError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._stats["hits"] += 1
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        """Store `summary` under `key`, evicting old entries if over the limits."""
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = None
+        data = json.dumps({"summary": summary}, ensure_ascii=False)
+        atomic_write_text(path, data, fsync=False)
+
+        with self._lock:
+            self._stats["writes"] += 1
+            if self._usage is not None:
+                size, entries = self._usage
+                size += len(data.encode("utf-8"))
+                if replaced is None:
+                    entries += 1
+                else:
+                    size -= replaced
+                self._usage = (size, entries)
+        if self._over_limits():
+            self.evict()
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json") or name.startswith(".tmp-"):
+                    continue  # in-flight writes belong to their writer
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # removed by another process
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _over_limits(self) -> bool:
+        if self.max_bytes is None and self.max_entries is None:
+            return False
+        with self._lock:
+            usage = self._usage
+        if usage is None:
+            entries = self._scan()
+            usage = (sum(size for _, size, _ in entries), len(entries))
+            with self._lock:
+                self._usage = usage
+        size, count = usage
+        return (self.max_bytes is not None and size > self.max_bytes) or (
+            self.max_entries is not None and count > self.max_entries
+        )
+
+    def evict(self) -> int:
+        """Remove least recently used entries until within limits; return how many."""
+        entries = sorted(self._scan())
+        size = sum(entry[1] for entry in entries)
+        count = len(entries)
+        removed = 0
+
+        for _mtime, entry_size, path in entries:
+            within_bytes = self.max_bytes is None or size <= self.max_bytes
+            within_entries = self.max_entries is None or count <= self.max_entries
+            if within_bytes and within_entries:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            count -= 1
+
+        with self._lock:
+            self._usage = (size, count)
+            self._stats["evictions"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        """Return hit/miss/write/eviction counters for this process."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_configured = False
+
+
+def get_default_cache():
+    """Return the cache configured via SUMMARY_CACHE_DIR, or None if caching is off."""
+    global _default_cache, _default_configured
+    if not _default_configured:
+        directory = os.environ.get("SUMMARY_CACHE_DIR")
+        if directory:
+            max_mb = os.environ.get("SUMMARY_CACHE_MAX_MB")
+            max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else None
+            _default_cache = SummaryCache(directory, max_bytes=max_bytes)
+        _default_configured = True
+    return _default_cache
+
+
+def set_default_cache(cache) -> None:
+    """Use `cache` (or None to disable caching) wherever no cache is passed explicitly."""
+    global _default_cache, _default_configured
+    _default_cache = cache
+    _default_configured = True
@@ -0,0 +1,383 @@
+"""Character co-occurrence networks built from a book's chapters.
+
+Candidate names are capitalized word runs (with an optional honorific) that
+the book doesn't mostly use as ordinary lowercase words. Aliases are folded
+into one canonical name: "Elizabeth" and "Miss Elizabeth Bennet" become
+"Elizabeth Bennet" when that is the only full name they can belong to, while
+"Mr. Bennet" and "Mrs. Bennet" stay apart.
+
+Co-occurrences are counted per sentence or paragraph window. Mentions become
+(window, character) pairs; the pairs sharing a window are generated with a
+few vectorized passes rather than comparing names pairwise, and the edges are
+aggregated as sparse COO triples, so neither time nor memory grows with the
+square of the number of sentences. Per-chapter and cumulative graphs can be
+exported as JSON or GraphML (scipy matrices via `to_scipy` when installed).
+
+Usage:
+    python -m src.characters books/pride.txt --output pride_network.json --graphml pride.graphml
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+try:
+    from .chunking import sentence_spans
+    from .fsutil import atomic_write_text
+    from .ingest import load_book, clean_gutenberg_text
+    from .structure import split_into_chapters
+except ImportError:
+    from chunking import sentence_spans
+    from fsutil import atomic_write_text
+    from ingest import load_book, clean_gutenberg_text
+    from structure import split_into_chapters
+
+HONORIFICS = (
+    "Mr",
+    "Mrs",
+    "Ms",
+    "Miss",
+    "Dr",
+    "Sir",
+    "Lady",
+    "Lord",
+    "Captain",
+    "Colonel",
+    "Madame",
+    "Monsieur",
+    "Mademoiselle",
+    "Professor",
+    "Uncle",
+    "Aunt",
+)
+_NAME = re.compile(
+    rf"\b(?:(?P<title>{'|'.join(HONORIFICS)})\.?[ \t]+\n?[ \t]*)?"
+    r"(?P<name>[A-Z][a-z'’]+(?:(?:[ \t]+\n?|\n)[ \t]*[A-Z][a-z'’]+){0,2})\b"
+)
+_LOWER_WORD = re.compile(r"\b[a-z][a-z'’]*\b")
+_CAPITALIZED_WORD = re.compile(r"\b[A-Z][a-z'’]+\b")
+_PARAGRAPH_BREAK = re.compile(r"\n[^\S\n]*\n")
+_NOT_NAMES = frozenset(
+    "Chapter Letter Part Volume Book Monday Tuesday Wednesday Thursday Friday Saturday Sunday "
+    "January February March April May June July August September October November December "
+    "God Heaven Christmas English French German Italian Spanish "
+    "The A An And But Or So Yet When Then There This That These Those What Where Why How If In On At As "
+    "It He She They We You His Her Their Our My Yes No Oh Well Now".split()
+)
+_ABBREVIATION_END = re.compile(r"\b(?:Mr|Mrs|Ms|Dr|St)\.$")
+
+
+@dataclass
+class CharacterNetwork:
+    """Characters of a book and their co-occurrence edges per chapter."""
+
+    names: list  # canonical names, indexed by character id
+    aliases: dict  # surface form → canonical name
+    mentions: np.ndarray  # (characters,) mention counts
+    chapter_titles: list
+    # One row per (chapter, a, b, weight)
+    edges: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype=np.int64))
+
+    def matrix(
+        self, chapter: int = None, cumulative: bool = False
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """COO triples (rows, cols, weights), a < b, for one chapter, up to it, or the whole book."""
+        edges = self.edges
+        if chapter is not None:
+            edges = (
+                edges[edges[:, 0] <= chapter]
+                if cumulative
+                else edges[edges[:, 0] == chapter]
+            )
+        n = len(self.names)
+        keys, inverse = np.unique(edges[:, 1] * n + edges[:, 2], return_inverse=True)
+        weights = np.bincount(
+            inverse.ravel(), weights=edges[:, 3], minlength=len(keys)
+        ).astype(np.int64)
+        return keys // n, keys % n, weights
+
+    def graph(
+        self, chapter: int = None, cumulative: bool = False
+    ) -> list[tuple[str, str, int]]:
+        """Weighted edge list by name, heaviest first."""
+        rows, cols, weights = self.matrix(chapter, cumulative)
+        order = np.argsort(-weights, kind="stable")
+        return [
+            (self.names[rows[i]], self.names[cols[i]], int(weights[i])) for i in order
+        ]
+
+    def to_scipy(self, chapter: int = None, cumulative: bool = False):
+        """Symmetric scipy.sparse COO adjacency matrix (needs scipy)."""
+        from scipy.sparse import coo_matrix
+
+        rows, cols, weights = self.matrix(chapter, cumulative)
+        n = len(self.names)
+        return coo_matrix(
+            (
+                np.concatenate([weights, weights]),
+                (np.concatenate([rows, cols]), np.concatenate([cols, rows])),
+            ),
+            shape=(n, n),
+        )
+
+    def to_dict(self) -> dict:
+        by_name = {}
+        for alias, name in self.aliases.items():
+            if alias != name:
+                by_name.setdefault(name, []).append(alias)
+        return {
+            "characters": [
+                {
+                    "name": name,
+                    "mentions": int(count),
+                    "aliases": sorted(by_name.get(name, [])),
+                }
+                for name, count in zip(self.names, self.mentions)
+            ],
+            "chapters": [
+                {"title": title, "edges": [list(edge) for edge in self.graph(i)]}
+                for i, title in enumerate(self.chapter_titles)
+            ],
+            "total": [list(edge) for edge in self.graph()],
+        }
+
+    def write_json(self, path: str) -> None:
+        atomic_write_text(
+            path, json.dumps(self.to_dict(), ensure_ascii=False, indent=1)
+        )
+
+    def write_graphml(
+        self, path: str, chapter: int = None, cumulative: bool = False
+    ) -> None:
+        """Write one graph (whole book by default) as GraphML for Gephi or networkx."""
+        rows, cols, weights = self.matrix(chapter, cumulative)
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+            '  <key id="mentions" for="node" attr.name="mentions" attr.type="int"/>',
+            '  <key id="weight" for="edge" attr.name="weight" attr.type="int"/>',
+            '  <graph edgedefault="undirected">',
+        ]
+        for i, (name, count) in enumerate(zip(self.names, self.mentions)):
+            lines.append(
+                f'    <node id="n{i}"><data key="mentions">{int(count)}</data><desc>{escape(name)}</desc></node>'
+            )
+        for a, b, weight in zip(rows, cols, weights):
+            lines.append(
+                f'    <edge source="n{a}" target="n{b}"><data key="weight">{int(weight)}</data></edge>'
+            )
+        lines.extend(["  </graph>", "</graphml>"])
+        atomic_write_text(path, "\n".join(lines) + "\n")
+
+
+def _candidate(match, ordinary, cache: dict):
+    """Normalize one regex match to a name key, or None if it isn't a likely name."""
+    raw = (match.group("title"), match.group("name"))
+    if raw in cache:
+        return cache[raw]
+    title, name = raw
+    words = name.split()
+    # Drop sentence-initial ordinary words ("When Elizabeth" → "Elizabeth")
+    while words and ordinary(words[0]):
+        words.pop(0)
+        title = None
+    while words and ordinary(words[-1]):
+        words.pop()
+    key = None
+    if words:
+        key = " ".join(words)
+        if title and len(words) == 1:
+            key = (
+                f"{title}. {key}"
+                if title in ("Mr", "Mrs", "Ms", "Dr")
+                else f"{title} {key}"
+            )
+    cache[raw] = key
+    return key
+
+
+def resolve_aliases(counts: Counter, aliases: dict = None) -> dict:
+    """Map each name key to a canonical name, folding short forms into unique full names."""
+
+    def titled(key):
+        return key.split()[0].rstrip(".") in HONORIFICS
+
+    full = {key for key in counts if len(key.split()) >= 2 and not titled(key)}
+    by_word = {}
+    for key in full:
+        for word in key.split():
+            by_word.setdefault(word, set()).add(key)
+    # "Mr. Bennet" and "Mrs. Bennet" are different people: neither may fold
+    titles_per_name = Counter(key.split()[-1] for key in counts if titled(key))
+
+    resolved = {}
+    for key in counts:
+        target = key
+        if key not in full:
+            # "Elizabeth", "Mr. Darcy" → look up by the bare name
+            bare = key.split()[-1]
+            owners = by_word.get(bare, set())
+            if len(owners) == 1 and not (titled(key) and titles_per_name[bare] > 1):
+                target = next(iter(owners))
+        resolved[key] = target
+    for alias, name in (aliases or {}).items():
+        resolved[alias] = name
+    return resolved
+
+
+def _windows(text: str, unit: str) -> np.ndarray:
+    """Start offsets of the sentence or paragraph windows in `text`."""
+    if unit == "sentence":
+        spans = sentence_spans(text) or [(0, 0)]
+        # "Mr. Darcy" is one sentence, not two
+        starts = [spans[0][0]] + [
+            start
+            for (prev_start, prev_end), (start, _) in zip(spans, spans[1:])
+            if not _ABBREVIATION_END.search(text, prev_start, prev_end)
+        ]
+        return np.array(starts, dtype=np.int64)
+    if unit == "paragraph":
+        return np.array(
+            [0] + [m.end() for m in _PARAGRAPH_BREAK.finditer(text)], dtype=np.int64
+        )
+    raise ValueError("window must be 'sentence' or 'paragraph'")
+
+
+def _pairs_in_windows(
+    windows: np.ndarray, characters: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """All (a, b), a < b, of distinct characters sharing a window; one entry per window."""
+    span = characters.max(initial=0) + 1
+    keys = np.unique(windows * span + characters)
+    windows, characters = keys // span, keys % span
+    left, right = [], []
+    offset = 1
+    # Entries are sorted by window, then character: pair each with the ones `offset` places later
+    while offset < len(windows):
+        same = windows[offset:] == windows[:-offset]
+        if not same.any():
+            break
+        left.append(characters[:-offset][same])
+        right.append(characters[offset:][same])
+        offset += 1
+    if not left:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(left), np.concatenate(right)
+
+
+def build_network(
+    chapters, window: str = "sentence", min_mentions: int = 3, aliases: dict = None
+) -> CharacterNetwork:
+    """Extract characters from `chapters` (from `split_into_chapters`) and count co-occurrences."""
+    texts = [ch["content"] for ch in chapters]
+    lowercase, capitalized = Counter(), Counter()
+    for text in texts:
+        lowercase.update(_LOWER_WORD.findall(text))
+        capitalized.update(_CAPITALIZED_WORD.findall(text))
+
+    def ordinary(word):
+        # Capitalized mostly at sentence starts, lowercase elsewhere: not a name
+        return word in _NOT_NAMES or lowercase[word.lower()] >= capitalized[word]
+
+    cache = {}
+
+    chapter_mentions = []
+    counts = Counter()
+    for text in texts:
+        mentions = []
+        for match in _NAME.finditer(text):
+            key = _candidate(match, ordinary, cache)
+            if key:
+                mentions.append((match.start(), key))
+                counts[key] += 1
+        chapter_mentions.append(mentions)
+
+    resolved = resolve_aliases(counts, aliases)
+    totals = Counter()
+    for key, count in counts.items():
+        totals[resolved[key]] += count
+    names = sorted(
+        (name for name, count in totals.items() if count >= min_mentions),
+        key=lambda n: (-totals[n], n),
+    )
+    ids = {name: i for i, name in enumerate(names)}
+
+    edges = []
+    for number, (text, mentions) in enumerate(zip(texts, chapter_mentions)):
+        kept = [
+            (pos, ids[resolved[key]]) for pos, key in mentions if resolved[key] in ids
+        ]
+        if len(kept) < 2:
+            continue
+        positions = np.array([pos for pos, _ in kept], dtype=np.int64)
+        characters = np.array([cid for _, cid in kept], dtype=np.int64)
+        windows = np.searchsorted(_windows(text, window), positions, side="right") - 1
+        a, b = _pairs_in_windows(windows, characters)
+        if len(a):
+            keys, weights = np.unique(a * len(names) + b, return_counts=True)
+            edges.append(
+                np.stack(
+                    [
+                        np.full(len(keys), number),
+                        keys // len(names),
+                        keys % len(names),
+                        weights,
+                    ],
+                    axis=1,
+                )
+            )
+
+    return CharacterNetwork(
+        names=names,
+        aliases={key: name for key, name in resolved.items() if name in ids},
+        mentions=np.array([totals[name] for name in names], dtype=np.int64),
+        chapter_titles=[ch["title"] for ch in chapters],
+        edges=(
+            np.concatenate(edges).astype(np.int64)
+            if edges
+            else np.zeros((0, 4), dtype=np.int64)
+        ),
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build a character co-occurrence network for a book."
+    )
+    parser.add_argument("book", help="path to a book file")
+    parser.add_argument(
+        "--output",
+        default="character_network.json",
+        help="JSON file with per-chapter edges",
+    )
+    parser.add_argument("--graphml", help="also write the whole-book graph as GraphML")
+    parser.add_argument(
+        "--window", choices=("sentence", "paragraph"), default="sentence"
+    )
+    parser.add_argument("--min-mentions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    chapters = split_into_chapters(clean_gutenberg_text(load_book(args.book)))
+    network = build_network(
+        chapters, window=args.window, min_mentions=args.min_mentions
+    )
+    network.write_json(args.output)
+    if args.graphml:
+        network.write_graphml(args.graphml)
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ {len(network.names)} characters, {len(network.graph())} edges in {elapsed:.1f}s → {args.output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""Sentence-aligned token chunking that tokenizes each text exactly once.
+
+The tokenizer is asked for token ids together with character offsets, so
+chunks can be cut on sentence boundaries and sliced straight out of the
+source text. Each chunk carries its token ids and count downstream, which
+means no later stage needs to encode it again just to measure it.
+"""
+
+import bisect
+import re
+import zlib
+from dataclasses import dataclass
+
+try:
+    from .metrics import instrument
+except ImportError:
+    from metrics import instrument
+
+# End of a sentence (terminal punctuation plus closing quotes/brackets) or a paragraph break
+_SENTENCE_END = re.compile(r"""[.!?]+["'”’)\]]*(?=\s)|\n[^\S\n]*\n""")
+
+
+@dataclass
+class TextChunk:
+    """A slice of the source text along with the token ids that cover it."""
+
+    text: str
+    token_ids: list
+    start: int
+    end: int
+
+    @property
+    def token_count(self) -> int:
+        return len(self.token_ids)
+
+
+class RegexTokenizer:
+    """
+    Dependency-free word/punctuation tokenizer with fast-tokenizer style offsets.
+
+    Useful wherever transformer weights aren't wanted: extractive summaries,
+    benchmarks and tests. Token ids are CRC-32 hashes of the token text, so
+    an instance keeps no vocabulary and is safe to share between threads;
+    it can't decode ids back to text.
+    """
+
+    is_fast = True
+    _TOKEN = re.compile(r"\w+|[^\w\s]")
+
+    def __call__(
+        self, text: str, return_offsets_mapping: bool = False, **kwargs
+    ) -> dict:
+        ids = []
+        offsets = []
+        for match in self._TOKEN.finditer(text):
+            ids.append(zlib.crc32(match.group().encode("utf-8")))
+            offsets.append(match.span())
+        encoding = {"input_ids": ids}
+        if return_offsets_mapping:
+            encoding["offset_mapping"] = offsets
+        return encoding
+
+
+def sentence_boundaries(text: str, token_starts: list[int]) -> list[int]:
+    """Token indices at which a new sentence (or paragraph) begins."""
+    boundaries = []
+    for match in _SENTENCE_END.finditer(text):
+        index = bisect.bisect_left(token_starts, match.end())
+        if 0 < index < len(token_starts) and (
+            not boundaries or boundaries[-1] != index
+        ):
+            boundaries.append(index)
+    return boundaries
+
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """Character (start, end) spans of the sentences in `text`, whitespace trimmed."""
+    spans = []
+    start = 0
+    for end in [match.end() for match in _SENTENCE_END.finditer(text)] + [len(text)]:
+        segment = text[start:end]
+        stripped = segment.strip()
+        if stripped:
+            offset = start + segment.index(stripped[0])
+            spans.append((offset, offset + len(stripped)))
+        start = end
+    return spans
+
+
+@instrument(
+    "chunk",
+    lambda chunks: {
+        "items": len(chunks),
+        "input_tokens": sum(c.token_count for c in chunks),
+    },
+)
+def chunk_text(
+    text: str, tokenizer, max_tokens: int = 400, overlap: int = 0
+) -> list[TextChunk]:
+    """
+    Split `text` into chunks of at most `max_tokens` tokens, cut on sentence boundaries.
+
+    A chunk only falls back to a hard cut when a single sentence is longer than
+    the budget. With `overlap`, each chunk starts up to that many tokens before
+    the previous one ended, at a sentence start when there is one in range.
+    """
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError(
+            "chunk_text needs a fast tokenizer (one that returns offset mappings)"
+        )
+
+    encoding = tokenizer(text, return_offsets_mapping=True, add_special_tokens=False)
+    ids = list(encoding["input_ids"])
+    offsets = [tuple(span) for span in encoding["offset_mapping"]]
+    total = len(ids)
+    boundaries = sentence_boundaries(text, [span[0] for span in offsets])
+
+    chunks = []
+    start = 0
+    while start < total:
+        limit = min(start + max_tokens, total)
+        end = limit
+        if limit < total:
+            i = bisect.bisect_right(boundaries, limit) - 1
+            if i >= 0 and boundaries[i] > start:
+                end = boundaries[i]
+
+        char_start, char_end = offsets[start][0], offsets[end - 1][1]
+        chunks.append(
+            TextChunk(text[char_start:char_end], ids[start:end], char_start, char_end)
+        )
+        if end >= total:
+            break
+
+        next_start = end
+        if overlap > 0:
+            want = max(start + 1, end - overlap)
+            i = bisect.bisect_left(boundaries, want)
+            next_start = (
+                boundaries[i] if i < len(boundaries) and boundaries[i] < end else want
+            )
+        start = next_start
+
+    return chunks
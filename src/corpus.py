@@ -0,0 +1,169 @@
+"""Parallel ingestion of a directory of books, streaming results to a JSONL manifest.
+
+Usage:
+    python -m src.corpus books/ --workers 8 --manifest corpus_manifest.jsonl
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from .ingest import book_stem, load_book, strip_gutenberg
+    from .structure import detect_and_split
+except ImportError:
+    from ingest import book_stem, load_book, strip_gutenberg
+    from structure import detect_and_split
+
+BOOK_PATTERNS = ("*.txt", "*.gz", "*.bz2", "*.zip")
+
+
+def discover_books(directory: str, patterns=BOOK_PATTERNS) -> list[str]:
+    """Find book files under `directory` (recursively), sorted for stable runs."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def output_names(paths: list[str], root: str) -> dict:
+    """
+    Name each book's outputs after its path under `root`, without extensions.
+
+    Books that would share a name (pride.txt next to pride.txt.gz) keep their
+    full file name instead, so no two books ever write to the same output.
+    """
+    stems = {}
+    for path in paths:
+        relative = os.path.relpath(path, root)
+        stems[path] = os.path.join(os.path.dirname(relative), book_stem(relative))
+    counts = Counter(stems.values())
+    return {
+        path: stem if counts[stem] == 1 else os.path.relpath(path, root)
+        for path, stem in stems.items()
+    }
+
+
+def ingest_book(path: str) -> dict:
+    """Load, clean and split one book, returning a manifest record (never raises)."""
+    record = {"path": path}
+    timings = {}
+    output = io.StringIO()
+    started = time.perf_counter()
+    try:
+        # Collect the cleaner's warnings per book instead of interleaving them on stdout
+        with contextlib.redirect_stdout(output):
+            t = time.perf_counter()
+            raw_text = load_book(path)
+            timings["load"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            body = strip_gutenberg(raw_text)
+            clean_text = body.text
+            timings["clean"] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            structure, chapters = detect_and_split(clean_text)
+            timings["split"] = time.perf_counter() - t
+
+        record.update(
+            status="ok",
+            structure=structure,
+            chapters=len(chapters),
+            characters=len(clean_text),
+            boilerplate={"rule": body.rule, "chapter_one": body.chapter_one},
+        )
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+
+    timings["total"] = time.perf_counter() - started
+    record["timings"] = {stage: round(seconds, 6) for stage, seconds in timings.items()}
+    warnings = [line for line in output.getvalue().splitlines() if line.strip()]
+    if warnings:
+        record["warnings"] = warnings
+    return record
+
+
+def ingest_corpus(
+    directory: str, manifest_path: str, workers: int = None, patterns=BOOK_PATTERNS
+) -> dict:
+    """
+    Ingest every book in `directory` over a process pool.
+
+    Each record is appended to `manifest_path` as soon as its book finishes, so
+    the manifest can be tailed while a long batch runs. Returns summary counts.
+    """
+    paths = discover_books(directory, patterns)
+    counts = {"books": len(paths), "ok": 0, "error": 0}
+
+    with open(manifest_path, "w", encoding="utf-8") as manifest:
+
+        def write(record):
+            counts[record["status"]] += 1
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+
+        if workers == 1:
+            for path in paths:
+                write(ingest_book(path))
+            return counts
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest_book, path): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:  # the worker itself died
+                    record = {
+                        "path": futures[future],
+                        "status": "error",
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+                write(record)
+
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ingest a directory of books in parallel."
+    )
+    parser.add_argument("directory", help="directory containing book files")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument(
+        "--manifest",
+        default="corpus_manifest.jsonl",
+        help="JSONL file to write results to",
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help=f"glob pattern for book files (repeatable, default: {' '.join(BOOK_PATTERNS)})",
+    )
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = ingest_corpus(
+        args.directory,
+        args.manifest,
+        workers=args.workers,
+        patterns=args.patterns or BOOK_PATTERNS,
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Ingested {counts['ok']}/{counts['books']} books in {elapsed:.1f}s ({counts['error']} failed) → {args.manifest}"
+    )
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,564 @@
+"""Local summarization daemon: one warm model per host, shared by every job.
+
+The daemon loads the summarizer once and listens on a Unix socket (or a
+localhost TCP port) for newline-delimited JSON requests. `summarize_text`
+and `summarize_long_text` requests run the usual summarizer functions on
+worker threads, but every model call they make is routed through a batcher:
+calls arriving within a few milliseconds of each other, from any client, are
+merged into one batch (neighbouring `max_length`s are batched at the
+tightest limit, as `summarize_chunks` does) and run on a single model thread.
+Each response carries the request's latency as seen by the daemon.
+
+`DaemonClient` and the module-level `summarize_text`/`summarize_long_text`
+take the same arguments as their `summarizer` counterparts; the module-level
+ones fall back to summarizing in-process when no daemon is running or when
+given a summarizer, tokenizer or cache object, which can't be sent over.
+
+Usage:
+    python -m src.daemon serve --backend bart-int8
+    python -m src.daemon stats
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import backends, summarizer as local
+except ImportError:
+    import backends
+    import summarizer as local
+
+DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "book-ingestor-summarizer.sock")
+_OPERATIONS = {
+    "summarize_text": ("max_length", "min_length", "cache"),
+    "summarize_long_text": (
+        "target_tokens_per_chunk",
+        "batch_size",
+        "cache",
+        "fan_in",
+        "prefilter_ratio",
+        "prefilter_max_tokens",
+    ),
+}
+
+
+def default_address() -> str:
+    return os.environ.get("SUMMARIZER_DAEMON") or DEFAULT_ADDRESS
+
+
+def _parse_address(address: str):
+    """A filesystem path means a Unix socket; "host:port" means TCP."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+class _Batcher:
+    """Merges model calls from many threads into shared batches on one model thread."""
+
+    def __init__(self, backend, loop, max_batch: int, max_wait: float):
+        self.backend = backend
+        self.loop = loop
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"calls": 0, "batches": 0, "items": 0, "model_seconds": 0.0}
+        self._pending = []  # (text, params, future), oldest first
+        self._wakeup = asyncio.Event()
+        self._model = ThreadPoolExecutor(1, thread_name_prefix="daemon-model")
+
+    def call(self, texts, **params) -> list:
+        """Blocking pipeline-style call for worker threads."""
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        params.pop("batch_size", None)  # the batcher decides
+        return asyncio.run_coroutine_threadsafe(
+            self._submit(batch, params), self.loop
+        ).result()
+
+    async def _submit(self, texts, params):
+        self.stats["calls"] += 1
+        futures = [self.loop.create_future() for _ in texts]
+        self._pending.extend(
+            (text, params, future) for text, future in zip(texts, futures)
+        )
+        self._wakeup.set()
+        return [{"summary_text": summary} for summary in await asyncio.gather(*futures)]
+
+    def _take(self) -> list:
+        head = self._pending[0][1]
+        fits = []
+        for item in self._pending:
+            params = item[1]
+            compatible = (
+                params.get("min_length") == head.get("min_length")
+                and params.get("do_sample") == head.get("do_sample")
+                and min(params["max_length"], head["max_length"])
+                >= 0.9 * max(params["max_length"], head["max_length"])
+            )
+            if compatible:
+                fits.append(item)
+                if len(fits) == self.max_batch:
+                    break
+        taken = {id(item) for item in fits}
+        self._pending = [item for item in self._pending if id(item) not in taken]
+        return fits
+
+    def _infer(self, batch) -> list:
+        """Run one batch, retrying one by one on failure; returns summaries or exceptions."""
+        params = dict(
+            batch[0][1], max_length=min(item[1]["max_length"] for item in batch)
+        )
+        started = time.perf_counter()
+        try:
+            outputs = self.backend(
+                [item[0] for item in batch], batch_size=len(batch), **params
+            )
+            results = [output["summary_text"] for output in outputs]
+        except Exception:
+            results = []
+            for text, own, _ in batch:
+                try:
+                    results.append(self.backend(text, **own)[0]["summary_text"])
+                except Exception as e:
+                    results.append(e)
+        self.stats["model_seconds"] += time.perf_counter() - started
+        return results
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.max_wait)  # let concurrent requests join the batch
+            while self._pending:
+                batch = self._take()
+                results = await self.loop.run_in_executor(
+                    self._model, self._infer, batch
+                )
+                self.stats["batches"] += 1
+                self.stats["items"] += len(batch)
+                for (_, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def close(self):
+        self._model.shutdown(wait=False, cancel_futures=True)
+
+
+class _BatchingSummarizer:
+    """Backend stand-in handed to the summarizer functions; model calls go to the batcher."""
+
+    def __init__(self, backend, batcher: _Batcher):
+        self.model_name = backends.model_name(backend)
+        self.uses_prompts = getattr(backend, "uses_prompts", True)
+        self._backend = backend
+        self._batcher = batcher
+
+    @property
+    def tokenizer(self):
+        return getattr(self._backend, "tokenizer", None)
+
+    def __call__(self, texts, **params):
+        return self._batcher.call(texts, **params)
+
+
+class SummarizerDaemon:
+    """Serve summarization requests from one warm backend."""
+
+    def __init__(
+        self,
+        summarizer=None,
+        max_batch: int = 16,
+        max_wait: float = 0.01,
+        workers: int = 32,
+    ):
+        self.backend = backends.resolve(summarizer)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self.started = None
+        self.requests = 0
+        self._loop = None
+        self._stopped = None
+        self._batcher = None
+        self._ready = threading.Event()
+
+    async def serve(
+        self, address: str = None, warm_up: bool = True, on_ready=None
+    ) -> None:
+        """Listen on `address` (socket path or host:port) until `stop()` is called."""
+        address = _parse_address(address or default_address())
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        batcher = _Batcher(self.backend, self._loop, self.max_batch, self.max_wait)
+        self._batcher = batcher
+        self._proxy = _BatchingSummarizer(self.backend, batcher)
+        self._pool = ThreadPoolExecutor(
+            self.workers, thread_name_prefix="daemon-request"
+        )
+        if warm_up:
+            await self._loop.run_in_executor(
+                None,
+                lambda: self.backend(
+                    ["Warm up."], max_length=8, min_length=1, do_sample=False
+                ),
+            )
+
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._handle, *address)
+        else:
+            if os.path.exists(address):
+                os.remove(address)  # left behind by a daemon that was killed
+            server = await asyncio.start_unix_server(self._handle, address)
+        self.started = time.time()
+        batching = asyncio.create_task(batcher.run())
+        self._ready.set()
+        if on_ready is not None:
+            on_ready()
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            batching.cancel()
+            batcher.close()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            if isinstance(address, str) and os.path.exists(address):
+                os.remove(address)
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def stop(self) -> None:
+        """Stop serving; safe to call from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def stats(self) -> dict:
+        """Request and batching counters (only meaningful while serving)."""
+        batcher = self._batcher.stats
+        return {
+            "backend": backends.model_name(self.backend),
+            "uptime": time.time() - self.started,
+            "requests": self.requests,
+            "model_calls": batcher["calls"],
+            "batches": batcher["batches"],
+            "mean_batch_size": (
+                batcher["items"] / batcher["batches"] if batcher["batches"] else 0.0
+            ),
+            "model_seconds": batcher["model_seconds"],
+        }
+
+    async def _handle(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _respond(self, line: bytes, writer, lock):
+        started = time.perf_counter()
+        response = {}
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id")
+            op = request.get("op")
+            if op == "ping":
+                response["ok"] = True
+            elif op == "stats":
+                response["stats"] = self.stats()
+            elif op in _OPERATIONS:
+                self.requests += 1
+                params = {
+                    k: v
+                    for k, v in request.get("params", {}).items()
+                    if k in _OPERATIONS[op]
+                }
+                fn = getattr(local, op)
+                response["summary"] = await self._loop.run_in_executor(
+                    self._pool,
+                    lambda: fn(request["text"], summarizer=self._proxy, **params),
+                )
+            else:
+                response["error"] = f"Unknown op {op!r}"
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        response["latency"] = time.perf_counter() - started
+        async with lock:
+            writer.write(
+                json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+            )
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def _remote_problem(summarizer=None, tokenizer=None, cache=None) -> str:
+    """Why a call can't be sent to the daemon, or "" when it can."""
+    if summarizer is not None:
+        return "The daemon summarizes with its own backend; don't pass summarizer="
+    if tokenizer is not None:
+        return "The daemon measures chunks with its backend's tokenizer; don't pass tokenizer="
+    if cache is not None and cache is not False:
+        return "The daemon uses its own summary cache; pass cache=None (default) or cache=False"
+    return ""
+
+
+def _check_remote(**objects) -> None:
+    problem = _remote_problem(**objects)
+    if problem:
+        raise ValueError(problem)
+
+
+class DaemonClient:
+    """Blocking client; `summarize_text`/`summarize_long_text` mirror the summarizer module."""
+
+    def __init__(self, address: str = None, timeout: float = None):
+        self.address = _parse_address(address or default_address())
+        self.timeout = timeout
+        self.last_latency = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._socket = None
+        self._reader = None
+
+    def _connect(self):
+        if isinstance(self.address, tuple):
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+        self._socket = sock
+        self._reader = sock.makefile("rb")
+
+    def request(self, op: str, **fields) -> dict:
+        """Send one request and return the daemon's full response (with `latency`)."""
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            request_id = next(self._ids)
+            try:
+                self._socket.sendall(
+                    json.dumps(dict(fields, op=op, id=request_id)).encode("utf-8")
+                    + b"\n"
+                )
+                line = self._reader.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise ConnectionError("Summarizer daemon closed the connection")
+        response = json.loads(line)
+        self.last_latency = response.get("latency")
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response
+
+    def _summarize(self, op: str, text: str, params: dict) -> str:
+        params = {k: v for k, v in params.items() if v is not None}
+        return self.request(op, text=text, params=params)["summary"]
+
+    def summarize_text(
+        self, text, max_length=200, min_length=80, summarizer=None, cache=None
+    ) -> str:
+        _check_remote(summarizer=summarizer, cache=cache)
+        return self._summarize(
+            "summarize_text",
+            text,
+            dict(max_length=max_length, min_length=min_length, cache=cache),
+        )
+
+    def summarize_long_text(
+        self,
+        text,
+        tokenizer=None,
+        summarizer=None,
+        target_tokens_per_chunk=400,
+        batch_size=8,
+        cache=None,
+        fan_in=4,
+        prefilter_ratio=None,
+        prefilter_max_tokens=None,
+    ) -> str:
+        _check_remote(summarizer=summarizer, tokenizer=tokenizer, cache=cache)
+        params = dict(
+            target_tokens_per_chunk=target_tokens_per_chunk,
+            batch_size=batch_size,
+            cache=cache,
+            fan_in=fan_in,
+            prefilter_ratio=prefilter_ratio,
+            prefilter_max_tokens=prefilter_max_tokens,
+        )
+        return self._summarize("summarize_long_text", text, params)
+
+    def ping(self) -> bool:
+        return self.request("ping").get("ok", False)
+
+    def stats(self) -> dict:
+        return self.request("stats")["stats"]
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._reader.close()
+            self._socket.close()
+        self._socket = self._reader = None
+
+
+_client = None
+_warned = False
+
+
+def _with_daemon(op: str, text, kwargs):
+    global _client, _warned
+    # A summarizer, tokenizer or cache object only exists in this process
+    if not _remote_problem(
+        kwargs.get("summarizer"), kwargs.get("tokenizer"), kwargs.get("cache")
+    ):
+        if _client is None:
+            _client = DaemonClient()
+        try:
+            return getattr(_client, op)(text, **kwargs)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not _warned:
+                print(
+                    f"⚠️ No summarizer daemon at {default_address()}; summarizing in-process."
+                )
+                _warned = True
+    return getattr(local, op)(text, **kwargs)
+
+
+def summarize_text(
+    text, max_length=200, min_length=80, summarizer=None, cache=None
+) -> str:
+    """`summarizer.summarize_text` through the daemon when one is running."""
+    return _with_daemon(
+        "summarize_text",
+        text,
+        dict(
+            max_length=max_length,
+            min_length=min_length,
+            summarizer=summarizer,
+            cache=cache,
+        ),
+    )
+
+
+def summarize_long_text(
+    text,
+    tokenizer=None,
+    summarizer=None,
+    target_tokens_per_chunk=400,
+    batch_size=8,
+    cache=None,
+    fan_in=4,
+    prefilter_ratio=None,
+    prefilter_max_tokens=None,
+) -> str:
+    """`summarizer.summarize_long_text` through the daemon when one is running."""
+    return _with_daemon(
+        "summarize_long_text",
+        text,
+        dict(
+            tokenizer=tokenizer,
+            summarizer=summarizer,
+            target_tokens_per_chunk=target_tokens_per_chunk,
+            batch_size=batch_size,
+            cache=cache,
+            fan_in=fan_in,
+            prefilter_ratio=prefilter_ratio,
+            prefilter_max_tokens=prefilter_max_tokens,
+        ),
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve summaries from one warm model, batching concurrent requests."
+    )
+    parser.add_argument("command", choices=("serve", "ping", "stats"))
+    parser.add_argument(
+        "--address",
+        help=f"socket path or host:port (default: SUMMARIZER_DAEMON or {DEFAULT_ADDRESS})",
+    )
+    parser.add_argument(
+        "--backend", help="summarizer backend (default: SUMMARIZER_BACKEND or bart)"
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=16, help="largest merged batch"
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=10.0,
+        help="how long a request waits for batch-mates",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=32, help="requests handled concurrently"
+    )
+    args = parser.parse_args(argv)
+    address = args.address or default_address()
+
+    if args.command == "serve":
+        daemon = SummarizerDaemon(
+            args.backend,
+            max_batch=args.max_batch,
+            max_wait=args.max_wait_ms / 1000,
+            workers=args.workers,
+        )
+        name = backends.model_name(daemon.backend)
+        try:
+            asyncio.run(
+                daemon.serve(
+                    address,
+                    on_ready=lambda: print(
+                        f"✅ Summarizer daemon ({name}) listening on {address}"
+                    ),
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    client = DaemonClient(address, timeout=10)
+    try:
+        if args.command == "ping":
+            started = time.perf_counter()
+            client.ping()
+            print(
+                f"✅ Daemon at {address} answered in {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+        else:
+            print(json.dumps(client.stats(), indent=1))
+    except (OSError, DaemonError) as e:
+        print(f"❌ No daemon at {address}:", e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,253 @@
+"""Speed/quality comparison of summarizer backends, e.g. full vs quantized BART.
+
+A fixed set of chapters (evenly spaced through the given books, so reruns
+see the same text) is summarized by a baseline backend and by each candidate.
+The report gives model load time, per-chapter latency, resident memory and
+ROUGE-1/2/L overlap of every candidate's summaries with the baseline's,
+which is what a quantized model costs in wording against what it saves.
+`--prefilter RATIO` adds the baseline backend reading only the most central
+sentences of each chunk as a candidate, with the input tokens it saved.
+
+Usage:
+    python -m src.evaluation books/pride.txt --baseline bart --candidate bart-int8 --candidate bart-bf16
+    python -m src.evaluation books/pride.txt --prefilter 0.5 --prefilter 0.3
+"""
+
+import argparse
+import gc
+import json
+import re
+import statistics
+import time
+from collections import Counter
+
+try:
+    from . import backends, metrics, models
+    from .fsutil import atomic_write_text
+    from .ingest import load_book, clean_gutenberg_text
+    from .structure import split_into_chapters
+    from .summarizer import summarize_tree
+except ImportError:
+    import backends
+    import metrics
+    import models
+    from fsutil import atomic_write_text
+    from ingest import load_book, clean_gutenberg_text
+    from structure import split_into_chapters
+    from summarizer import summarize_tree
+
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _scores(overlap: int, candidate_total: int, reference_total: int) -> dict:
+    precision = overlap / candidate_total if candidate_total else 0.0
+    recall = overlap / reference_total if reference_total else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def rouge_n(candidate: str, reference: str, n: int = 1) -> dict:
+    """ROUGE-N precision, recall and F1 over lowercased word n-grams."""
+
+    def grams(tokens):
+        return Counter(tuple(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+
+    cand, ref = grams(_tokens(candidate)), grams(_tokens(reference))
+    return _scores(sum((cand & ref).values()), sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(candidate: str, reference: str) -> dict:
+    """ROUGE-L from the longest common subsequence of words."""
+    cand, ref = _tokens(candidate), _tokens(reference)
+    previous = [0] * (len(ref) + 1)
+    for word in cand:
+        current = [0]
+        for j, other in enumerate(ref):
+            current.append(
+                previous[j] + 1 if word == other else max(previous[j + 1], current[j])
+            )
+        previous = current
+    return _scores(previous[-1], len(cand), len(ref))
+
+
+def rouge(candidate: str, reference: str) -> dict:
+    """F1 of ROUGE-1, ROUGE-2 and ROUGE-L."""
+    return {
+        "rouge1": rouge_n(candidate, reference, 1)["f1"],
+        "rouge2": rouge_n(candidate, reference, 2)["f1"],
+        "rougeL": rouge_l(candidate, reference)["f1"],
+    }
+
+
+def sample_chapters(paths: list[str], count: int = 6) -> list[dict]:
+    """`count` chapters spread evenly over the books, in a stable order."""
+    chapters = []
+    for path in paths:
+        for chapter in split_into_chapters(clean_gutenberg_text(load_book(path))):
+            chapters.append(dict(chapter, book=path))
+    if len(chapters) <= count:
+        return chapters
+    step = len(chapters) / count
+    return [chapters[int(i * step)] for i in range(count)]
+
+
+def run_backend(summarizer, texts: list[str], label: str = None, **options) -> dict:
+    """Summarize `texts` with one backend, timing the load and every text."""
+    name = label or (
+        summarizer if isinstance(summarizer, str) else backends.model_name(summarizer)
+    )
+    summarizer = backends.resolve(summarizer)
+    gc.collect()
+    rss_before = metrics.current_rss_bytes()
+
+    started = time.perf_counter()
+    # Loads the model
+    summarizer(["Warm up."], max_length=8, min_length=1, do_sample=False)
+    load_seconds = time.perf_counter() - started
+
+    outputs, latencies = [], []
+    input_tokens = tokens_saved = 0
+    for text in texts:
+        started = time.perf_counter()
+        tree = summarize_tree(text, summarizer=summarizer, cache=False, **options)
+        latencies.append(time.perf_counter() - started)
+        outputs.append(tree.summary)
+        input_tokens += tree.input_tokens
+        tokens_saved += tree.tokens_saved
+
+    rss_after = metrics.current_rss_bytes()
+    return {
+        "backend": name,
+        "load_seconds": load_seconds,
+        "total_seconds": sum(latencies),
+        "latency": {
+            "mean": statistics.fmean(latencies) if latencies else 0.0,
+            "median": statistics.median(latencies) if latencies else 0.0,
+            "max": max(latencies, default=0.0),
+        },
+        "rss_delta_bytes": (
+            rss_after - rss_before
+            if rss_before is not None and rss_after is not None
+            else None
+        ),
+        "peak_rss_bytes": metrics.peak_rss_bytes(),
+        "input_tokens": input_tokens,
+        "tokens_saved": tokens_saved,
+        "outputs": outputs,
+    }
+
+
+def compare_backends(
+    texts: list[str],
+    baseline="bart",
+    candidates=("bart-int8",),
+    prefilter_ratios=(),
+    **options,
+) -> dict:
+    """
+    Run the baseline and every candidate over `texts` and score candidates against the baseline.
+
+    Each ratio in `prefilter_ratios` adds a run of the baseline backend with
+    the extractive pre-filter keeping that share of every chunk.
+    """
+    jobs = [(summarizer, None, {}) for summarizer in (baseline, *candidates)]
+    name = baseline if isinstance(baseline, str) else backends.model_name(baseline)
+    for ratio in prefilter_ratios:
+        jobs.append(
+            (baseline, f"{name}+prefilter@{ratio:g}", {"prefilter_ratio": ratio})
+        )
+    runs = []
+    for summarizer, label, extra in jobs:
+        runs.append(run_backend(summarizer, texts, label=label, **options, **extra))
+        models.unload()  # measure each model's memory on its own
+
+    reference = runs[0]
+    for run in runs[1:]:
+        scores = [
+            rouge(out, ref) for out, ref in zip(run["outputs"], reference["outputs"])
+        ]
+        run["rouge"] = {
+            key: statistics.fmean(s[key] for s in scores) if scores else 0.0
+            for key in ("rouge1", "rouge2", "rougeL")
+        }
+        run["speedup"] = (
+            reference["total_seconds"] / run["total_seconds"]
+            if run["total_seconds"]
+            else None
+        )
+    return {"texts": len(texts), "baseline": reference, "candidates": runs[1:]}
+
+
+def _format_row(run: dict) -> str:
+    rss = run["rss_delta_bytes"]
+    memory = f"{rss / 2**20:8.0f} MB" if rss is not None else "       n/a"
+    quality = "".join(
+        f"  {key} {value:.3f}" for key, value in run.get("rouge", {}).items()
+    )
+    speedup = f"  ×{run['speedup']:.2f}" if run.get("speedup") else ""
+    if run["tokens_saved"]:
+        speedup += f"  -{run['tokens_saved'] / max(run['input_tokens'], 1):.0%} tokens"
+    return (
+        f"{run['backend']:<32} load {run['load_seconds']:6.1f}s  "
+        f"median {run['latency']['median']:6.2f}s/chapter  memory {memory}{speedup}{quality}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare summarizer backends on latency, memory and ROUGE overlap."
+    )
+    parser.add_argument("books", nargs="+", help="book files to draw chapters from")
+    parser.add_argument(
+        "--chapters", type=int, default=6, help="number of chapters to summarize"
+    )
+    parser.add_argument(
+        "--baseline", default="bart", help="reference backend (default: bart)"
+    )
+    parser.add_argument(
+        "--candidate",
+        action="append",
+        dest="candidates",
+        help=f"backend to compare (repeatable, default: bart-int8; available: {', '.join(backends.available_backends())})",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="append",
+        type=float,
+        dest="prefilter_ratios",
+        metavar="RATIO",
+        help="also run the baseline with the extractive pre-filter keeping this share of each chunk (repeatable)",
+    )
+    parser.add_argument(
+        "--output", help="write the full report, summaries included, as JSON"
+    )
+    args = parser.parse_args(argv)
+
+    chapters = sample_chapters(args.books, args.chapters)
+    report = compare_backends(
+        [ch["content"] for ch in chapters],
+        baseline=args.baseline,
+        candidates=(
+            args.candidates
+            if args.candidates is not None
+            else ([] if args.prefilter_ratios else ["bart-int8"])
+        ),
+        prefilter_ratios=args.prefilter_ratios or (),
+    )
+    report["chapters"] = [{"book": ch["book"], "title": ch["title"]} for ch in chapters]
+    for run in (report["baseline"], *report["candidates"]):
+        print(_format_row(run))
+    if args.output:
+        atomic_write_text(args.output, json.dumps(report, ensure_ascii=False, indent=1))
+    print(
+        f"✅ Compared {len(report['candidates'])} backend(s) against {args.baseline} on {len(chapters)} chapters"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
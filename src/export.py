@@ -0,0 +1,285 @@
+"""Streaming, resumable export of chapter summaries to several formats.
+
+An `ExportSession` takes chapter results as they are produced, in any order.
+Each result is first appended to a journal (`<base>.journal.jsonl`) and
+fsync'd: that line is the checkpoint. The result is then rendered by every
+writer (Markdown, JSONL, HTML, Anki CSV) and appended to their output files
+in chapter order, waiting only for earlier chapters that are still running.
+
+If a run dies, opening a session on the same base path reads the journal
+(dropping a torn last line), rewrites the outputs from it and reports the
+chapters already done, so only the rest need inference. Given per-chapter
+content fingerprints, a session only trusts journal entries for chapters
+whose text is unchanged, so an edited book never gets stale summaries. `finish` writes the
+footers and removes the journal, unless chapters failed: then it is kept so
+the next run retries just those.
+"""
+
+import csv
+import html
+import io
+import json
+import os
+import textwrap
+import threading
+
+try:
+    from . import metrics
+    from .fsutil import atomic_write_text
+except ImportError:
+    import metrics
+    from fsutil import atomic_write_text
+
+JOURNAL_VERSION = 1
+
+
+class MarkdownWriter:
+    extension = ".md"
+
+    def __init__(self, book_title: str = ""):
+        self.book_title = book_title
+
+    def header(self) -> str:
+        return ""
+
+    def render(self, index: int, title: str, summary: str) -> str:
+        return f"## {title}\n\n{textwrap.fill(summary, width=100)}\n\n"
+
+    def footer(self) -> str:
+        return ""
+
+
+class JsonlWriter(MarkdownWriter):
+    extension = ".jsonl"
+
+    def render(self, index: int, title: str, summary: str) -> str:
+        return (
+            json.dumps(
+                {"index": index, "title": title, "summary": summary}, ensure_ascii=False
+            )
+            + "\n"
+        )
+
+
+class HtmlWriter(MarkdownWriter):
+    extension = ".html"
+
+    def header(self) -> str:
+        title = html.escape(self.book_title or "Summaries")
+        return (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{title}</title>\n</head>\n<body>\n<h1>{title}</h1>\n"
+        )
+
+    def render(self, index: int, title: str, summary: str) -> str:
+        paragraphs = "".join(
+            f"<p>{html.escape(p.strip())}</p>\n"
+            for p in summary.split("\n\n")
+            if p.strip()
+        )
+        return f'<section id="chapter-{index + 1}">\n<h2>{html.escape(title)}</h2>\n{paragraphs}</section>\n'
+
+    def footer(self) -> str:
+        return "</body>\n</html>\n"
+
+
+class AnkiCsvWriter(MarkdownWriter):
+    """Front/back/tags rows importable as Anki basic notes."""
+
+    extension = ".anki.csv"
+
+    def header(self) -> str:
+        return "#separator:Comma\n#html:false\n#columns:Front,Back,Tags\n"
+
+    def render(self, index: int, title: str, summary: str) -> str:
+        front = f"{self.book_title}: {title}" if self.book_title else title
+        tag = "_".join(self.book_title.split()) or "book"
+        row = io.StringIO()
+        csv.writer(row, lineterminator="\n").writerow(
+            [f"What happens in {front}?", summary, tag]
+        )
+        return row.getvalue()
+
+
+WRITERS = {
+    "markdown": MarkdownWriter,
+    "jsonl": JsonlWriter,
+    "html": HtmlWriter,
+    "anki": AnkiCsvWriter,
+}
+
+
+def register_writer(name: str, writer) -> None:
+    """Make a writer class (header/render/footer, `extension`) available by name."""
+    WRITERS[name] = writer
+
+
+def writer_for_path(path: str, default: str = "markdown") -> str:
+    """Name of the writer whose extension `path` ends with (longest match wins)."""
+    matches = [
+        name for name, writer in WRITERS.items() if path.endswith(writer.extension)
+    ]
+    return (
+        max(matches, key=lambda name: len(WRITERS[name].extension))
+        if matches
+        else default
+    )
+
+
+def render(chapter_summaries, fmt: str = "markdown", book_title: str = "") -> str:
+    """Whole document for a list of (chapter_title, summary) tuples."""
+    writer = WRITERS[fmt](book_title)
+    body = "".join(
+        writer.render(i, title, summary)
+        for i, (title, summary) in enumerate(chapter_summaries)
+    )
+    return writer.header() + body + writer.footer()
+
+
+def write_summaries(
+    chapter_summaries, output_path: str, fmt: str = None, book_title: str = ""
+) -> None:
+    """Write a finished list of (chapter_title, summary) tuples atomically."""
+    atomic_write_text(
+        output_path,
+        render(chapter_summaries, fmt or writer_for_path(output_path), book_title),
+    )
+
+
+def _append(path: str, text: str) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ExportSession:
+    """
+    Append chapter results to every output as they arrive; resumable after a crash.
+
+    Nothing is written until the first `add`, `skip` or `finish`, so a session
+    can be opened just to see which chapters a previous run completed.
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        formats=("markdown",),
+        book_title: str = "",
+        chapters: int = None,
+        fingerprints: list = None,
+    ):
+        unknown = [fmt for fmt in formats if fmt not in WRITERS]
+        if unknown:
+            raise ValueError(f"Unknown export formats: {', '.join(unknown)}")
+        if fingerprints is not None and chapters is None:
+            chapters = len(fingerprints)
+        self.base_path = base_path
+        self.book_title = book_title
+        self.chapters = chapters
+        self.fingerprints = fingerprints
+        self.writers = {fmt: WRITERS[fmt](book_title) for fmt in formats}
+        self.paths = {
+            fmt: base_path + writer.extension for fmt, writer in self.writers.items()
+        }
+        self.journal_path = base_path + ".journal.jsonl"
+        self.completed = {}  # index → (title, summary), from the journal and this run
+        self._skipped = set()
+        self._next = 0  # first chapter not yet appended to the outputs
+        self._meta = {
+            "version": JOURNAL_VERSION,
+            "chapters": chapters,
+            "formats": sorted(self.writers),
+        }
+        self._valid_bytes = 0
+        self._opened = False
+        self._lock = threading.Lock()
+        self._read_journal()
+
+    def _read_journal(self) -> None:
+        meta = self._meta
+        records, valid_bytes = [], 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                lines = f.read().split(b"\n")
+            try:
+                header = json.loads(lines[0])
+                if {k: header.get(k) for k in meta} == meta:
+                    valid_bytes = len(lines[0]) + 1
+                    # The last piece has no newline: empty or torn
+                    for line in lines[1:-1]:
+                        records.append(json.loads(line))
+                        valid_bytes += len(line) + 1
+            except ValueError:
+                pass  # keep the records read before the corrupt line
+        self._valid_bytes = valid_bytes
+        for record in records:
+            index = record["index"]
+            if (
+                self.fingerprints is None
+                or record.get("source") == self.fingerprints[index]
+            ):
+                self.completed[index] = (record["title"], record["summary"])
+            else:
+                self.completed.pop(index, None)  # the chapter's text changed since
+
+    def _open(self) -> None:
+        """Drop a torn journal tail (or start a journal) and rebuild the outputs from it."""
+        if self._opened:
+            return
+        self._opened = True
+        if self._valid_bytes:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(self._valid_bytes)
+        else:
+            atomic_write_text(self.journal_path, json.dumps(self._meta) + "\n")
+        for fmt, writer in self.writers.items():
+            atomic_write_text(self.paths[fmt], writer.header())
+        self._flush()
+
+    def _flush(self) -> None:
+        parts = {fmt: [] for fmt in self.writers}
+        while self._next in self.completed or self._next in self._skipped:
+            if self._next in self.completed:
+                title, summary = self.completed[self._next]
+                for fmt, writer in self.writers.items():
+                    parts[fmt].append(writer.render(self._next, title, summary))
+            self._next += 1
+        for fmt, chunk in parts.items():
+            if chunk:
+                _append(self.paths[fmt], "".join(chunk))
+
+    @metrics.instrument("write")
+    def add(self, index: int, title: str, summary: str) -> None:
+        """Checkpoint one chapter's summary and append whatever is now in order."""
+        with self._lock:
+            self._open()
+            if index in self.completed:
+                return
+            record = {"index": index, "title": title, "summary": summary}
+            if self.fingerprints is not None:
+                record["source"] = self.fingerprints[index]
+            line = json.dumps(record, ensure_ascii=False)
+            _append(self.journal_path, line + "\n")
+            self.completed[index] = (title, summary)
+            self._flush()
+
+    def skip(self, index: int) -> None:
+        """Leave a failed chapter out of this run's outputs (it is retried on resume)."""
+        with self._lock:
+            self._open()
+            self._skipped.add(index)
+            self._flush()
+
+    def finish(self) -> list[str]:
+        """Append anything still waiting and write footers; returns the output paths."""
+        with self._lock:
+            self._open()
+            pending = sorted(i for i in self.completed if i >= self._next)
+            for fmt, writer in self.writers.items():
+                body = "".join(writer.render(i, *self.completed[i]) for i in pending)
+                _append(self.paths[fmt], body + writer.footer())
+            self._next = (pending[-1] + 1) if pending else self._next
+            if not self._skipped:
+                os.remove(self.journal_path)
+            return list(self.paths.values())
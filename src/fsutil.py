@@ -0,0 +1,31 @@
+"""Small filesystem helpers shared by the cache, manifests and exporters."""
+
+import os
+import tempfile
+
+
+def atomic_write_bytes(path: str, data: bytes, fsync: bool = True) -> None:
+    """Write `data` to `path` so readers only ever see the old or the new file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=".tmp-", suffix=os.path.basename(path)
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, text: str, fsync: bool = True) -> None:
+    """Text counterpart of `atomic_write_bytes` (always UTF-8)."""
+    atomic_write_bytes(path, text.encode("utf-8"), fsync=fsync)
@@ -0,0 +1,423 @@
+"""Chapter-level manifest for incremental re-ingestion of a corpus.
+
+For every book the manifest records the file hash, the detected structure,
+a content hash per chapter with its summary, and the outputs written. A
+re-run diffs the freshly split chapters against it by content hash, so only
+chapters whose text actually changed are summarized again; a corrected
+license header or a re-downloaded but identical file costs no model time.
+With a `dedup.DedupIndex`, a changed chapter that is identical or nearly
+identical to one already summarized anywhere in the corpus (another edition
+of the same book) reuses that summary too.
+
+Usage:
+    python -m src.manifest books/ --output-dir summaries/ --manifest book_manifest.json --dedup-index dedup_index.npz
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+try:
+    from . import backends
+    from .corpus import BOOK_PATTERNS, discover_books, output_names
+    from .dedup import DedupIndex
+    from .fsutil import atomic_write_text
+    from .ingest import load_book, clean_gutenberg_text
+    from .structure import detect_and_split
+    from .summarizer import summarize_tree, save_summaries
+except ImportError:
+    import backends
+    from corpus import BOOK_PATTERNS, discover_books, output_names
+    from dedup import DedupIndex
+    from fsutil import atomic_write_text
+    from ingest import load_book, clean_gutenberg_text
+    from structure import detect_and_split
+    from summarizer import summarize_tree, save_summaries
+
+MANIFEST_VERSION = 1
+# summarize_tree options that change a summary; recorded so a change of any forces re-summarizing
+GENERATION_DEFAULTS = {
+    "target_tokens_per_chunk": 400,
+    "fan_in": 4,
+    "prefilter_ratio": None,
+    "prefilter_max_tokens": None,
+}
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chapter_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def setup_key(summarizer_name: str, generation: dict) -> str:
+    """What a recorded summary depends on besides the chapter text: the backend and its options."""
+    return json.dumps([summarizer_name, generation], sort_keys=True)
+
+
+def _entry_key(entry: dict) -> str:
+    return setup_key(entry.get("summarizer"), entry.get("generation"))
+
+
+class Manifest:
+    """A JSON file of per-book entries, rewritten atomically on every save."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.books = {}
+        self._summaries = (
+            None  # (setup key, chapter hash) → summary, built on first lookup
+        )
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.books = data.get("books", {})
+            else:
+                print(
+                    f"⚠️ Ignoring manifest {path} with unsupported version {data.get('version')!r}."
+                )
+
+    def get(self, book_path: str):
+        return self.books.get(os.path.normpath(book_path))
+
+    def update(self, book_path: str, entry: dict) -> None:
+        self.books[os.path.normpath(book_path)] = entry
+        if self._summaries is not None:
+            self._index_summaries(entry)
+
+    def remove(self, book_path: str) -> None:
+        if self.books.pop(os.path.normpath(book_path), None) is not None:
+            self._summaries = None
+
+    def _index_summaries(self, entry: dict) -> None:
+        for ch in entry.get("chapters", []):
+            if ch.get("summary"):
+                self._summaries[(_entry_key(entry), ch["hash"])] = ch["summary"]
+
+    def find_summary(self, content_hash: str, key: str):
+        """Summary of a chapter with this content hash made with the `setup_key` `key` in any book, or None."""
+        if self._summaries is None:
+            self._summaries = {}
+            for entry in self.books.values():
+                self._index_summaries(entry)
+        return self._summaries.get((key, content_hash))
+
+    def save(self) -> None:
+        data = {"version": MANIFEST_VERSION, "books": self.books}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=1))
+
+
+def diff_chapters(entry, chapters: list, key: str) -> tuple[dict, list[int]]:
+    """
+    Match chapters against a manifest entry by content hash.
+
+    Returns the reusable summaries by chapter index and the indices that need
+    summarizing. Nothing is reused if the entry was made with another summarizer
+    or other generation options (another `setup_key`).
+    """
+    known = {}
+    if entry and _entry_key(entry) == key:
+        known = {
+            ch["hash"]: ch["summary"]
+            for ch in entry.get("chapters", [])
+            if ch.get("summary") is not None
+        }
+
+    reused, changed = {}, []
+    for i, chapter in enumerate(chapters):
+        summary = known.get(chapter_hash(chapter["content"]))
+        if summary is None:
+            changed.append(i)
+        else:
+            reused[i] = summary
+    return reused, changed
+
+
+def dedup_chapters(
+    chapters: list, indices: list[int], manifest: Manifest, key: str, index: DedupIndex
+) -> dict:
+    """
+    Find summaries for `indices` among duplicate chapters elsewhere in the corpus.
+
+    Identical text is matched by content hash, near-duplicates through `index`.
+    Every chapter looked at is added to `index` so later books can match it.
+    """
+    found = {}
+    for i in indices:
+        content = chapters[i]["content"]
+        digest = chapter_hash(content)
+        summary = manifest.find_summary(digest, key)
+        if summary is None:
+            signature = index.fingerprint(content)
+            for match, _ in index.query(signature):
+                summary = manifest.find_summary(match, key)
+                if summary is not None:
+                    break
+            index.add(digest, signature)
+        if summary is not None:
+            found[i] = summary
+    return found
+
+
+def refresh_book(
+    path: str,
+    manifest: Manifest,
+    output_path: str,
+    summarizer=None,
+    save: bool = True,
+    dedup: DedupIndex = None,
+    generation: dict = None,
+) -> dict:
+    """
+    Bring one book's summaries up to date, re-summarizing only changed chapters.
+
+    `generation` overrides `summarize_tree` options (see `GENERATION_DEFAULTS`).
+    Returns counts of chapters reused, deduplicated, summarized and failed; a
+    chapter fails when any of its chunks does, and is recorded without a
+    summary so the next run retries it. If the file hash, summarizer and
+    options match the manifest, no chapter failed last time and the output
+    still exists, nothing is read beyond the hash.
+    """
+    summarizer = backends.resolve(summarizer)
+    name = backends.model_name(summarizer)
+    options = dict(GENERATION_DEFAULTS, **(generation or {}))
+    key = setup_key(name, options)
+    digest = file_hash(path)
+    entry = manifest.get(path)
+    stats = {
+        "path": path,
+        "chapters": 0,
+        "reused": 0,
+        "deduplicated": 0,
+        "summarized": 0,
+        "failed": 0,
+        "unchanged": False,
+    }
+
+    complete = entry and all(
+        ch.get("summary") is not None for ch in entry.get("chapters", [])
+    )
+    if complete and entry.get("file_hash") == digest and _entry_key(entry) == key:
+        stats.update(
+            chapters=len(entry["chapters"]),
+            reused=len(entry["chapters"]),
+            unchanged=True,
+        )
+        if output_path in entry.get("outputs", []) and os.path.exists(output_path):
+            return stats
+        # Only the output went missing: rebuild it from the recorded summaries
+        chapters = entry["chapters"]
+        save_summaries(
+            [
+                (ch["title"], ch["summary"])
+                for ch in chapters
+                if ch.get("summary") is not None
+            ],
+            output_path,
+        )
+        entry["outputs"] = sorted(set(entry.get("outputs", [])) | {output_path})
+        manifest.update(path, entry)
+        if save:
+            manifest.save()
+        return stats
+
+    structure, chapters = detect_and_split(clean_gutenberg_text(load_book(path)))
+    reused, changed = diff_chapters(entry, chapters, key)
+    duplicates = {}
+    if dedup is not None:
+        duplicates = dedup_chapters(chapters, changed, manifest, key, dedup)
+        changed = [i for i in changed if i not in duplicates]
+        for i in reused:  # summarized before the index existed
+            if chapter_hash(chapters[i]["content"]) not in dedup:
+                dedup.add(
+                    chapter_hash(chapters[i]["content"]),
+                    dedup.fingerprint(chapters[i]["content"]),
+                )
+
+    summaries = {**reused, **duplicates}
+    failed = 0
+    for i in changed:
+        try:
+            tree = summarize_tree(
+                chapters[i]["content"], summarizer=summarizer, **(generation or {})
+            )
+            if tree.failed or not tree.summary:
+                # A partial summary would be reused as if complete
+                raise RuntimeError(
+                    f"{tree.failed} of its chunks could not be summarized"
+                )
+            summaries[i] = tree.summary
+        except Exception as e:
+            failed += 1
+            print(f"❌ Error summarizing {chapters[i]['title']}:", e)
+
+    records = [
+        {
+            "title": ch["title"],
+            "hash": chapter_hash(ch["content"]),
+            "summary": summaries.get(i),
+        }
+        for i, ch in enumerate(chapters)
+    ]
+    save_summaries(
+        [(r["title"], r["summary"]) for r in records if r["summary"] is not None],
+        output_path,
+    )
+    manifest.update(
+        path,
+        {
+            "file_hash": digest,
+            "structure": structure,
+            "summarizer": name,
+            "generation": options,
+            "chapters": records,
+            "outputs": [output_path],
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+    )
+    if save:
+        manifest.save()
+
+    stats.update(
+        chapters=len(chapters),
+        reused=len(reused),
+        deduplicated=len(duplicates),
+        summarized=len(changed) - failed,
+        failed=failed,
+    )
+    return stats
+
+
+def refresh_corpus(
+    directory: str,
+    manifest_path: str,
+    output_dir: str,
+    summarizer=None,
+    patterns=BOOK_PATTERNS,
+    dedup_path: str = None,
+    dedup_threshold: float = 0.8,
+    generation: dict = None,
+) -> list[dict]:
+    """Refresh every book under `directory` and forget books that no longer exist."""
+    manifest = Manifest(manifest_path)
+    dedup = DedupIndex(dedup_path, threshold=dedup_threshold) if dedup_path else None
+    paths = discover_books(directory, patterns)
+    names = output_names(paths, directory)
+    results = []
+    for path in paths:
+        output_path = os.path.join(output_dir, names[path] + ".md")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        results.append(
+            refresh_book(
+                path,
+                manifest,
+                output_path,
+                summarizer=summarizer,
+                dedup=dedup,
+                generation=generation,
+            )
+        )
+        if dedup is not None:
+            dedup.save()
+
+    present = {os.path.normpath(path) for path in paths}
+    root = os.path.normpath(directory)
+    for book_path in list(manifest.books):
+        if book_path.startswith(root + os.sep) and book_path not in present:
+            manifest.remove(book_path)
+    manifest.save()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-summarize only the chapters that changed since the last run."
+    )
+    parser.add_argument("directory", help="directory containing book files")
+    parser.add_argument(
+        "--output-dir", default="summaries", help="where the Markdown summaries go"
+    )
+    parser.add_argument(
+        "--manifest",
+        default="book_manifest.json",
+        help="manifest recording chapter hashes",
+    )
+    parser.add_argument(
+        "--backend", help="summarizer backend (default: SUMMARIZER_BACKEND or bart)"
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help=f"glob pattern for book files (repeatable, default: {' '.join(BOOK_PATTERNS)})",
+    )
+    parser.add_argument(
+        "--dedup-index",
+        help="reuse summaries of near-duplicate chapters, indexed in this .npz file",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=0.8,
+        help="minimum estimated Jaccard similarity",
+    )
+    parser.add_argument(
+        "--prefilter-ratio",
+        type=float,
+        help="keep only the most central sentences, about this share of each chunk",
+    )
+    parser.add_argument(
+        "--prefilter-max-tokens",
+        type=int,
+        help="cap each chunk at this many model tokens",
+    )
+    args = parser.parse_args(argv)
+
+    generation = {
+        key: value
+        for key, value in (
+            ("prefilter_ratio", args.prefilter_ratio),
+            ("prefilter_max_tokens", args.prefilter_max_tokens),
+        )
+        if value is not None
+    }
+
+    started = time.perf_counter()
+    results = refresh_corpus(
+        args.directory,
+        args.manifest,
+        args.output_dir,
+        summarizer=args.backend,
+        patterns=args.patterns or BOOK_PATTERNS,
+        dedup_path=args.dedup_index,
+        dedup_threshold=args.dedup_threshold,
+        generation=generation,
+    )
+    summarized = sum(r["summarized"] for r in results)
+    reused = sum(r["reused"] for r in results)
+    deduplicated = sum(r["deduplicated"] for r in results)
+    failed = sum(r["failed"] for r in results)
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ {len(results)} books refreshed in {elapsed:.1f}s: {summarized} chapters summarized, "
+        f"{reused} reused, {deduplicated} deduplicated → {args.manifest}"
+    )
+    if failed:
+        print(
+            f"❌ {failed} chapters failed to summarize; they will be retried on the next run"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+"""Per-stage instrumentation with JSON and Prometheus text-format export.
+
+Stages (load, clean, split, chunk, summarize, write) record call counts, wall
+time, items, input/output tokens and batch sizes; free-form counters such as
+cache hits sit alongside, and peak RSS is read at export time.
+
+Instrumentation is off unless BOOK_METRICS=1 is set or `enable()` is called.
+While off, instrumented functions pay for one extra call and a flag check.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+try:
+    from .fsutil import atomic_write_text
+except ImportError:
+    from fsutil import atomic_write_text
+
+PREFIX = "book_ingestor"
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+_enabled = os.environ.get("BOOK_METRICS", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Forget everything recorded so far."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _new_stage() -> dict:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "seconds": 0.0,
+        "max_seconds": 0.0,
+        "items": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "batches": [0] * (len(BATCH_BUCKETS) + 1),
+        "batch_items": 0,
+    }
+
+
+def record(
+    stage: str,
+    seconds: float = 0.0,
+    items: int = 0,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    batch_size: int = None,
+    error: bool = False,
+    calls: int = 1,
+) -> None:
+    """Add one observation for `stage` (a no-op while instrumentation is off)."""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = _new_stage()
+        stats["calls"] += calls
+        stats["errors"] += int(error)
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["items"] += items
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        if batch_size is not None:
+            bucket = next(
+                (i for i, bound in enumerate(BATCH_BUCKETS) if batch_size <= bound),
+                len(BATCH_BUCKETS),
+            )
+            stats["batches"][bucket] += 1
+            stats["batch_items"] += batch_size
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Bump a free-form counter such as `cache_hits`."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def instrument(stage: str, measure=None):
+    """
+    Decorate a function so each call is recorded under `stage`.
+
+    `measure(result)` may return extra `record` fields (items, input_tokens, ...).
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                record(stage, time.perf_counter() - started, error=True)
+                raise
+            record(
+                stage,
+                time.perf_counter() - started,
+                **(measure(result) if measure else {}),
+            )
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+def current_rss_bytes():
+    """Current resident set size (Linux /proc), falling back to the peak elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def snapshot() -> dict:
+    """Everything recorded so far, with derived throughput, as plain data."""
+    with _lock:
+        stages = {
+            name: dict(stats, batches=list(stats["batches"]))
+            for name, stats in _stages.items()
+        }
+        counters = dict(_counters)
+
+    for stats in stages.values():
+        seconds = stats["seconds"]
+        tokens = stats["input_tokens"] + stats["output_tokens"]
+        stats["tokens_per_second"] = tokens / seconds if seconds and tokens else 0.0
+        batches = stats.pop("batches")
+        if any(batches):
+            labels = [str(bound) for bound in BATCH_BUCKETS] + ["+Inf"]
+            stats["batch_sizes"] = {
+                label: count for label, count in zip(labels, batches) if count
+            }
+            stats["mean_batch_size"] = stats["batch_items"] / sum(batches)
+        del stats["batch_items"]
+    return {"stages": stages, "counters": counters, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def to_prometheus() -> str:
+    """Render the current metrics in the Prometheus text exposition format."""
+    with _lock:
+        stages = {
+            name: dict(stats, batches=list(stats["batches"]))
+            for name, stats in _stages.items()
+        }
+        counters = dict(_counters)
+
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+        lines.extend(f"{PREFIX}_{name}{labels} {value}" for labels, value in samples)
+
+    per_stage = [
+        ("stage_calls_total", "calls", "Calls per pipeline stage."),
+        ("stage_errors_total", "errors", "Calls that raised, per pipeline stage."),
+        ("stage_seconds_total", "seconds", "Wall time spent per pipeline stage."),
+        (
+            "stage_items_total",
+            "items",
+            "Items (chapters, chunks, summaries) produced per stage.",
+        ),
+        (
+            "stage_input_tokens_total",
+            "input_tokens",
+            "Input tokens processed per stage.",
+        ),
+        (
+            "stage_output_tokens_total",
+            "output_tokens",
+            "Output tokens produced per stage.",
+        ),
+    ]
+    for metric, key, help_text in per_stage:
+        family(
+            metric,
+            "counter",
+            help_text,
+            [
+                (f'{{stage="{name}"}}', stats[key])
+                for name, stats in sorted(stages.items())
+            ],
+        )
+
+    histogram = []
+    for name, stats in sorted(stages.items()):
+        if not any(stats["batches"]):
+            continue
+        cumulative = 0
+        for bound, count in zip(
+            [str(b) for b in BATCH_BUCKETS] + ["+Inf"], stats["batches"]
+        ):
+            cumulative += count
+            histogram.append((f'_bucket{{stage="{name}",le="{bound}"}}', cumulative))
+        histogram.append((f'_sum{{stage="{name}"}}', stats["batch_items"]))
+        histogram.append((f'_count{{stage="{name}"}}', cumulative))
+    if histogram:
+        lines.append(f"# HELP {PREFIX}_batch_size Items per model call.")
+        lines.append(f"# TYPE {PREFIX}_batch_size histogram")
+        lines.extend(
+            f"{PREFIX}_batch_size{suffix} {value}" for suffix, value in histogram
+        )
+
+    for name, value in sorted(counters.items()):
+        family(
+            f"{name}_total",
+            "counter",
+            f"Count of {name.replace('_', ' ')}.",
+            [("", value)],
+        )
+
+    peak = peak_rss_bytes()
+    if peak is not None:
+        family(
+            "peak_rss_bytes",
+            "gauge",
+            "Peak resident set size of the process.",
+            [("", peak)],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_json(path: str) -> None:
+    atomic_write_text(path, json.dumps(snapshot(), indent=2))
+
+
+def write_prometheus(path: str) -> None:
+    """Write a .prom file; the atomic rename suits node_exporter's textfile collector."""
+    atomic_write_text(path, to_prometheus())
@@ -0,0 +1,141 @@
+"""Process-wide registry of lazily loaded summarization models.
+
+Nothing heavy happens at import time: each (model, device, dtype,
+quantization) combination is built the first time it is requested and then
+shared by every caller in the process.
+
+Quantization is opt-in for CPU inference: "int8" applies dynamic int8
+quantization to the model's linear layers (weights stored as int8,
+activations quantized on the fly), "bf16" casts the weights to bfloat16.
+Use `python -m src.evaluation` to measure what either costs in quality.
+"""
+
+import threading
+
+DEFAULT_MODEL = "facebook/bart-large-cnn"
+QUANTIZATION_MODES = ("int8", "bf16")
+
+_lock = threading.RLock()
+_summarizers = {}
+_tokenizers = {}
+
+
+def _registry_key(model_name: str, device, dtype, quantization=None) -> tuple:
+    return (model_name, device, str(dtype) if dtype is not None else None, quantization)
+
+
+def _load_tokenizer(model_name: str):
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def _load_summarizer(model_name: str, device, dtype, tokenizer):
+    from transformers import pipeline
+
+    kwargs = {}
+    if device is not None:
+        kwargs["device"] = device
+    if dtype is not None:
+        import torch
+
+        kwargs["torch_dtype"] = (
+            getattr(torch, dtype) if isinstance(dtype, str) else dtype
+        )
+    return pipeline("summarization", model=model_name, tokenizer=tokenizer, **kwargs)
+
+
+def _quantize(summarizer, quantization: str):
+    import torch
+
+    if quantization == "int8":
+        summarizer.model = torch.ao.quantization.quantize_dynamic(
+            summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif quantization == "bf16":
+        summarizer.model = summarizer.model.to(torch.bfloat16)
+    return summarizer
+
+
+def check_quantization(quantization, device) -> None:
+    """Reject unknown modes, and int8 anywhere but the CPU."""
+    if quantization is None:
+        return
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown quantization {quantization!r}; choose from {', '.join(QUANTIZATION_MODES)}"
+        )
+    if quantization == "int8" and device not in (None, -1, "cpu"):
+        raise ValueError("Dynamic int8 quantization runs on CPU only")
+
+
+def get_tokenizer(model_name: str = DEFAULT_MODEL):
+    """Return the shared tokenizer for `model_name`, loading it on first use."""
+    with _lock:
+        tokenizer = _tokenizers.get(model_name)
+        if tokenizer is None:
+            tokenizer = _load_tokenizer(model_name)
+            _tokenizers[model_name] = tokenizer
+        return tokenizer
+
+
+def get_summarizer(
+    model_name: str = DEFAULT_MODEL, device=None, dtype=None, quantization: str = None
+):
+    """Return the shared summarization pipeline, loading (and quantizing) it on first use."""
+    check_quantization(quantization, device)
+    key = _registry_key(model_name, device, dtype, quantization)
+    with _lock:
+        summarizer = _summarizers.get(key)
+        if summarizer is None:
+            summarizer = _load_summarizer(
+                model_name, device, dtype, get_tokenizer(model_name)
+            )
+            if quantization is not None:
+                summarizer = _quantize(summarizer, quantization)
+            _summarizers[key] = summarizer
+        return summarizer
+
+
+def register(
+    summarizer=None,
+    tokenizer=None,
+    model_name: str = DEFAULT_MODEL,
+    device=None,
+    dtype=None,
+    quantization=None,
+):
+    """Install already-built objects (e.g. test doubles) in the registry."""
+    with _lock:
+        if tokenizer is not None:
+            _tokenizers[model_name] = tokenizer
+        if summarizer is not None:
+            _summarizers[_registry_key(model_name, device, dtype, quantization)] = (
+                summarizer
+            )
+
+
+def warm_up(
+    model_name: str = DEFAULT_MODEL, device=None, dtype=None, quantization: str = None
+):
+    """Load the model ahead of time so the first request doesn't pay for it."""
+    return get_summarizer(
+        model_name, device=device, dtype=dtype, quantization=quantization
+    )
+
+
+def unload(model_name: str = None):
+    """Drop cached models (all of them, or just those for `model_name`)."""
+    with _lock:
+        for key in list(_summarizers):
+            if model_name is None or key[0] == model_name:
+                del _summarizers[key]
+        for name in list(_tokenizers):
+            if model_name is None or name == model_name:
+                del _tokenizers[name]
+
+
+def loaded_models() -> list[tuple]:
+    """List the (model, device, dtype, quantization) keys currently held in memory."""
+    with _lock:
+        return list(_summarizers)
@@ -0,0 +1,468 @@
+"""Asynchronous staged pipeline: load → clean → split → chunk → summarize → write.
+
+Each stage runs its own workers and hands items to the next stage through a
+bounded asyncio queue, so file reads, regex parsing, tokenization and model
+inference overlap while a slow stage applies backpressure instead of letting
+memory grow. Blocking work runs in executors: I/O on threads, cleaning and
+splitting on a process pool (or threads), and inference on a dedicated
+thread pool so the model is fed from a queue that upstream stages keep full.
+
+Cancelling the task running `Pipeline.run` stops every stage and drops
+queued work. Failures are isolated: a bad book or chapter is reported in the
+results and never stops the rest. Each chapter summary is checkpointed and
+appended to the outputs as soon as it is written (see export.py), so a rerun
+after a crash only summarizes the chapters that were not finished.
+
+Usage:
+    python -m src.pipeline books/ --output-dir summaries/ --backend extractive
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from . import backends, metrics, models
+    from .export import WRITERS, ExportSession
+    from .chunking import chunk_text
+    from .corpus import BOOK_PATTERNS, discover_books, output_names
+    from .ingest import book_stem, load_book, clean_gutenberg_text
+    from .manifest import chapter_hash
+    from .structure import detect_and_split
+    from .summarizer import summarize_tree
+except ImportError:
+    import backends
+    import metrics
+    import models
+    from export import WRITERS, ExportSession
+    from chunking import chunk_text
+    from corpus import BOOK_PATTERNS, discover_books, output_names
+    from ingest import book_stem, load_book, clean_gutenberg_text
+    from manifest import chapter_hash
+    from structure import detect_and_split
+    from summarizer import summarize_tree
+
+STAGES = ("load", "clean", "split", "chunk", "summarize", "write")
+DEFAULT_CONCURRENCY = {
+    "load": 4,
+    "clean": 2,
+    "split": 2,
+    "chunk": 2,
+    "summarize": 1,
+    "write": 2,
+}
+
+_DONE = object()
+
+
+class _Book:
+    def __init__(self, path: str, base_path: str):
+        self.path = path
+        self.base_path = base_path
+        self.text = None
+        self.structure = None
+        self.export = None
+        self.pending = 0
+        self.result = {"path": path, "status": "queued"}
+
+
+class _ChapterJob:
+    def __init__(self, book: _Book, index: int, chapter):
+        self.book = book
+        self.index = index
+        self.chapter = chapter
+        self.chunks = None
+        self.summary = None
+        self.error = None
+
+
+def _open_export(base_path: str, formats, title: str, chapters) -> ExportSession:
+    # Checkpoints of chapters edited since an interrupted run are not reused
+    fingerprints = [chapter_hash(chapter["content"]) for chapter in chapters]
+    return ExportSession(base_path, formats, title, fingerprints=fingerprints)
+
+
+class Pipeline:
+    """Summarize many books with every stage running concurrently."""
+
+    def __init__(
+        self,
+        output_dir: str = "summaries",
+        summarizer=None,
+        tokenizer=None,
+        queue_size: int = 4,
+        concurrency: dict = None,
+        cpu_executor: str = "process",
+        target_tokens_per_chunk: int = 400,
+        batch_size: int = 8,
+        cache=None,
+        formats=("markdown",),
+        prefilter_ratio: float = None,
+        prefilter_max_tokens: int = None,
+    ):
+        if cpu_executor not in ("process", "thread"):
+            raise ValueError("cpu_executor must be 'process' or 'thread'")
+        unknown = set(concurrency or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+        unknown = set(formats) - set(WRITERS)
+        if unknown:
+            raise ValueError(f"Unknown export formats: {', '.join(sorted(unknown))}")
+        self.output_dir = output_dir
+        self.summarizer = summarizer
+        self.tokenizer = tokenizer
+        self.queue_size = queue_size
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.cpu_executor = cpu_executor
+        self.target_tokens_per_chunk = target_tokens_per_chunk
+        self.batch_size = batch_size
+        self.cache = cache
+        self.formats = tuple(formats)
+        self.prefilter_ratio = prefilter_ratio
+        self.prefilter_max_tokens = prefilter_max_tokens
+        self.stats = {}
+
+    async def run(self, paths: list[str], root: str = None) -> list[dict]:
+        """
+        Process `paths` and return one result record per book, in input order.
+
+        Outputs are named after each book's path under `root` (by default the
+        directory the books have in common), see `corpus.output_names`.
+        """
+        summarizer = backends.resolve(self.summarizer)
+        tokenizer = (
+            self.tokenizer
+            or getattr(summarizer, "tokenizer", None)
+            or models.get_tokenizer()
+        )
+        if root is None:
+            root = (
+                os.path.commonpath(
+                    [os.path.dirname(os.path.abspath(path)) for path in paths]
+                )
+                if paths
+                else "."
+            )
+        names = output_names(paths, root)
+        books = [
+            _Book(path, os.path.join(self.output_dir, names[path])) for path in paths
+        ]
+        self.stats = {stage: {"items": 0, "busy": 0.0} for stage in STAGES}
+
+        c = self.concurrency
+        io_pool = ThreadPoolExecutor(
+            c["load"] + c["write"], thread_name_prefix="pipeline-io"
+        )
+        if self.cpu_executor == "process":
+            cpu_pool = ProcessPoolExecutor(c["clean"] + c["split"])
+        else:
+            cpu_pool = ThreadPoolExecutor(
+                c["clean"] + c["split"], thread_name_prefix="pipeline-cpu"
+            )
+        # Tokenizers aren't worth pickling to another process, so chunking stays on threads
+        chunk_pool = ThreadPoolExecutor(c["chunk"], thread_name_prefix="pipeline-chunk")
+        model_pool = ThreadPoolExecutor(
+            c["summarize"], thread_name_prefix="pipeline-model"
+        )
+        loop = asyncio.get_running_loop()
+
+        def call(pool, fn, *args, **kwargs):
+            return loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+        async def load(book):
+            raw = await call(io_pool, load_book, book.path)
+            return [(book, raw)]
+
+        async def clean(item):
+            book, raw = item
+            book.text = await call(cpu_pool, clean_gutenberg_text, raw)
+            return [book]
+
+        async def split(book):
+            book.structure, chapters = await call(cpu_pool, detect_and_split, book.text)
+            book.text = None
+            book.result.update(structure=book.structure, chapters=len(chapters))
+            if not chapters:
+                book.result["status"] = "no chapters"
+                return []
+            title = book_stem(book.path)
+            book.export = await call(
+                io_pool, _open_export, book.base_path, self.formats, title, chapters
+            )
+            # Chapters checkpointed by an interrupted run are not summarized again
+            jobs = [
+                _ChapterJob(book, i, chapter)
+                for i, chapter in enumerate(chapters)
+                if i not in book.export.completed
+            ]
+            book.pending = len(jobs)
+            book.result["resumed"] = len(chapters) - len(jobs)
+            if not jobs:
+                await self._finish_book(book, call, io_pool)
+            return jobs
+
+        async def chunk(job):
+            job.chunks = await call(
+                chunk_pool,
+                chunk_text,
+                job.chapter["content"],
+                tokenizer,
+                max_tokens=self.target_tokens_per_chunk,
+            )
+            return [job]
+
+        async def summarize(job):
+            tree = await call(
+                model_pool,
+                summarize_tree,
+                job.chapter["content"],
+                tokenizer=tokenizer,
+                summarizer=summarizer,
+                chunks=job.chunks,
+                batch_size=self.batch_size,
+                cache=self.cache,
+                prefilter_ratio=self.prefilter_ratio,
+                prefilter_max_tokens=self.prefilter_max_tokens,
+            )
+            job.chunks = None
+            if tree.failed or not tree.summary:
+                # A partial summary would pass for the whole chapter
+                raise RuntimeError(
+                    f"{tree.failed} of its chunks could not be summarized"
+                )
+            job.summary = tree.summary
+            if (
+                self.prefilter_ratio is not None
+                or self.prefilter_max_tokens is not None
+            ):
+                result = job.book.result
+                result["input_tokens"] = (
+                    result.get("input_tokens", 0) + tree.input_tokens
+                )
+                result["tokens_saved"] = (
+                    result.get("tokens_saved", 0) + tree.tokens_saved
+                )
+            return [job]
+
+        async def write(job):
+            book = job.book
+            if job.error:
+                book.result.setdefault("failed_chapters", []).append(
+                    {"title": job.chapter["title"], "error": job.error}
+                )
+            try:
+                if job.summary:
+                    await call(
+                        io_pool,
+                        book.export.add,
+                        job.index,
+                        job.chapter["title"],
+                        job.summary,
+                    )
+                else:
+                    await call(io_pool, book.export.skip, job.index)
+            except Exception as e:
+                self._fail("write", book, e)
+            finally:
+                book.pending -= 1
+            # A book whose outputs couldn't be written keeps its journal for the next run
+            if book.pending == 0 and book.result["status"] != "error":
+                await self._finish_book(book, call, io_pool)
+            return []
+
+        handlers = dict(
+            load=load,
+            clean=clean,
+            split=split,
+            chunk=chunk,
+            summarize=summarize,
+            write=write,
+        )
+        queues = [asyncio.Queue(self.queue_size) for _ in STAGES]
+        for directory in {self.output_dir} | {
+            os.path.dirname(book.base_path) for book in books
+        }:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._feed(books, queues[0]))
+                for i, stage in enumerate(STAGES):
+                    outbox = queues[i + 1] if i + 1 < len(STAGES) else None
+                    group.create_task(
+                        self._run_stage(stage, handlers[stage], queues[i], outbox)
+                    )
+        finally:
+            for pool in (io_pool, cpu_pool, chunk_pool, model_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+        return [book.result for book in books]
+
+    async def _finish_book(self, book, call, io_pool):
+        try:
+            outputs = await call(io_pool, book.export.finish)
+        except Exception as e:
+            self._fail("write", book, e)
+            return
+        book.result.update(status="ok", output=outputs[0], outputs=outputs)
+
+    async def _feed(self, books, outbox):
+        for book in books:
+            await outbox.put(book)
+        await outbox.put(_DONE)
+
+    async def _run_stage(self, stage, handler, inbox, outbox):
+        stats = self.stats[stage]
+        # Hooks fire inside worker processes, out of reach of this process's metrics
+        remote = self.cpu_executor == "process" and stage in ("clean", "split")
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    await inbox.put(_DONE)  # let sibling workers see it too
+                    return
+                started = time.perf_counter()
+                if isinstance(item, _ChapterJob) and item.error and stage != "write":
+                    # Already failed upstream; pass through to be recorded
+                    outputs = [item]
+                else:
+                    try:
+                        outputs = await handler(item)
+                    except Exception as e:
+                        outputs = self._fail(stage, item, e)
+                elapsed = time.perf_counter() - started
+                stats["items"] += 1
+                stats["busy"] += elapsed
+                if remote:
+                    metrics.record(stage, elapsed, items=1)
+                if outbox is not None:
+                    for output in outputs:
+                        await outbox.put(output)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency[stage])))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    def _fail(self, stage, item, error) -> list:
+        message = f"{stage}: {type(error).__name__}: {error}"
+        if isinstance(item, _ChapterJob):
+            print(f"❌ Error in {stage} for {item.chapter['title']}:", error)
+            item.error = message
+            return [item]  # the write stage still has to account for it
+        book = item[0] if isinstance(item, tuple) else item
+        print(f"❌ Error in {stage} for {book.path}:", error)
+        book.result.update(status="error", error=message)
+        return []
+
+
+def run_pipeline(paths: list[str], root: str = None, **kwargs) -> list[dict]:
+    """Blocking helper around `Pipeline(**kwargs).run(paths, root)`."""
+    return asyncio.run(Pipeline(**kwargs).run(paths, root))
+
+
+def _parse_concurrency(values) -> dict:
+    concurrency = {}
+    for value in values or []:
+        stage, _, count = value.partition("=")
+        concurrency[stage] = int(count)
+    return concurrency
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Summarize a directory of books with overlapping pipeline stages."
+    )
+    parser.add_argument("directory", help="directory containing book files")
+    parser.add_argument(
+        "--output-dir", default="summaries", help="where the Markdown summaries go"
+    )
+    parser.add_argument(
+        "--backend", help="summarizer backend (default: SUMMARIZER_BACKEND or bart)"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=4, help="items buffered between stages"
+    )
+    parser.add_argument(
+        "--cpu-executor", choices=("process", "thread"), default="process"
+    )
+    parser.add_argument(
+        "--concurrency",
+        action="append",
+        metavar="STAGE=N",
+        help=f"workers for a stage, e.g. summarize=1 (stages: {', '.join(STAGES)})",
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help=f"glob pattern for book files (repeatable, default: {' '.join(BOOK_PATTERNS)})",
+    )
+    parser.add_argument(
+        "--format",
+        action="append",
+        dest="formats",
+        choices=sorted(WRITERS),
+        help="output format (repeatable, default: markdown)",
+    )
+    parser.add_argument(
+        "--prefilter-ratio",
+        type=float,
+        help="keep only the most central sentences, about this share of each chunk's tokens, e.g. 0.5",
+    )
+    parser.add_argument(
+        "--prefilter-max-tokens",
+        type=int,
+        help="cap each chunk at this many model tokens by dropping its least central sentences (truncating as a last resort)",
+    )
+    parser.add_argument(
+        "--metrics-json", help="write per-stage metrics as JSON to this file"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        help="write per-stage metrics in Prometheus text format to this file",
+    )
+    args = parser.parse_args(argv)
+
+    if args.metrics_json or args.metrics_prom:
+        metrics.enable()
+    pipeline = Pipeline(
+        output_dir=args.output_dir,
+        summarizer=args.backend,
+        queue_size=args.queue_size,
+        concurrency=_parse_concurrency(args.concurrency),
+        cpu_executor=args.cpu_executor,
+        formats=args.formats or ("markdown",),
+        prefilter_ratio=args.prefilter_ratio,
+        prefilter_max_tokens=args.prefilter_max_tokens,
+    )
+    started = time.perf_counter()
+    results = asyncio.run(
+        pipeline.run(
+            discover_books(args.directory, args.patterns or BOOK_PATTERNS),
+            args.directory,
+        )
+    )
+    elapsed = time.perf_counter() - started
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+
+    ok = sum(r["status"] == "ok" for r in results)
+    if args.prefilter_ratio is not None or args.prefilter_max_tokens is not None:
+        total = sum(r.get("input_tokens", 0) for r in results)
+        saved = sum(r.get("tokens_saved", 0) for r in results)
+        print(
+            f"✂️ Pre-filter kept the model off {saved}/{total} input tokens ({saved / max(total, 1):.0%})"
+        )
+    model_busy = pipeline.stats["summarize"]["busy"]
+    print(
+        f"✅ Summarized {ok}/{len(results)} books in {elapsed:.1f}s (model busy {model_busy:.1f}s) → {args.output_dir}"
+    )
+    return 0 if ok == len(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,585 @@
+"""Memory-mapped full-text inverted index over chapters, with phrase and proximity queries.
+
+An index is a directory of immutable segments plus a small `index.json`.
+Each `commit` writes the books added since the last one as a new segment, so
+new books never trigger a rebuild; re-adding a book hides its older copy and
+`compact` folds everything back into a single segment.
+
+Inside a segment every term's postings are the sorted global token positions
+and UTF-8 byte offsets of its occurrences. Both are delta-encoded and packed as
+variable-length bytes (7 bits per byte), so most entries take one or two bytes.
+Chapter text is stored alongside for snippets. All of it is memory-mapped and
+the sorted lexicon is binary-searched in place, so opening an index costs
+almost no resident memory and a query only touches the postings it needs.
+
+Query syntax: bare words must all appear in a chapter; `"white whale"` is an
+exact phrase; `"whale ahab"~5` needs the words within 5 tokens of each other.
+
+Usage:
+    python -m src.search_index build library.idx books/
+    python -m src.search_index query library.idx '"white whale" ahab'
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    from .corpus import BOOK_PATTERNS, discover_books
+    from .fsutil import atomic_write_text
+    from .ingest import load_book, clean_gutenberg_text
+    from .manifest import file_hash
+    from .structure import split_into_chapters
+except ImportError:
+    from corpus import BOOK_PATTERNS, discover_books
+    from fsutil import atomic_write_text
+    from ingest import load_book, clean_gutenberg_text
+    from manifest import file_hash
+    from structure import split_into_chapters
+
+INDEX_VERSION = 1
+_WORD = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"(?:~(\d+))?|(\S+)')
+_ENCODE_BLOCK = 1 << 20
+
+
+@dataclass
+class SearchHit:
+    """A chapter matching a query, with the first match located and excerpted."""
+
+    book: str
+    chapter: int
+    title: str
+    offset: int  # character offset of the first match within the chapter
+    hits: int
+    snippet: str
+
+
+# --- Variable-byte coding (little-endian 7-bit groups, high bit = more bytes follow) ---
+
+
+def _vbyte_encode(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Encode unsigned ints; returns the byte stream and the byte length of each value."""
+    streams, lengths = [], []
+    for start in range(0, len(values), _ENCODE_BLOCK):
+        block = values[start : start + _ENCODE_BLOCK].astype(np.uint64)
+        nbytes = np.ones(len(block), dtype=np.int64)
+        rest = block >> np.uint64(7)
+        while rest.any():
+            nbytes += rest > 0
+            rest >>= np.uint64(7)
+        width = int(nbytes.max())
+        shifts = np.arange(width, dtype=np.uint64) * np.uint64(7)
+        groups = ((block[:, None] >> shifts) & np.uint64(127)).astype(np.uint8)
+        k = np.arange(width)
+        groups[k[None, :] < (nbytes - 1)[:, None]] |= 128
+        streams.append(groups[k[None, :] < nbytes[:, None]])
+        lengths.append(nbytes)
+    if not streams:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64)
+    return np.concatenate(streams), np.concatenate(lengths)
+
+
+def _vbyte_decode(data: np.ndarray) -> np.ndarray:
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 128)
+    lengths = np.diff(ends, prepend=-1)
+    values = data[ends].astype(np.uint64)
+    # Fold in the lower 7-bit groups, walking back from each value's last byte
+    for back in range(1, int(lengths.max())):
+        longer = np.flatnonzero(lengths > back)
+        values[longer] = (values[longer] << np.uint64(7)) | (
+            data[ends[longer] - back] & 127
+        ).astype(np.uint64)
+    return values
+
+
+def _char_to_byte_offsets(text: str, starts: np.ndarray) -> np.ndarray:
+    """Translate character offsets into UTF-8 byte offsets."""
+    if text.isascii():
+        return starts
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    widths = (
+        1 + (code_points >= 0x80) + (code_points >= 0x800) + (code_points >= 0x10000)
+    )
+    byte_offsets = np.concatenate(([0], np.cumsum(widths)))
+    return byte_offsets[starts]
+
+
+def _map(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+# --- Writing segments ---
+
+
+def _write_segment(path: str, docs: list[dict], texts: list[str]) -> None:
+    """Tokenize `texts` (one per doc) and write a complete segment directory at `path`."""
+    vocab = {}
+    term_ids, byte_offsets, encoded = [], [], []
+    doc_tokens = [0]
+    doc_bytes = [0]
+    for text in texts:
+        matches = list(_WORD.finditer(text))
+        ids = np.fromiter(
+            (vocab.setdefault(m.group().lower(), len(vocab)) for m in matches),
+            dtype=np.uint32,
+            count=len(matches),
+        )
+        starts = np.fromiter(
+            (m.start() for m in matches), dtype=np.int64, count=len(matches)
+        )
+        data = text.encode("utf-8")
+        term_ids.append(ids)
+        byte_offsets.append(_char_to_byte_offsets(text, starts) + doc_bytes[-1])
+        encoded.append(data)
+        doc_tokens.append(doc_tokens[-1] + len(matches))
+        doc_bytes.append(doc_bytes[-1] + len(data))
+
+    terms = sorted(vocab, key=lambda term: term.encode("utf-8"))
+    rank = np.empty(len(vocab), dtype=np.uint32)
+    for i, term in enumerate(terms):
+        rank[vocab[term]] = i
+
+    ids = rank[np.concatenate(term_ids)] if term_ids else np.zeros(0, dtype=np.uint32)
+    order = np.argsort(ids, kind="stable")  # positions stay ascending within each term
+    ids = ids[order]
+    positions = order.astype(np.uint64)
+    offsets = (
+        np.concatenate(byte_offsets).astype(np.uint64)[order]
+        if byte_offsets
+        else np.zeros(0, dtype=np.uint64)
+    )
+
+    counts = np.bincount(ids, minlength=len(terms)).astype(np.int64)
+    first = np.concatenate(([0], np.cumsum(counts)))[:-1]
+    nonempty = first[counts > 0]
+
+    def delta(values):
+        deltas = np.diff(values, prepend=np.uint64(0))
+        deltas[nonempty] = values[nonempty]  # each term's list starts absolute
+        return deltas
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, values in (("positions", positions), ("offsets", offsets)):
+        stream, lengths = _vbyte_encode(delta(values))
+        byte_starts = np.concatenate(([0], np.cumsum(lengths)))
+        stream.tofile(os.path.join(tmp, f"{name}.vb"))
+        np.save(
+            os.path.join(tmp, f"{name}_index.npy"),
+            byte_starts[np.concatenate((first, [len(ids)]))].astype(np.uint64),
+        )
+
+    lexicon = [term.encode("utf-8") for term in terms]
+    with open(os.path.join(tmp, "lexicon.bin"), "wb") as f:
+        f.write(b"".join(lexicon))
+    np.save(
+        os.path.join(tmp, "lexicon_index.npy"),
+        np.concatenate(([0], np.cumsum([len(t) for t in lexicon]))).astype(np.uint64),
+    )
+    np.save(os.path.join(tmp, "counts.npy"), counts)
+    np.save(os.path.join(tmp, "doc_tokens.npy"), np.array(doc_tokens, dtype=np.uint64))
+    np.save(os.path.join(tmp, "doc_bytes.npy"), np.array(doc_bytes, dtype=np.uint64))
+    with open(os.path.join(tmp, "text.bin"), "wb") as f:
+        for data in encoded:
+            f.write(data)
+    with open(os.path.join(tmp, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# --- Reading segments ---
+
+
+class _Segment:
+    def __init__(self, path: str, deleted_books=()):
+        self.path = path
+        with open(os.path.join(path, "docs.json"), "r", encoding="utf-8") as f:
+            self.docs = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.counts = load("counts.npy")
+        self.lexicon_index = load("lexicon_index.npy")
+        self.position_index = load("positions_index.npy")
+        self.offset_index = load("offsets_index.npy")
+        self.doc_tokens = load("doc_tokens.npy")
+        self.doc_bytes = load("doc_bytes.npy")
+        self.lexicon = _map(os.path.join(path, "lexicon.bin"))
+        self.positions = _map(os.path.join(path, "positions.vb"))
+        self.offsets = _map(os.path.join(path, "offsets.vb"))
+        self.text = _map(os.path.join(path, "text.bin"))
+        deleted = set(deleted_books)
+        self.live = np.array(
+            [doc["book"] not in deleted for doc in self.docs], dtype=bool
+        )
+
+    def _term(self, i: int) -> bytes:
+        return bytes(
+            self.lexicon[int(self.lexicon_index[i]) : int(self.lexicon_index[i + 1])]
+        )
+
+    def find(self, term: str) -> int:
+        """Index of `term` in the sorted lexicon, or -1."""
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.counts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self.counts) and self._term(lo) == key else -1
+
+    def _decode(self, stream, index, term: str) -> np.ndarray:
+        i = self.find(term)
+        if i < 0:
+            return np.zeros(0, dtype=np.uint64)
+        return np.cumsum(_vbyte_decode(stream[int(index[i]) : int(index[i + 1])]))
+
+    def positions_of(self, term: str) -> np.ndarray:
+        """Global token positions of `term`, ascending."""
+        return self._decode(self.positions, self.position_index, term)
+
+    def offsets_of(self, term: str) -> np.ndarray:
+        """Byte offsets into the stored text, parallel to `positions_of`."""
+        return self._decode(self.offsets, self.offset_index, term)
+
+    def doc_of(self, positions: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.doc_tokens, positions, side="right") - 1
+
+    def snippet(self, doc: int, byte_offset: int, width: int) -> tuple[int, str]:
+        start, end = int(self.doc_bytes[doc]), int(self.doc_bytes[doc + 1])
+        lo, hi = max(start, byte_offset - width // 2), min(
+            end, byte_offset + width // 2
+        )
+        excerpt = bytes(self.text[lo:hi]).decode("utf-8", errors="ignore").split()
+        if lo > start and excerpt:
+            excerpt[0] = "…"  # likely a partial word
+        if hi < end and excerpt:
+            excerpt[-1] = "…"
+        offset = len(
+            bytes(self.text[start:byte_offset]).decode("utf-8", errors="ignore")
+        )
+        return offset, " ".join(excerpt)
+
+    def close(self) -> None:
+        for name in ("lexicon", "positions", "offsets", "text"):
+            array = getattr(self, name)
+            if isinstance(array, np.memmap):
+                array._mmap.close()
+
+
+def parse_query(query: str) -> list[tuple[list[str], int]]:
+    """Split a query into clauses of (terms, slop); slop None means exact phrase."""
+    clauses = []
+    for phrase, slop, word in _QUERY.findall(query):
+        terms = [t.lower() for t in _WORD.findall(phrase or word)]
+        if terms:
+            clauses.append((terms, int(slop) if slop else None))
+    return clauses
+
+
+def _clause_matches(
+    segment: _Segment, terms: list[str], slop
+) -> tuple[np.ndarray, np.ndarray]:
+    """Positions of every match of one clause, and their indices in the first term's postings."""
+    postings = [segment.positions_of(term) for term in terms]
+    positions = postings[0]
+    if len(terms) == 1 or len(positions) == 0:
+        return positions, np.arange(len(positions))
+
+    keep = np.ones(len(positions), dtype=bool)
+    docs = segment.doc_of(positions)
+    # Windows never reach outside the anchor's chapter
+    doc_start, doc_end = segment.doc_tokens[docs], segment.doc_tokens[docs + 1]
+    for i, other in enumerate(postings[1:], start=1):
+        if len(other) == 0:
+            return other, np.zeros(0, dtype=np.int64)
+        if slop is None:
+            low = high = positions + np.uint64(i)
+        else:
+            low = np.maximum(
+                positions - np.minimum(positions, np.uint64(slop)), doc_start
+            )
+            high = positions + np.uint64(slop)
+        high = np.minimum(high, doc_end - np.uint64(1))
+        idx = np.minimum(np.searchsorted(other, low), len(other) - 1)
+        keep &= (other[idx] >= low) & (other[idx] <= high)
+    return positions[keep], np.flatnonzero(keep)
+
+
+class SearchIndex:
+    """Open (or create) the index in `directory` for adding books and querying."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "index.json")
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if self.meta.get("version") != INDEX_VERSION:
+                raise ValueError(
+                    f"Unsupported index version {self.meta.get('version')!r} in {directory}"
+                )
+        else:
+            self.meta = {
+                "version": INDEX_VERSION,
+                "next_segment": 1,
+                "segments": [],
+                "books": {},
+            }
+        self._pending = {}
+        self._segments = None
+
+    # --- Writing ---
+
+    def add_book(self, book: str, chapters, fingerprint: str = None) -> None:
+        """Queue a book's chapters (from `split_into_chapters`) for the next commit."""
+        self._pending[book] = (
+            [{"title": ch["title"], "content": ch["content"]} for ch in chapters],
+            fingerprint,
+        )
+
+    def fingerprint(self, book: str):
+        entry = self.meta["books"].get(book)
+        return entry and entry.get("fingerprint")
+
+    def commit(self):
+        """Write pending books as a new segment; returns its name (None if nothing was pending)."""
+        if not self._pending:
+            return None
+        name = f"seg-{self.meta['next_segment']:06d}"
+        docs, texts = [], []
+        for book, (chapters, _) in self._pending.items():
+            for i, chapter in enumerate(chapters):
+                docs.append({"book": book, "chapter": i, "title": chapter["title"]})
+                texts.append(chapter["content"])
+        _write_segment(os.path.join(self.directory, name), docs, texts)
+
+        for book, (_, fingerprint) in self._pending.items():
+            previous = self.meta["books"].get(book)
+            if previous:
+                for segment in self.meta["segments"]:
+                    if segment["name"] == previous["segment"]:
+                        segment["deleted"] = sorted(set(segment["deleted"]) | {book})
+            self.meta["books"][book] = {"segment": name, "fingerprint": fingerprint}
+        self.meta["segments"].append({"name": name, "deleted": []})
+        self.meta["next_segment"] += 1
+        self._save_meta()
+        self._pending = {}
+        self._reopen()
+        return name
+
+    def compact(self) -> None:
+        """Rewrite all live chapters into one segment, dropping superseded copies."""
+        docs, texts = [], []
+        for segment in self._open_segments():
+            for i, (doc, live) in enumerate(zip(segment.docs, segment.live)):
+                if live:
+                    docs.append(doc)
+                    texts.append(
+                        bytes(
+                            segment.text[
+                                int(segment.doc_bytes[i]) : int(
+                                    segment.doc_bytes[i + 1]
+                                )
+                            ]
+                        ).decode("utf-8")
+                    )
+        if not docs:
+            return
+        name = f"seg-{self.meta['next_segment']:06d}"
+        _write_segment(os.path.join(self.directory, name), docs, texts)
+        old = [segment["name"] for segment in self.meta["segments"]]
+        self.meta["segments"] = [{"name": name, "deleted": []}]
+        self.meta["next_segment"] += 1
+        for entry in self.meta["books"].values():
+            entry["segment"] = name
+        self._save_meta()
+        self._reopen()
+        for segment_name in old:
+            shutil.rmtree(
+                os.path.join(self.directory, segment_name), ignore_errors=True
+            )
+
+    def _save_meta(self) -> None:
+        atomic_write_text(
+            self._meta_path, json.dumps(self.meta, ensure_ascii=False, indent=1)
+        )
+
+    # --- Reading ---
+
+    def _open_segments(self) -> list[_Segment]:
+        if self._segments is None:
+            self._segments = [
+                _Segment(
+                    os.path.join(self.directory, segment["name"]), segment["deleted"]
+                )
+                for segment in self.meta["segments"]
+            ]
+        return self._segments
+
+    def _reopen(self) -> None:
+        self.close()
+        self._segments = None
+
+    def books(self) -> list[str]:
+        return sorted(self.meta["books"])
+
+    def search(
+        self, query: str, limit: int = 10, snippet_chars: int = 160
+    ) -> list[SearchHit]:
+        """Chapters matching every clause of `query`, most matches first."""
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+
+        found_segments, found_docs, found_hits, found_anchors = [], [], [], []
+        for number, segment in enumerate(self._open_segments()):
+            if any(segment.find(term) < 0 for terms, _ in clauses for term in terms):
+                continue  # every clause must match, so one unknown term rules the segment out
+            docs = None
+            for terms, slop in clauses:
+                positions, matches = _clause_matches(segment, terms, slop)
+                clause_docs, first, counts = np.unique(
+                    segment.doc_of(positions), return_index=True, return_counts=True
+                )
+                if docs is None:
+                    docs, hits, anchors = clause_docs, counts, matches[first]
+                else:
+                    docs, a, b = np.intersect1d(
+                        docs, clause_docs, assume_unique=True, return_indices=True
+                    )
+                    hits, anchors = hits[a] + counts[b], anchors[a]
+                if len(docs) == 0:
+                    break
+            live = segment.live[docs]
+            if live.any():
+                # Byte offsets are only decoded for the first clause's first term, to place snippets
+                anchors = segment.offsets_of(clauses[0][0][0])[anchors]
+            found_segments.append(np.full(int(live.sum()), number))
+            found_docs.append(docs[live])
+            found_hits.append(hits[live])
+            found_anchors.append(anchors[live])
+
+        if not found_docs:
+            return []
+        segments = np.concatenate(found_segments)
+        docs, hits, anchors = (
+            np.concatenate(found_docs),
+            np.concatenate(found_hits),
+            np.concatenate(found_anchors),
+        )
+        # Most hits first, then index order
+        order = np.lexsort((docs, segments, -hits))[:limit]
+
+        results = []
+        for i in order:
+            segment = self._segments[segments[i]]
+            offset, snippet = segment.snippet(
+                int(docs[i]), int(anchors[i]), snippet_chars
+            )
+            info = segment.docs[int(docs[i])]
+            results.append(
+                SearchHit(
+                    info["book"],
+                    info["chapter"],
+                    info["title"],
+                    offset,
+                    int(hits[i]),
+                    snippet,
+                )
+            )
+        return results
+
+    def close(self) -> None:
+        for segment in self._segments or []:
+            segment.close()
+
+
+def build_index(
+    index_dir: str, directory: str, patterns=BOOK_PATTERNS, batch: int = 100
+) -> dict:
+    """Index new or changed books under `directory`, one segment per `batch` books."""
+    index = SearchIndex(index_dir)
+    counts = {"indexed": 0, "unchanged": 0, "error": 0}
+    for path in discover_books(directory, patterns):
+        book = os.path.normpath(path)
+        digest = file_hash(path)
+        if index.fingerprint(book) == digest:
+            counts["unchanged"] += 1
+            continue
+        try:
+            index.add_book(
+                book,
+                split_into_chapters(clean_gutenberg_text(load_book(path))),
+                fingerprint=digest,
+            )
+            counts["indexed"] += 1
+        except Exception as e:
+            print(f"❌ Error indexing {path}:", e)
+            counts["error"] += 1
+        if len(index._pending) >= batch:
+            index.commit()
+    index.commit()
+    index.close()
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build and query a full-text index over book chapters."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index new or changed books")
+    build.add_argument("index", help="index directory")
+    build.add_argument("directory", help="directory containing book files")
+    build.add_argument("--batch", type=int, default=100, help="books per segment")
+    build.add_argument(
+        "--compact", action="store_true", help="merge all segments afterwards"
+    )
+    query = commands.add_parser("query", help="search the index")
+    query.add_argument("index", help="index directory")
+    query.add_argument("query", help='words, "exact phrases" or "near words"~N')
+    query.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        counts = build_index(args.index, args.directory, batch=args.batch)
+        if args.compact:
+            SearchIndex(args.index).compact()
+        print(
+            f"✅ Indexed {counts['indexed']} books ({counts['unchanged']} unchanged, {counts['error']} failed) in {time.perf_counter() - started:.1f}s"
+        )
+        return 1 if counts["error"] else 0
+
+    index = SearchIndex(args.index)
+    started = time.perf_counter()
+    hits = index.search(args.query, limit=args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    for hit in hits:
+        print(
+            f"📖 {hit.book} — {hit.title} (+{hit.offset}, {hit.hits} hits)\n   {hit.snippet}"
+        )
+    print(f"🔎 {len(hits)} results in {elapsed:.1f} ms")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,404 @@
+"""Sentiment and emotion timelines over a book's chapters.
+
+Each chapter is tokenized once; every token is mapped to a lexicon row with a
+single dict lookup and the scores come from one NumPy fancy-index into the
+lexicon table. Arcs are smoothed with a moving-average convolution (computed
+from cumulative sums, so cost doesn't grow with the window) and resampled to
+a fixed number of points per chapter and for the whole book. A full novel
+scores in a fraction of a second on one core; corpora fan out over a
+process pool.
+
+The built-in lexicon is a small seed list so the engine works out of the box.
+For real analyses load a fuller one with `Lexicon.from_tsv` (e.g. the NRC
+Emotion Lexicon's `word<TAB>emotion<TAB>score` layout).
+
+Usage:
+    python -m src.sentiment books/ --output-dir timelines/ --workers 8
+"""
+
+import argparse
+import functools
+import io
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    from .corpus import BOOK_PATTERNS, discover_books, output_names
+    from .fsutil import atomic_write_bytes
+    from .ingest import load_book, clean_gutenberg_text
+    from .structure import split_into_chapters
+except ImportError:
+    from corpus import BOOK_PATTERNS, discover_books, output_names
+    from fsutil import atomic_write_bytes
+    from ingest import load_book, clean_gutenberg_text
+    from structure import split_into_chapters
+
+DIMENSIONS = (
+    "valence",
+    "joy",
+    "trust",
+    "fear",
+    "surprise",
+    "sadness",
+    "disgust",
+    "anger",
+    "anticipation",
+)
+NEGATORS = frozenset("not no never nor without hardly cannot".split())
+_CLAUSE_END = frozenset(".,;:!?")
+_TOKEN = re.compile(r"\w+|[.,;:!?]")
+
+_SEED_EMOTIONS = {
+    "joy": "happy happiness joy joyful delight delighted glad cheerful laugh laughed laughter smile smiled "
+    "merry bliss pleasure rejoice rejoiced wonderful beautiful love loved lovely sweet",
+    "trust": "trust faithful loyal honest friend friendship kind kindness gentle true faith safe protect "
+    "hope comfort",
+    "fear": "fear afraid terror terrified dread horror horrible fright frightened panic tremble trembled "
+    "danger dangerous anxious alarm monster",
+    "surprise": "surprise surprised astonished astonishment amazed amazement sudden suddenly wonder "
+    "unexpected startled",
+    "sadness": "sad sadness sorrow sorrowful grief grieve wept weep tears misery miserable despair "
+    "lonely mourn mourned melancholy unhappy wretched death dead",
+    "disgust": "disgust disgusted loathe loathing hideous vile foul filthy revolting abhor abhorred",
+    "anger": "anger angry rage fury furious hate hatred wrath revenge vengeance cruel resent bitter",
+    "anticipation": "anticipate expect expected await awaited eager hope hoped longing soon tomorrow plan",
+}
+_SEED_NEGATIVE = "pain suffering evil wicked guilt guilty crime murder murdered ruin ruined cold dark"
+_POSITIVE_EMOTIONS = {"joy", "trust"}
+_NEGATIVE_EMOTIONS = {"fear", "sadness", "disgust", "anger"}
+
+
+class Lexicon:
+    """Word → score table over `dimensions`; row 0 is the all-zero row for unknown words."""
+
+    def __init__(self, entries: dict, dimensions=DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self._rows = {word: row for row, word in enumerate(sorted(entries), start=1)}
+        self.table = np.zeros(
+            (len(self._rows) + 1, len(self.dimensions)), dtype=np.float32
+        )
+        column = {name: i for i, name in enumerate(self.dimensions)}
+        for word, row in self._rows.items():
+            for dimension, score in entries[word].items():
+                if dimension in column:
+                    self.table[row, column[dimension]] = score
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def rows(self, words: list[str]) -> np.ndarray:
+        """Table row for each word (0 when unknown)."""
+        return np.fromiter(
+            map(self._rows.get, words, itertools.repeat(0)),
+            dtype=np.int32,
+            count=len(words),
+        )
+
+    @classmethod
+    def default(cls) -> "Lexicon":
+        return _default_lexicon()
+
+    @classmethod
+    def from_tsv(cls, path: str) -> "Lexicon":
+        """
+        Load `word<TAB>dimension<TAB>score` lines.
+
+        NRC-style `positive`/`negative` rows feed the valence dimension.
+        """
+        entries = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3 or not parts[2].strip():
+                    continue
+                word, dimension, score = (
+                    parts[0].lower(),
+                    parts[1].lower(),
+                    float(parts[2]),
+                )
+                if dimension == "positive":
+                    dimension = "valence"
+                elif dimension == "negative":
+                    dimension, score = "valence", -score
+                if score:
+                    scores = entries.setdefault(word, {})
+                    scores[dimension] = scores.get(dimension, 0.0) + score
+        return cls(entries)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_lexicon() -> Lexicon:
+    entries = {}
+    for emotion, words in _SEED_EMOTIONS.items():
+        for word in words.split():
+            scores = entries.setdefault(word, {})
+            scores[emotion] = 1.0
+            if emotion in _POSITIVE_EMOTIONS:
+                scores["valence"] = 1.0
+            elif emotion in _NEGATIVE_EMOTIONS:
+                scores["valence"] = -1.0
+    for word in _SEED_NEGATIVE.split():
+        entries.setdefault(word, {})["valence"] = -1.0
+    return Lexicon(entries)
+
+
+@functools.lru_cache(maxsize=None)
+def _lexicon_from_path(path: str) -> Lexicon:
+    return Lexicon.from_tsv(path)
+
+
+def score_tokens(text: str, lexicon: Lexicon = None) -> np.ndarray:
+    """
+    Per-token scores, shape (words, dimensions).
+
+    Valence is flipped for the two words after a negator, unless punctuation
+    closes the clause first.
+    """
+    lexicon = lexicon or Lexicon.default()
+    tokens = _TOKEN.findall(text.lower())
+    is_word = ~np.fromiter(
+        map(_CLAUSE_END.__contains__, tokens), dtype=bool, count=len(tokens)
+    )
+    words = [t for t in tokens if t not in _CLAUSE_END]
+    scores = lexicon.table[lexicon.rows(words)]
+    if "valence" in lexicon.dimensions and len(tokens) > 1:
+        negated = np.fromiter(
+            map(NEGATORS.__contains__, tokens), dtype=bool, count=len(tokens)
+        )
+        flip = np.zeros(len(tokens), dtype=bool)
+        flip[1:] |= negated[:-1] & is_word[1:]
+        flip[2:] |= negated[:-2] & is_word[1:-1] & is_word[2:]
+        scores[flip[is_word], lexicon.dimensions.index("valence")] *= -1
+    return scores
+
+
+def smooth(scores: np.ndarray, window: int) -> np.ndarray:
+    """Centered moving average over `window` tokens (shrinking at the edges)."""
+    n = len(scores)
+    if n == 0:
+        return scores
+    window = max(1, min(window, n))
+    cumulative = np.vstack(
+        [
+            np.zeros((1, scores.shape[1]), dtype=np.float64),
+            np.cumsum(scores, axis=0, dtype=np.float64),
+        ]
+    )
+    lo = np.clip(np.arange(n) - window // 2, 0, n)
+    hi = np.clip(lo + window, 0, n)
+    return ((cumulative[hi] - cumulative[lo]) / (hi - lo)[:, None]).astype(np.float32)
+
+
+def resample(values: np.ndarray, points: int) -> np.ndarray:
+    """Average `values` into `points` equal bins along the first axis."""
+    n, dims = values.shape
+    if n == 0:
+        return np.zeros((points, dims), dtype=np.float32)
+    bins = (np.arange(n) * points) // n
+    counts = np.bincount(bins, minlength=points)
+    sums = np.stack(
+        [
+            np.bincount(bins, weights=values[:, d], minlength=points)
+            for d in range(dims)
+        ],
+        axis=1,
+    )
+    filled = counts > 0
+    out = np.empty((points, dims), dtype=np.float32)
+    out[filled] = sums[filled] / counts[filled, None]
+    if not filled.all():  # fewer tokens than points: interpolate the gaps
+        centers = np.flatnonzero(filled)
+        for d in range(dims):
+            out[~filled, d] = np.interp(
+                np.flatnonzero(~filled), centers, out[filled, d]
+            )
+    return out
+
+
+@dataclass
+class Timeline:
+    """Emotion arcs for one book: per chapter and across the whole text."""
+
+    dimensions: tuple
+    titles: list
+    token_counts: np.ndarray  # (chapters,)
+    chapter_means: np.ndarray  # (chapters, dimensions), mean score per token
+    chapter_arcs: np.ndarray  # (chapters, chapter_resolution, dimensions)
+    book_arc: np.ndarray  # (book_resolution, dimensions)
+    window: int
+
+    def arc(self, dimension: str) -> np.ndarray:
+        return self.book_arc[:, self.dimensions.index(dimension)]
+
+
+def build_timeline(
+    chapters,
+    lexicon: Lexicon = None,
+    window: int = 500,
+    chapter_resolution: int = 20,
+    book_resolution: int = 100,
+) -> Timeline:
+    """Score `chapters` (from `split_into_chapters`) and build their arcs."""
+    lexicon = lexicon or Lexicon.default()
+    dims = len(lexicon.dimensions)
+    scores = [score_tokens(ch["content"], lexicon) for ch in chapters]
+    counts = np.array([len(s) for s in scores], dtype=np.int64)
+    means = (
+        np.stack(
+            [
+                s.mean(axis=0) if len(s) else np.zeros(dims, dtype=np.float32)
+                for s in scores
+            ]
+        )
+        if scores
+        else np.zeros((0, dims), dtype=np.float32)
+    )
+    chapter_arcs = (
+        np.stack([resample(smooth(s, window), chapter_resolution) for s in scores])
+        if scores
+        else np.zeros((0, chapter_resolution, dims), dtype=np.float32)
+    )
+    whole = np.concatenate(scores) if scores else np.zeros((0, dims), dtype=np.float32)
+    return Timeline(
+        dimensions=lexicon.dimensions,
+        titles=[ch["title"] for ch in chapters],
+        token_counts=counts,
+        chapter_means=means.astype(np.float32),
+        chapter_arcs=chapter_arcs,
+        book_arc=resample(smooth(whole, window), book_resolution),
+        window=window,
+    )
+
+
+def save_timeline(timeline: Timeline, path: str) -> None:
+    """Store a timeline as a compressed .npz, written atomically."""
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        dimensions=np.array(timeline.dimensions),
+        titles=np.array(timeline.titles, dtype=str),
+        token_counts=timeline.token_counts,
+        chapter_means=timeline.chapter_means,
+        chapter_arcs=timeline.chapter_arcs,
+        book_arc=timeline.book_arc,
+        window=np.array(timeline.window),
+    )
+    atomic_write_bytes(path, buffer.getvalue())
+
+
+def load_timeline(path: str) -> Timeline:
+    with np.load(path) as data:
+        return Timeline(
+            dimensions=tuple(data["dimensions"].tolist()),
+            titles=data["titles"].tolist(),
+            token_counts=data["token_counts"],
+            chapter_means=data["chapter_means"],
+            chapter_arcs=data["chapter_arcs"],
+            book_arc=data["book_arc"],
+            window=int(data["window"]),
+        )
+
+
+def score_book(
+    path: str, output_path: str, lexicon_path: str = None, **options
+) -> dict:
+    """Build and save one book's timeline, returning a status record (never raises)."""
+    started = time.perf_counter()
+    try:
+        lexicon = (
+            _lexicon_from_path(lexicon_path) if lexicon_path else Lexicon.default()
+        )
+        chapters = split_into_chapters(clean_gutenberg_text(load_book(path)))
+        timeline = build_timeline(chapters, lexicon, **options)
+        save_timeline(timeline, output_path)
+        record = {
+            "path": path,
+            "status": "ok",
+            "output": output_path,
+            "chapters": len(chapters),
+            "tokens": int(timeline.token_counts.sum()),
+        }
+    except Exception as e:
+        record = {"path": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+    record["seconds"] = round(time.perf_counter() - started, 6)
+    return record
+
+
+def score_corpus(
+    directory: str,
+    output_dir: str,
+    workers: int = None,
+    lexicon_path: str = None,
+    patterns=BOOK_PATTERNS,
+    **options,
+) -> list[dict]:
+    """Score every book under `directory` over a process pool (in-process when workers == 1)."""
+    paths = discover_books(directory, patterns)
+    names = output_names(paths, directory)
+    jobs = [(path, os.path.join(output_dir, names[path] + ".npz")) for path in paths]
+    if workers == 1:
+        return [
+            score_book(path, output, lexicon_path, **options) for path, output in jobs
+        ]
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(score_book, path, output, lexicon_path, **options)
+            for path, output in jobs
+        ]
+        for future in as_completed(futures):
+            records.append(future.result())
+    return records
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build sentiment and emotion timelines for a directory of books."
+    )
+    parser.add_argument("directory", help="directory containing book files")
+    parser.add_argument(
+        "--output-dir", default="timelines", help="where the .npz timelines go"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="number of worker processes"
+    )
+    parser.add_argument(
+        "--lexicon",
+        help="word<TAB>dimension<TAB>score file (default: built-in seed lexicon)",
+    )
+    parser.add_argument(
+        "--window", type=int, default=500, help="smoothing window in tokens"
+    )
+    parser.add_argument(
+        "--chapter-resolution", type=int, default=20, help="points per chapter arc"
+    )
+    parser.add_argument(
+        "--book-resolution", type=int, default=100, help="points in the whole-book arc"
+    )
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    records = score_corpus(
+        args.directory,
+        args.output_dir,
+        workers=args.workers,
+        lexicon_path=args.lexicon,
+        window=args.window,
+        chapter_resolution=args.chapter_resolution,
+        book_resolution=args.book_resolution,
+    )
+    ok = sum(r["status"] == "ok" for r in records)
+    print(
+        f"✅ Scored {ok}/{len(records)} books in {time.perf_counter() - started:.1f}s → {args.output_dir}"
+    )
+    return 0 if ok == len(records) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,640 @@
+"""Chapter similarity index: "chapters like this one" across the whole library.
+
+Each chapter becomes a hashed TF-IDF vector: words are hashed (crc32) into
+`HASH_BUCKETS` buckets for document frequencies and folded with a random
+sign into `dim` dimensions, so there is no vocabulary to store and nothing
+is downloaded. Rows are L2-normalised and appended to one float16 matrix on
+disk that is memory-mapped for queries, next to a `docs.jsonl` of chapter
+titles and a small `index.json`; opening an index reads only the latter.
+
+IDF weights come from the document frequencies seen up to the commit that
+added a chapter, so books indexed first are weighted by a smaller sample.
+Each chapter's buckets are kept in `buckets.u32` so that a re-added book's
+old chapters stop counting, and every commit writes its frequencies to a
+new `df.<n>.npy` that only `index.json` points at.
+
+Queries score the matrix in blocks of `BLOCK_ROWS` rows with one matrix
+product per block and keep a running top k. After `train`, rows are also
+assigned to coarse k-means clusters and a query only scores the rows of its
+`nprobe` nearest clusters, which keeps search fast at hundreds of thousands
+of chapters; chapters appended later are assigned as they are committed.
+
+Usage:
+    python -m src.similarity build library.vec books/ --clusters 256
+    python -m src.similarity similar library.vec books/moby.txt 41
+    python -m src.similarity query library.vec "a voyage through polar ice"
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    from .corpus import BOOK_PATTERNS, discover_books
+    from .fsutil import atomic_write_bytes, atomic_write_text
+    from .ingest import load_book, clean_gutenberg_text
+    from .manifest import file_hash
+    from .structure import split_into_chapters
+except ImportError:
+    from corpus import BOOK_PATTERNS, discover_books
+    from fsutil import atomic_write_bytes, atomic_write_text
+    from ingest import load_book, clean_gutenberg_text
+    from manifest import file_hash
+    from structure import split_into_chapters
+
+INDEX_VERSION = 1
+DIM = 512
+HASH_BUCKETS = 1 << 20
+BLOCK_ROWS = 16384  # rows scored per matrix product; 32 MB of float32 at DIM = 512
+DEFAULT_NPROBE = 8
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class SimilarChapter:
+    """A chapter found by a similarity query."""
+
+    book: str
+    chapter: int
+    title: str
+    score: float  # cosine similarity
+
+
+def term_hashes(text: str) -> tuple[np.ndarray, np.ndarray]:
+    """crc32 hashes of the distinct lowercased words in `text`, with their counts."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    vocabulary, counts = np.unique(np.array(words), return_counts=True)
+    hashes = np.array(
+        [zlib.crc32(w.encode("utf-8")) for w in vocabulary.tolist()], dtype=np.uint32
+    )
+    return hashes, counts
+
+
+def idf_weights(df: np.ndarray, documents: int) -> np.ndarray:
+    """Smoothed IDF per hash bucket, as in `extractive.tfidf_matrix`."""
+    return (np.log((1 + documents) / (1 + df)) + 1.0).astype(np.float32)
+
+
+def embed(
+    terms: list[tuple[np.ndarray, np.ndarray]], idf: np.ndarray, dim: int = DIM
+) -> np.ndarray:
+    """L2-normalised hashed TF-IDF rows (float32), one per (hashes, counts) pair."""
+    vectors = np.zeros((len(terms), dim), dtype=np.float32)
+    for row, (hashes, counts) in zip(vectors, terms):
+        if len(hashes) == 0:
+            continue
+        weights = (1.0 + np.log(counts)).astype(np.float32) * idf[hashes % HASH_BUCKETS]
+        # The top bit picks a sign so colliding words cancel out on average
+        weights[(hashes >> 31).astype(bool)] *= -1.0
+        row[:] = np.bincount(hashes % dim, weights=weights, minlength=dim)
+        norm = np.linalg.norm(row)
+        if norm:
+            row /= norm
+    return vectors
+
+
+def _merge_top_k(best_scores, best_rows, scores, rows, k):
+    """Fold a block of (queries, block) scores into the running per-query top k."""
+    scores = np.concatenate((best_scores, scores), axis=1)
+    rows = np.concatenate(
+        (best_rows, np.broadcast_to(rows, (len(scores), len(rows)))), axis=1
+    )
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores, rows = np.take_along_axis(scores, keep, axis=1), np.take_along_axis(
+            rows, keep, axis=1
+        )
+    return scores, rows
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    atomic_write_bytes(path, buffer.getvalue())
+
+
+def _append(path: str, size: int, data: bytes) -> None:
+    """Append `data` after the first `size` bytes, cutting off anything a crashed commit left."""
+    with open(path, "ab") as f:
+        f.truncate(size)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class SimilarityIndex:
+    """Open (or create) the vector index in `directory`."""
+
+    def __init__(self, directory: str, dim: int = DIM):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "index.json")
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if self.meta.get("version") != INDEX_VERSION:
+                raise ValueError(
+                    f"Unsupported index version {self.meta.get('version')!r} in {directory}"
+                )
+        else:
+            self.meta = {
+                "version": INDEX_VERSION,
+                "dim": dim,
+                "count": 0,
+                "documents": 0,
+                "docs_bytes": 0,
+                "clusters": 0,
+                "books": {},
+                "superseded": [],
+                "buckets": 0,
+                "commits": 0,
+                "df": None,
+            }
+        self.dim = self.meta["dim"]
+        self._pending = {}
+        self._reopen()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    # --- Writing ---
+
+    def add_book(self, book: str, chapters, fingerprint: str = None) -> None:
+        """Queue a book's chapters (from `split_into_chapters`) for the next commit."""
+        self._pending[book] = (
+            [(ch["title"], ch["content"]) for ch in chapters],
+            fingerprint,
+        )
+
+    def fingerprint(self, book: str):
+        entry = self.meta["books"].get(book)
+        return entry and entry.get("fingerprint")
+
+    def _document_frequencies(self) -> np.ndarray:
+        if not self.meta["df"]:
+            return np.zeros(HASH_BUCKETS, dtype=np.int32)
+        return np.load(self._path(self.meta["df"]))
+
+    def _book_buckets(self, entry: dict) -> np.ndarray:
+        """The distinct buckets of each chapter of a committed book, concatenated."""
+        start, end = entry["buckets"]
+        return np.fromfile(
+            self._path("buckets.u32"),
+            dtype=np.uint32,
+            count=end - start,
+            offset=start * 4,
+        )
+
+    def commit(self) -> int:
+        """Append the vectors of pending books; returns the number of chapters added."""
+        if not self._pending:
+            return 0
+        docs, terms = [], []
+        for book, (chapters, _) in self._pending.items():
+            for i, (title, content) in enumerate(chapters):
+                docs.append({"book": book, "chapter": i, "title": title})
+                terms.append(term_hashes(content))
+
+        df = self._document_frequencies()
+        documents = self.meta["documents"] + len(terms)
+        for book in self._pending:
+            previous = self.meta["books"].get(book)
+            if previous:
+                # Superseded chapters no longer count towards the IDF weights
+                df -= np.bincount(
+                    self._book_buckets(previous), minlength=HASH_BUCKETS
+                ).astype(df.dtype)
+                documents -= previous["end"] - previous["start"]
+        buckets = [
+            np.unique(hashes % HASH_BUCKETS).astype(np.uint32) for hashes, _ in terms
+        ]
+        for chapter_buckets in buckets:
+            df[chapter_buckets] += 1
+        vectors = embed(terms, idf_weights(df, documents), self.dim).astype(np.float16)
+
+        count = self.meta["count"]
+        lines = "".join(
+            json.dumps(doc, ensure_ascii=False) + "\n" for doc in docs
+        ).encode("utf-8")
+        _append(self._path("vectors.f16"), count * self.dim * 2, vectors.tobytes())
+        _append(self._path("docs.jsonl"), self.meta["docs_bytes"], lines)
+        if self.meta["clusters"]:
+            _append(
+                self._path("assign.i32"), count * 4, self._assign(vectors).tobytes()
+            )
+        position = self.meta["buckets"]
+        _append(
+            self._path("buckets.u32"),
+            position * 4,
+            b"".join(b.tobytes() for b in buckets),
+        )
+        old_df, commits = self.meta["df"], self.meta["commits"] + 1
+        _save_npy(self._path(f"df.{commits}.npy"), df)
+
+        row = count
+        for book, (chapters, fingerprint) in self._pending.items():
+            previous = self.meta["books"].get(book)
+            if previous:
+                self.meta["superseded"].append([previous["start"], previous["end"]])
+            end = position + sum(
+                len(b) for b in buckets[row - count : row - count + len(chapters)]
+            )
+            self.meta["books"][book] = {
+                "fingerprint": fingerprint,
+                "start": row,
+                "end": row + len(chapters),
+                "buckets": [position, end],
+            }
+            row, position = row + len(chapters), end
+        self.meta.update(
+            count=count + len(docs),
+            documents=documents,
+            docs_bytes=self.meta["docs_bytes"] + len(lines),
+            buckets=position,
+            commits=commits,
+            df=f"df.{commits}.npy",
+        )
+        self._save_meta()  # the commit point: rows past the recorded count are ignored and overwritten
+        if old_df:
+            os.remove(self._path(old_df))
+        self._pending = {}
+        self._reopen()
+        return len(docs)
+
+    def _save_meta(self) -> None:
+        atomic_write_text(
+            self._meta_path, json.dumps(self.meta, ensure_ascii=False, indent=1)
+        )
+
+    # --- Clustering ---
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each row, in blocks."""
+        centroids = self._centroids()
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+            labels[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def train(
+        self,
+        clusters: int = None,
+        iterations: int = 10,
+        sample: int = 50_000,
+        seed: int = 0,
+    ) -> int:
+        """
+        Fit coarse spherical k-means clusters and assign every row to one.
+
+        Centroids are fitted on a random sample of live rows; `clusters`
+        defaults to about sqrt(rows). Returns the number of clusters.
+        """
+        live = np.flatnonzero(self._live())
+        if len(live) == 0:
+            return 0
+        clusters = min(clusters or max(1, int(np.sqrt(len(live)))), len(live))
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(live, size=min(sample, len(live)), replace=False))
+        data = np.asarray(self._vectors[rows], dtype=np.float32)
+        centroids = data[rng.choice(len(data), size=clusters, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(data[order], starts)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # An emptied cluster keeps its old centroid
+            centroids = np.where(
+                norms > 0, sums / np.where(norms > 0, norms, 1.0), centroids
+            )
+
+        _save_npy(self._path("centroids.npy"), centroids.astype(np.float32))
+        self._cluster_cache = None
+        self.meta["clusters"] = clusters
+        atomic_write_bytes(
+            self._path("assign.i32"), self._assign(self._vectors).tobytes()
+        )
+        self._save_meta()
+        self._reopen()
+        return clusters
+
+    def _centroids(self) -> np.ndarray:
+        if self._cluster_cache is None:
+            self._cluster_cache = np.load(self._path("centroids.npy"))
+        return self._cluster_cache
+
+    def _cluster_rows(self):
+        """Row ids grouped by cluster, and where each cluster's run starts."""
+        if self._cluster_order is None:
+            labels = np.memmap(
+                self._path("assign.i32"), dtype=np.int32, mode="r", shape=(len(self),)
+            )
+            order = np.argsort(labels, kind="stable")
+            bounds = np.searchsorted(
+                labels[order], np.arange(self.meta["clusters"] + 1)
+            )
+            self._cluster_order = (order, bounds)
+        return self._cluster_order
+
+    # --- Reading ---
+
+    def _reopen(self) -> None:
+        count = len(self)
+        self._vectors = (
+            np.memmap(
+                self._path("vectors.f16"),
+                dtype=np.float16,
+                mode="r",
+                shape=(count, self.dim),
+            )
+            if count
+            else np.zeros((0, self.dim), dtype=np.float16)
+        )
+        self._docs = None
+        self._live_mask = None
+        self._cluster_cache = None
+        self._cluster_order = None
+
+    def _live(self) -> np.ndarray:
+        """False for rows of books that were re-added since."""
+        if self._live_mask is None:
+            live = np.ones(len(self), dtype=bool)
+            for start, end in self.meta["superseded"]:
+                live[start:end] = False
+            self._live_mask = live
+        return self._live_mask
+
+    def doc(self, row: int) -> dict:
+        if self._docs is None:
+            with open(self._path("docs.jsonl"), "rb") as f:
+                self._docs = f.read(self.meta["docs_bytes"]).splitlines()
+        return json.loads(self._docs[row])
+
+    def vector(self, book: str, chapter: int) -> np.ndarray:
+        entry = self.meta["books"][book]
+        if not 0 <= chapter < entry["end"] - entry["start"]:
+            raise IndexError(f"{book} has no chapter {chapter}")
+        return np.asarray(self._vectors[entry["start"] + chapter], dtype=np.float32)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Vector for an arbitrary text under the current IDF weights."""
+        return embed(
+            [term_hashes(text)],
+            idf_weights(self._document_frequencies(), self.meta["documents"]),
+            self.dim,
+        )[0]
+
+    def search_vectors(
+        self, queries: np.ndarray, k: int = 10, nprobe: int = None, exclude=()
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows by cosine similarity for each query vector.
+
+        Returns (rows, scores), each (queries, k) and best first; missing
+        results have row -1. `exclude` takes (start, end) row ranges to skip.
+        With trained clusters only the `nprobe` nearest clusters are scored
+        (DEFAULT_NPROBE unless given; 0 scores every row).
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        live = self._live()
+        if exclude:
+            live = live.copy()
+            for start, end in exclude:
+                live[start:end] = False
+
+        nprobe = DEFAULT_NPROBE if nprobe is None else nprobe
+        if not (self.meta["clusters"] and 0 < nprobe < self.meta["clusters"]):
+            return self._scan(queries, None, live, k)
+        order, bounds = self._cluster_rows()
+        probes = np.argsort(-(queries @ self._centroids().T), axis=1)[:, :nprobe]
+        results = [
+            self._scan(query[None], self._candidates(order, bounds, probe), live, k)
+            for query, probe in zip(queries, probes)
+        ]
+        return np.concatenate([rows for rows, _ in results]), np.concatenate(
+            [scores for _, scores in results]
+        )
+
+    @staticmethod
+    def _candidates(order, bounds, clusters) -> np.ndarray:
+        # Sorted, so the memory map is read front to back
+        return np.sort(
+            np.concatenate([order[bounds[c] : bounds[c + 1]] for c in clusters])
+        )
+
+    def _scan(self, queries, candidates, live, k):
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        total = len(self) if candidates is None else len(candidates)
+        # Scratch space that float16 blocks are widened into
+        buffer = np.empty((min(BLOCK_ROWS, total), self.dim), dtype=np.float32)
+        for start in range(0, total, BLOCK_ROWS):
+            if candidates is None:
+                rows = np.arange(start, min(start + BLOCK_ROWS, total))
+                block = self._vectors[start : start + BLOCK_ROWS]
+            else:
+                rows = candidates[start : start + BLOCK_ROWS]
+                block = self._vectors[rows]
+            widened = buffer[: len(rows)]
+            np.copyto(widened, block)
+            scores = widened @ queries.T
+            scores[~live[rows]] = -np.inf
+            best_scores, best_rows = _merge_top_k(
+                best_scores, best_rows, scores.T, rows, k
+            )
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.where(
+            np.isfinite(best_scores), np.take_along_axis(best_rows, order, axis=1), -1
+        )
+        pad = k - best_scores.shape[1]
+        if pad > 0:
+            best_scores = np.pad(
+                best_scores, ((0, 0), (0, pad)), constant_values=-np.inf
+            )
+            best_rows = np.pad(best_rows, ((0, 0), (0, pad)), constant_values=-1)
+        return best_rows, best_scores
+
+    def _results(self, rows, scores) -> list[SimilarChapter]:
+        results = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            if row < 0:
+                continue
+            doc = self.doc(row)
+            results.append(
+                SimilarChapter(doc["book"], doc["chapter"], doc["title"], score)
+            )
+        return results
+
+    def similar(
+        self,
+        book: str,
+        chapter: int,
+        k: int = 10,
+        nprobe: int = None,
+        other_books: bool = False,
+    ) -> list[SimilarChapter]:
+        """Chapters most like `chapter` of `book` (itself excluded, and its whole book with `other_books`)."""
+        entry = self.meta["books"][book]
+        row = entry["start"] + chapter
+        exclude = [(entry["start"], entry["end"])] if other_books else [(row, row + 1)]
+        rows, scores = self.search_vectors(
+            self.vector(book, chapter), k=k, nprobe=nprobe, exclude=exclude
+        )
+        return self._results(rows[0], scores[0])
+
+    def query(self, text: str, k: int = 10, nprobe: int = None) -> list[SimilarChapter]:
+        """Chapters most like an arbitrary text."""
+        rows, scores = self.search_vectors(self.embed_text(text), k=k, nprobe=nprobe)
+        return self._results(rows[0], scores[0])
+
+    def close(self) -> None:
+        self._vectors = np.zeros((0, self.dim), dtype=np.float16)
+        self._docs = None
+
+
+def build_index(
+    index_dir: str,
+    directory: str,
+    patterns=BOOK_PATTERNS,
+    batch: int = 100,
+    clusters: int = None,
+) -> dict:
+    """Embed new or changed books under `directory`, committing every `batch` books."""
+    index = SimilarityIndex(index_dir)
+    counts = {"indexed": 0, "unchanged": 0, "error": 0, "chapters": 0}
+    for path in discover_books(directory, patterns):
+        book = os.path.normpath(path)
+        digest = file_hash(path)
+        if index.fingerprint(book) == digest:
+            counts["unchanged"] += 1
+            continue
+        try:
+            index.add_book(
+                book,
+                split_into_chapters(clean_gutenberg_text(load_book(path))),
+                fingerprint=digest,
+            )
+            counts["indexed"] += 1
+        except Exception as e:
+            print(f"❌ Error indexing {path}:", e)
+            counts["error"] += 1
+        if len(index._pending) >= batch:
+            counts["chapters"] += index.commit()
+    counts["chapters"] += index.commit()
+    if clusters is not None:
+        index.train(clusters or None)
+    index.close()
+    return counts
+
+
+def _print_results(results: list[SimilarChapter], elapsed_ms: float) -> None:
+    for hit in results:
+        print(f"📖 {hit.score:.3f}  {hit.book} — {hit.title} (chapter {hit.chapter})")
+    print(f"🔎 {len(results)} results in {elapsed_ms:.1f} ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build and query a chapter similarity index."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="embed new or changed books")
+    build.add_argument("index", help="index directory")
+    build.add_argument("directory", help="directory containing book files")
+    build.add_argument("--batch", type=int, default=100, help="books per commit")
+    build.add_argument(
+        "--clusters",
+        type=int,
+        nargs="?",
+        const=0,
+        help="(re)train coarse clusters afterwards (default count: sqrt of the chapters)",
+    )
+    train = commands.add_parser("train", help="(re)train coarse clusters")
+    train.add_argument("index", help="index directory")
+    train.add_argument(
+        "--clusters",
+        type=int,
+        help="number of clusters (default: sqrt of the chapters)",
+    )
+    similar = commands.add_parser("similar", help="chapters like a given chapter")
+    similar.add_argument("index", help="index directory")
+    similar.add_argument("book", help="book path as indexed")
+    similar.add_argument("chapter", type=int, help="chapter number, from 0")
+    similar.add_argument(
+        "--other-books", action="store_true", help="skip chapters of the same book"
+    )
+    query = commands.add_parser("query", help="chapters like a piece of text")
+    query.add_argument("index", help="index directory")
+    query.add_argument("text", help="text to match")
+    for command in (similar, query):
+        command.add_argument("--limit", type=int, default=10)
+        command.add_argument(
+            "--nprobe",
+            type=int,
+            help=f"clusters to scan (default {DEFAULT_NPROBE}, 0 for all)",
+        )
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        counts = build_index(
+            args.index, args.directory, batch=args.batch, clusters=args.clusters
+        )
+        print(
+            f"✅ Embedded {counts['chapters']} chapters from {counts['indexed']} books "
+            f"({counts['unchanged']} unchanged, {counts['error']} failed) in {time.perf_counter() - started:.1f}s"
+        )
+        return 1 if counts["error"] else 0
+
+    index = SimilarityIndex(args.index)
+    if args.command == "train":
+        clusters = index.train(args.clusters)
+        print(f"✅ Trained {clusters} clusters over {len(index)} chapters")
+        return 0
+
+    started = time.perf_counter()
+    if args.command == "similar":
+        book = (
+            args.book
+            if args.book in index.meta["books"]
+            else os.path.normpath(args.book)
+        )
+        if book not in index.meta["books"]:
+            print(f"❌ {args.book} is not in the index")
+            return 1
+        try:
+            results = index.similar(
+                book,
+                args.chapter,
+                k=args.limit,
+                nprobe=args.nprobe,
+                other_books=args.other_books,
+            )
+        except IndexError as e:
+            print(f"❌ {e}")
+            return 1
+    else:
+        results = index.query(args.text, k=args.limit, nprobe=args.nprobe)
+    _print_results(results, (time.perf_counter() - started) * 1000)
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
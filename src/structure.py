@@ -1,21 +1,13 @@
 import re
 from typing import List, Tuple
 
-
-def clean_gutenberg_text(text: str) -> str:
-    """Removes Project Gutenberg license boilerplate and returns clean book content."""
-    start_marker = "*** START OF THE PROJECT GUTENBERG EBOOK"
-    end_marker = "*** END OF THE PROJECT GUTENBERG EBOOK"
-
-    start_idx = text.find(start_marker)
-    if start_idx != -1:
-        text = text[start_idx + len(start_marker):]
-
-    end_idx = text.find(end_marker)
-    if end_idx != -1:
-        text = text[:end_idx]
-
-    return text.strip()
+try:
+    # The one cleaner, still importable from here
+    from .ingest import clean_gutenberg_text
+    from .metrics import instrument
+except ImportError:
+    from ingest import clean_gutenberg_text
+    from metrics import instrument
 
 
 def roman_to_int(roman: str) -> int:
@@ -38,147 +30,443 @@ def roman_to_int(roman: str) -> int:
     return result
 
 
-def split_by_letter_number(text: str) -> list[dict]:
-    """Splits the text into 'Letter <N>' epistolary chapters, skipping TOC."""
-
-    # Match 'CONTENTS' heading (assumes all caps on its own line)
-    toc_match = re.search(r'^\s*CONTENTS\s*$', text, re.MULTILINE)
-
-    # Match all 'Letter <number>' lines
-    pattern = re.compile(r'^\s*(Letter\s+\d+)\s*$', re.IGNORECASE | re.MULTILINE)
-    matches = list(pattern.finditer(text))
-
-    # If TOC and at least 2 'Letter' headers are found
-    if toc_match and len(matches) > 1:
-        # Find the first 'Letter 1' that comes AFTER the TOC
-        for match in matches:
-            if match.start() > toc_match.end() and match.group(1).strip().lower() == "letter 1":
-                text = text[match.start():]
-                break
-
-    # Recompute matches from updated text
-    matches = list(pattern.finditer(text))
-    chapters = []
-
-    for i, match in enumerate(matches):
-        start = match.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        title = match.group(1).strip()
-        content = text[start:end].strip()
-        chapters.append({
-            "title": title,
-            "content": content
-        })
-
-    return chapters
-
+class Chapter:
+    """
+    One chapter, stored as offsets into the shared text of its book.
+
+    Content is only materialized when asked for, so a split book costs little
+    more than its text. Chapters also behave like the {"title", "content"[,
+    "part"]} dicts the splitters used to return.
+    """
+
+    __slots__ = (
+        "buffer",
+        "title",
+        "start",
+        "end",
+        "part",
+        "encoding",
+        "_skipped",
+        "_extra",
+    )
+
+    def __init__(
+        self,
+        buffer,
+        title: str,
+        start: int,
+        end: int,
+        part: str = None,
+        skipped: tuple = (),
+        encoding: str = "utf-8",
+    ):
+        self.buffer = buffer
+        self.title = title
+        self.start = start
+        self.end = end
+        self.part = part
+        self.encoding = encoding  # of a bytes-like buffer
+        self._skipped = (
+            skipped  # (start, end) ranges inside the span left out of the content
+        )
+        self._extra = None
+
+    def _raw(self):
+        if not self._skipped:
+            return self.buffer[self.start : self.end]
+        pieces = []
+        pos = self.start
+        for skip_start, skip_end in self._skipped:
+            pieces.append(self.buffer[pos:skip_start])
+            pos = skip_end
+        pieces.append(self.buffer[pos : max(pos, self.end)])
+        return pieces[0][:0].join(pieces).strip()
+
+    @property
+    def content(self) -> str:
+        if self._extra and "content" in self._extra:
+            return self._extra["content"]
+        raw = self._raw()
+        return (
+            raw
+            if isinstance(raw, str)
+            else bytes(raw).decode(self.encoding, errors="replace")
+        )
+
+    def view(self):
+        """Return the content without copying: a memoryview for bytes-backed buffers."""
+        if isinstance(self.buffer, str):
+            return self.content
+        if self._skipped:
+            return memoryview(self._raw())
+        return memoryview(self.buffer)[self.start : self.end]
+
+    # --- dict compatibility ---
+    def keys(self) -> list[str]:
+        keys = ["title", "content"]
+        if self.part is not None:
+            keys.append("part")
+        if self._extra:
+            keys.extend(k for k in self._extra if k not in keys)
+        return keys
+
+    def __getitem__(self, key):
+        if key == "title":
+            return self.title
+        if key == "content":
+            return self.content
+        if key == "part" and self.part is not None:
+            return self.part
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in ("title", "part"):
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self) -> list[tuple]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self) -> list:
+        return [self[key] for key in self.keys()]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, (Chapter, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        part = f", part={self.part!r}" if self.part is not None else ""
+        return (
+            f"Chapter(title={self.title!r}{part}, start={self.start}, end={self.end})"
+        )
+
+
+# Every heading grammar we know about, compiled into one pattern so a book
+# can be classified and split in a single linear scan. Each alternative is
+# confined to one line; the splitters below decide which matches count.
+_HEADING_GRAMMAR = (
+    r"[^\S\n]*(?:"
+    r"(?P<letter>Letter[^\S\n]+\d+)[^\S\n]*$"
+    r"|(?P<part>PART[^\S\n]+[IVXLC]+)[^\S\n]*$"
+    r"|Chapter[^\S\n]+\d+(?P<chapter>.*)$"
+    r"|(?P<roman>[IVXLC]+)\.(?P<roman_title>.*)$"
+    r"|(?P<contents>CONTENTS)[^\S\n]*$"
+    r")"
+)
+
+
+class _Grammar:
+    """The heading patterns compiled for either str or bytes-like text."""
+
+    def __init__(self, literal):
+        self.literal = literal
+        flags = re.IGNORECASE | re.MULTILINE
+        self.heading = re.compile(literal("^" + _HEADING_GRAMMAR), flags)
+        # Same grammar behind a literal newline, which lets the regex engine skip
+        # ahead between candidate lines instead of testing every position for ^
+        self.heading_after_newline = re.compile(
+            literal(r"\n" + _HEADING_GRAMMAR), flags
+        )
+        self.chapter_title = re.compile(literal(r"[:.]?\s+(.*)"))
+        self.minor_title = re.compile(literal(r"\.?\s+(.*)"))
+        self.roman_title = re.compile(literal(r"\s+(.*)"))
+
+
+_STR_GRAMMAR = _Grammar(lambda s: s)
+_BYTES_GRAMMAR = _Grammar(lambda s: s.encode("ascii"))
+
+
+def _grammar(text) -> _Grammar:
+    return _STR_GRAMMAR if isinstance(text, str) else _BYTES_GRAMMAR
+
+
+def _as_str(value, encoding: str = "utf-8") -> str:
+    return value if isinstance(value, str) else value.decode(encoding, errors="replace")
+
+
+def _scan_headings(text) -> list:
+    """Return every candidate heading line in `text`, in order."""
+    grammar = _grammar(text)
+    headings = []
+    first = grammar.heading.match(text)
+    if first:
+        headings.append(first)
+    for candidate in grammar.heading_after_newline.finditer(text):
+        headings.append(grammar.heading.match(text, candidate.start() + 1))
+    return headings
+
+
+def _classify(text, headings: list) -> str:
+    kinds = set()
+    for match in headings:
+        kind = match.lastgroup
+        if kind == "roman_title":
+            # Detection (unlike splitting) wants upper-case numerals followed by whitespace
+            title = match.group("roman_title")
+            if match.group("roman").isupper() and (
+                title[:1].isspace() or (not title and match.end() < len(text))
+            ):
+                kinds.add("roman")
+        else:
+            kinds.add(kind)
 
-def detect_book_structure(text: str) -> str:
-    # Detect letter-number format first (more specific)
-    if re.search(r'^\s*Letter\s+\d+\s*$', text, re.IGNORECASE | re.MULTILINE):
+    # Letter-number format first (more specific), then multi-tier like PART I,
+    # then numbered chapters like "Chapter 1", then roman numerals
+    if "letter" in kinds:
         return "letter_number"
-    
-    # Then multi-tier like PART I
-    elif re.search(r'^\s*PART\s+[IVXLC]+\s*$', text, re.IGNORECASE | re.MULTILINE):
+    elif "part" in kinds:
         return "multi_tier"
-    
-    # Then numbered chapters like "Chapter 1"
-    elif re.search(r'^\s*Chapter\s+\d+', text, re.IGNORECASE | re.MULTILINE):
+    elif "chapter" in kinds:
         return "chapter_number"
-    
-    # Then fallback to roman numeral format
-    elif re.search(r'^\s*[IVXLC]+\.\s+', text, re.MULTILINE):
+    elif "roman" in kinds:
         return "roman_numeral"
-    
     else:
         return "unknown"
 
 
-def split_major_sections(text: str) -> list[Tuple[str, str]]:
-    pattern = re.compile(r'^\s*(PART\s+[IVXLC]+)\s*$', re.IGNORECASE | re.MULTILINE)
-    matches = list(pattern.finditer(text))
-    parts = []
+def _line_after(text, match) -> int:
+    return min(match.end() + 1, len(text))
 
-    for i, match in enumerate(matches):
-        start = match.end()
-        end = matches[i+1].start() if i + 1 < len(matches) else len(text)
-        part_title = match.group(1).strip()
-        part_content = text[start:end].strip()
-        parts.append((part_title, part_content))
 
-    return parts
+def _strip_bounds(text, start: int, end: int) -> tuple[int, int]:
+    """Offsets of text[start:end].strip() without building the slice."""
+    while start < end and text[start : start + 1].isspace():
+        start += 1
+    while end > start and text[end - 1 : end].isspace():
+        end -= 1
+    return start, end
 
 
-def split_minor_sections(section_text: str) -> list[dict]:
-    chapter_pattern = re.compile(r'^\s*Chapter\s+(\d+)\.?\s+(.*)', re.IGNORECASE | re.MULTILINE)
-    lines = section_text.splitlines()
+def _collect_chapters(
+    text,
+    headings: list,
+    title_of,
+    region_end: int,
+    dedupe: bool = False,
+    part: str = None,
+    encoding: str = "utf-8",
+) -> list[Chapter]:
+    """
+    Turn heading matches into chapters, line-for-line like the old splitters.
+
+    A heading's content runs to the next accepted heading. Headings whose title
+    was already used are skipped (their line is dropped from the content) when
+    `dedupe` is set, which filters out table-of-contents entries.
+    """
     chapters = []
+    seen = set()
     current_title = None
-    current_lines = []
-
-    for line in lines:
-        match = chapter_pattern.match(line)
-        if match:
-            if current_title:
-                chapters.append({
-                    "title": current_title,
-                    "content": "\n".join(current_lines).strip()
-                })
-            current_title = match.group(2).strip()
-            current_lines = []
-        elif current_title:
-            current_lines.append(line)
-
-    if current_title and current_lines:
-        chapters.append({
-            "title": current_title,
-            "content": "\n".join(current_lines).strip()
-        })
+    body_start = 0
+    skipped = []
+
+    def make_chapter(end):
+        if not skipped:
+            return Chapter(
+                text,
+                current_title,
+                *_strip_bounds(text, body_start, end),
+                part=part,
+                encoding=encoding,
+            )
+        ranges = tuple((m.start(), _line_after(text, m)) for m in skipped)
+        return Chapter(
+            text,
+            current_title,
+            body_start,
+            end,
+            part=part,
+            skipped=ranges,
+            encoding=encoding,
+        )
+
+    def has_lines(end):
+        pos, length = body_start, 0
+        for match in skipped:
+            length += match.start() - pos
+            pos = _line_after(text, match)
+        return length + max(0, end - pos) > 0
+
+    for match in headings:
+        title = title_of(match, min(match.end(), region_end))
+        if title is None:
+            continue
+
+        # Avoid TOC duplicates
+        if dedupe and title.lower() in seen:
+            skipped.append(match)
+            continue
+
+        if current_title:
+            chapters.append(make_chapter(match.start()))
+            seen.add(current_title.lower())
+
+        current_title = title
+        body_start = _line_after(text, match)
+        skipped = []
+
+    if current_title and has_lines(region_end):
+        chapters.append(make_chapter(region_end))
 
     return chapters
 
 
-def split_by_chapter_format(text: str, format_type: str) -> list[dict]:
+def _title_matcher(text, kind: str, title_pattern, encoding: str = "utf-8"):
+    def title_of(match, line_end):
+        if match.lastgroup != kind:
+            return None
+        title_match = title_pattern.match(text, match.start(kind), line_end)
+        return _as_str(title_match.group(1), encoding).strip() if title_match else None
+
+    return title_of
+
+
+def _letter_chapters(text, headings: list, encoding: str = "utf-8") -> list[Chapter]:
+    literal = _grammar(text).literal
+    letters = [m for m in headings if m.lastgroup == "letter"]
+    toc = next(
+        (m for m in headings if m.group("contents") == literal("CONTENTS")), None
+    )
+
+    # If a TOC and at least 2 'Letter' headers are found, start from the first
+    # 'Letter 1' that comes AFTER the TOC (not on the line right below it)
+    if toc and len(letters) > 1:
+        for i, match in enumerate(letters):
+            if (
+                match.start() <= toc.start()
+                or _as_str(match.group("letter")).strip().lower() != "letter 1"
+            ):
+                continue
+            gap = text[toc.end() : match.start("letter")]
+            if gap.isspace() and gap.count(literal("\n")) > 1:
+                continue
+            letters = letters[i:]
+            break
+
     chapters = []
-    current_title = None
-    current_lines = []
+    for i, match in enumerate(letters):
+        end = letters[i + 1].start() if i + 1 < len(letters) else len(text)
+        title = _as_str(match.group("letter"), encoding).strip()
+        chapters.append(
+            Chapter(
+                text, title, *_strip_bounds(text, match.end(), end), encoding=encoding
+            )
+        )
+    return chapters
 
+
+def _part_regions(
+    text, headings: list, encoding: str = "utf-8"
+) -> list[tuple[str, int, int, int, int]]:
+    """Return (title, start, end, first, last) per PART; first/last index into `headings`."""
+    parts = [(i, m) for i, m in enumerate(headings) if m.lastgroup == "part"]
+    regions = []
+    for n, (index, match) in enumerate(parts):
+        if n + 1 < len(parts):
+            next_index, next_match = parts[n + 1]
+            end = next_match.start()
+        else:
+            next_index, end = len(headings), len(text)
+        # Equivalent of .strip() on the part's text, kept as offsets
+        start, end = _strip_bounds(text, _line_after(text, match), end)
+        regions.append(
+            (
+                _as_str(match.group("part"), encoding).strip(),
+                start,
+                end,
+                index + 1,
+                next_index,
+            )
+        )
+    return regions
+
+
+def _multi_tier_chapters(
+    text, headings: list, encoding: str = "utf-8"
+) -> list[Chapter]:
+    title_of = _title_matcher(text, "chapter", _grammar(text).minor_title, encoding)
+    all_chapters = []
+    for part_title, _start, end, first, last in _part_regions(text, headings, encoding):
+        all_chapters.extend(
+            _collect_chapters(
+                text,
+                headings[first:last],
+                title_of,
+                end,
+                part=part_title,
+                encoding=encoding,
+            )
+        )
+    return all_chapters
+
+
+def _format_chapters(
+    text, headings: list, format_type: str, encoding: str = "utf-8"
+) -> list[Chapter]:
+    grammar = _grammar(text)
     if format_type == "roman_numeral":
-        pattern = re.compile(r'^\s*([IVXLC]+)\.\s+(.*)', re.IGNORECASE)
+        title_of = _title_matcher(text, "roman_title", grammar.roman_title, encoding)
     elif format_type == "chapter_number":
-        pattern = re.compile(r'^\s*Chapter\s+\d+[:.]?\s+(.*)', re.IGNORECASE)
+        title_of = _title_matcher(text, "chapter", grammar.chapter_title, encoding)
     else:
         return []
+    return _collect_chapters(
+        text, headings, title_of, len(text), dedupe=True, encoding=encoding
+    )
 
-    lines = text.splitlines()
 
-    for line in lines:
-        match = pattern.match(line)
-        if match:
-            title = match.group(2).strip() if format_type == "roman_numeral" else match.group(1).strip()
+def split_by_letter_number(text: str) -> list[dict]:
+    """Splits the text into 'Letter <N>' epistolary chapters, skipping TOC."""
+    return _letter_chapters(text, _scan_headings(text))
 
-            # Avoid TOC duplicates
-            if any(ch["title"].lower() == title.lower() for ch in chapters):
-                continue
 
-            if current_title:
-                chapters.append({
-                    "title": current_title,
-                    "content": "\n".join(current_lines).strip()
-                })
+def detect_book_structure(text: str) -> str:
+    return _classify(text, _scan_headings(text))
 
-            current_title = title
-            current_lines = []
-        elif current_title:
-            current_lines.append(line)
 
-    if current_title and current_lines:
-        chapters.append({
-            "title": current_title,
-            "content": "\n".join(current_lines).strip()
-        })
+def split_major_sections(text: str) -> list[Tuple[str, str]]:
+    return [
+        (title, text[start:end])
+        for title, start, end, _, _ in _part_regions(text, _scan_headings(text))
+    ]
 
-    return chapters
+
+def split_minor_sections(section_text: str) -> list[dict]:
+    title_of = _title_matcher(
+        section_text, "chapter", _grammar(section_text).minor_title
+    )
+    return _collect_chapters(
+        section_text, _scan_headings(section_text), title_of, len(section_text)
+    )
+
+
+def split_by_chapter_format(text: str, format_type: str) -> list[dict]:
+    return _format_chapters(text, _scan_headings(text), format_type)
 
 
 def split_epistolary_letters(text: str) -> list[dict]:
@@ -208,25 +496,30 @@ def split_epistolary_letters(text: str) -> list[dict]:
     return chapters
 
 
-def split_into_chapters(text: str) -> list[dict]:
-    structure = detect_book_structure(text)
+@instrument("split", lambda result: {"items": len(result[1])})
+def detect_and_split(text, encoding: str = "utf-8") -> tuple[str, list[Chapter]]:
+    """
+    Detect the book's structure and split it into chapters in one scan.
+
+    `text` may be a str or a bytes-like buffer such as an mmap; in the latter
+    case chapter offsets are byte offsets, `Chapter.view()` is zero-copy and
+    titles and content are decoded with `encoding` (any ASCII-compatible one).
+    """
+    headings = _scan_headings(text)
+    structure = _classify(text, headings)
 
     if structure == "multi_tier":
-        sections = split_major_sections(text)
-        all_chapters = []
-        for part_title, part_text in sections:
-            chapters = split_minor_sections(part_text)
-            for chap in chapters:
-                chap["part"] = part_title
-                all_chapters.append(chap)
-        return all_chapters
+        return structure, _multi_tier_chapters(text, headings, encoding)
 
     elif structure in {"roman_numeral", "chapter_number"}:
-        return split_by_chapter_format(text, structure)
+        return structure, _format_chapters(text, headings, structure, encoding)
 
     elif structure == "letter_number":
-        return split_by_letter_number(text)
+        return structure, _letter_chapters(text, headings, encoding)
 
     else:
-        return []
+        return structure, []
+
 
+def split_into_chapters(text: str, encoding: str = "utf-8") -> list[dict]:
+    return detect_and_split(text, encoding)[1]
@@ -1,126 +1,520 @@
-"""Summarizes long texts using Hugging Face transformers (BART model).
-"""
+"""Summarizes long texts through a pluggable backend (BART by default, see backends.py)."""
+
+from dataclasses import dataclass, field
 from tqdm import tqdm
-from transformers import pipeline, AutoTokenizer
-import textwrap
-import math
-
-# Load the summarization pipeline once globally for reuse
-summarizer_pipeline = pipeline("summarization", model="facebook/bart-large-cnn")
-
-tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
-
-def chunk_by_tokens(text: str, max_tokens: int = 1024, overlap: int = 100) -> list[str]:
-    tokens = tokenizer.tokenize(text)
-    chunks = []
-    start = 0
-    while start < len(tokens):
-        end = min(start + max_tokens, len(tokens))
-        chunk = tokenizer.convert_tokens_to_string(tokens[start:end])
-        chunks.append(chunk)
-        start = end - overlap  # Slide window
-    return chunks
-
-def summarize_text(text, max_length=200, min_length=80):
-    prompt = f"Summarize this literary passage:\n{text.strip()}"
-    return summarizer_pipeline(
+import time
+
+try:
+    from . import backends, export, extractive, metrics, models
+    from .cache import get_default_cache
+    from .chunking import chunk_text
+except ImportError:
+    import backends
+    import export
+    import extractive
+    import metrics
+    import models
+    from cache import get_default_cache
+    from chunking import chunk_text
+
+SUMMARIZE_PROMPT = "Summarize this literary passage:\n{text}"
+REFINE_PROMPT = (
+    "Rewrite the following chapter summary into clear, expanded narrative prose "
+    "that preserves key events, character motivations, and emotional tone:\n\n{text}"
+)
+
+
+def __getattr__(name):
+    # Backwards-compatible access to the old module-level globals, now lazy.
+    if name == "summarizer_pipeline":
+        return models.get_summarizer()
+    if name == "tokenizer":
+        return models.get_tokenizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def chunk_by_tokens(
+    text: str, max_tokens: int = 1024, overlap: int = 100, tokenizer=None
+) -> list[str]:
+    if tokenizer is None:
+        tokenizer = models.get_tokenizer()
+    return [
+        chunk.text
+        for chunk in chunk_text(text, tokenizer, max_tokens=max_tokens, overlap=overlap)
+    ]
+
+
+def _resolve_cache(cache):
+    # None means "use the configured default"; False turns caching off for the call.
+    if cache is None:
+        return get_default_cache()
+    return cache or None
+
+
+def _prompt(summarizer, template: str, text: str) -> str:
+    # Extractive backends would copy the instruction into the summary, so they get the bare text
+    return (
+        template.format(text=text)
+        if getattr(summarizer, "uses_prompts", True)
+        else text
+    )
+
+
+def _cache_key(cache, summarizer, text, template, **params):
+    return cache.make_key(
+        text, backends.model_name(summarizer), dict(params, template=template)
+    )
+
+
+def _cache_put(cache, key, summary) -> None:
+    # A failed cache write only costs a future hit, never the summary itself
+    try:
+        cache.put(key, summary)
+    except Exception as e:
+        print("⚠️ Could not write summary to cache:", e)
+
+
+def _call(summarizer, texts, input_tokens: int = 0, **params) -> list:
+    """Call the model, recording time, batch size and tokens when metrics are on."""
+    if not metrics.is_enabled():
+        return summarizer(texts, **params)
+    size = 1 if isinstance(texts, str) else len(texts)
+    started = time.perf_counter()
+    try:
+        outputs = summarizer(texts, **params)
+    except Exception:
+        metrics.record(
+            "summarize", time.perf_counter() - started, batch_size=size, error=True
+        )
+        raise
+    metrics.record(
+        "summarize",
+        time.perf_counter() - started,
+        items=size,
+        input_tokens=input_tokens,
+        batch_size=size,
+    )
+    return outputs
+
+
+def _cached_summarize(summarizer, text, cache, template="{text}", **params) -> str:
+    """Run one pipeline call, consulting the summary cache first when one is set."""
+    if cache is None:
+        return _call(summarizer, text, **params)[0]["summary_text"]
+
+    key = _cache_key(cache, summarizer, text, template, **params)
+    summary = cache.get(key)
+    metrics.increment("cache_hits" if summary is not None else "cache_misses")
+    if summary is None:
+        summary = _call(summarizer, text, **params)[0]["summary_text"]
+        _cache_put(cache, key, summary)
+    return summary
+
+
+def summarize_text(text, max_length=200, min_length=80, summarizer=None, cache=None):
+    summarizer = backends.resolve(summarizer)
+    prompt = _prompt(summarizer, SUMMARIZE_PROMPT, text.strip())
+    return _cached_summarize(
+        summarizer,
         prompt,
+        _resolve_cache(cache),
+        template=SUMMARIZE_PROMPT,
         max_length=max_length,
         min_length=min_length,
         do_sample=False
-    )[0]["summary_text"]
+    )
+
+
+def summarize_chunks(
+    chunks: list[str],
+    token_counts: list[int],
+    summarizer=None,
+    batch_size: int = 8,
+    min_length: int = 60,
+    cache=None,
+    max_lengths: list[int] = None,
+) -> list:
+    """
+    Summarize chunks in length-sorted batches and return results in the original order.
+
+    Each chunk's max_length scales with its token count. Batches are formed from
+    neighbours in length order whose limits are within 10% of each other; the
+    tightest one is used so no summary exceeds its own chunk's limit (explicit `max_lengths`
+    override the scaling). A failed chunk yields None without affecting the rest
+    of its batch. Cached chunks skip inference entirely.
+    """
+    summarizer = backends.resolve(summarizer)
+    cache = _resolve_cache(cache)
+
+    if max_lengths is None:
+        # Scale max_length with each chunk's length
+        max_lengths = [max(80, int(count * 0.6)) for count in token_counts]
+    results = [None] * len(chunks)
+    keys = [None] * len(chunks)
+    pending = []
+    for i, chunk in enumerate(chunks):
+        if cache is not None:
+            keys[i] = _cache_key(
+                cache,
+                summarizer,
+                chunk,
+                "{text}",
+                max_length=max_lengths[i],
+                min_length=min_length,
+                do_sample=False,
+            )
+            results[i] = cache.get(keys[i])
+        if results[i] is None:
+            pending.append(i)
+    if cache is not None:
+        metrics.increment("cache_hits", len(chunks) - len(pending))
+        metrics.increment("cache_misses", len(pending))
+
+    # Batch neighbours in length order, starting a new batch when the limit drops
+    # by more than 10% so a short tail chunk can't shrink its batch-mates' summaries
+    order = sorted(
+        pending, key=lambda i: (max_lengths[i], token_counts[i]), reverse=True
+    )
+    batches = []
+    for i in order:
+        batch = batches[-1] if batches else None
+        if (
+            batch
+            and len(batch) < batch_size
+            and max_lengths[i] >= 0.9 * max_lengths[batch[0]]
+        ):
+            batch.append(i)
+        else:
+            batches.append([i])
+
+    for batch in tqdm(batches, desc="⏳ Summarizing chunks", unit="batch", leave=False):
+        max_len = min(max_lengths[i] for i in batch)
+        try:
+            outputs = _call(
+                summarizer,
+                [chunks[i] for i in batch],
+                input_tokens=sum(token_counts[i] for i in batch),
+                max_length=max_len,
+                min_length=min_length,
+                do_sample=False,
+                batch_size=len(batch),
+            )
+            for i, output in zip(batch, outputs):
+                results[i] = output["summary_text"]
+        except Exception:
+            # Retry one by one so a single bad chunk only loses itself
+            for i in batch:
+                try:
+                    results[i] = _call(
+                        summarizer,
+                        chunks[i],
+                        input_tokens=token_counts[i],
+                        max_length=max_lengths[i],
+                        min_length=min_length,
+                        do_sample=False,
+                    )[0]["summary_text"]
+                except Exception as e:
+                    print("❌ Error summarizing chunk:", e)
+
+        if cache is not None:
+            for i in batch:
+                if results[i] is not None:
+                    _cache_put(cache, keys[i], results[i])
+
+    return results
 
-def refine_summary(summary):
-    """Optional second pass if needed later with another model."""
-    return summary.strip()  # placeholder for GPT-based refinement
 
+@dataclass
+class SummaryNode:
+    """One summary in the reduction tree; leaves summarize a chunk of the source text."""
 
+    text: str
+    level: int
+    token_count: int
+    children: list = field(default_factory=list)
+    source: str = None
 
-def summarize_long_text(text: str, tokenizer=None, summarizer=None, target_tokens_per_chunk=400) -> str:
+
+@dataclass
+class SummaryTree:
+    """All levels of a hierarchical summary, from chunk summaries (level 0) upwards."""
+
+    levels: list = field(default_factory=list)
+    failed: int = 0  # chunks whose summary failed and is missing from level 0
+    input_tokens: int = 0  # chunk tokens before any pre-filtering
+    tokens_saved: int = 0  # of those, dropped by the extractive pre-filter
+
+    @property
+    def top(self) -> list:
+        return self.levels[-1] if self.levels else []
+
+    @property
+    def summary(self) -> str:
+        return " ".join(node.text for node in self.top).strip()
+
+
+def _group_for_reduction(nodes: list, fan_in: int, max_input_tokens: int) -> list[list]:
+    """Group consecutive nodes, at most `fan_in` per group and within the model's input window."""
+    groups = []
+    current, current_tokens = [], 0
+    for node in nodes:
+        if current and (
+            len(current) >= fan_in
+            or current_tokens + node.token_count > max_input_tokens
+        ):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(node)
+        current_tokens += node.token_count
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _truncate_tokens(text: str, tokenizer, max_tokens: int) -> tuple[str, int]:
+    """Cut `text` after its first `max_tokens` tokens; returns the text and its token count."""
+    encoding = tokenizer(text, return_offsets_mapping=True, add_special_tokens=False)
+    if len(encoding["input_ids"]) <= max_tokens:
+        return text, len(encoding["input_ids"])
+    return text[: encoding["offset_mapping"][max_tokens - 1][1]], max_tokens
+
+
+def prefilter_chunks(
+    chunks: list[str],
+    token_counts: list[int],
+    tokenizer,
+    ratio: float = None,
+    max_tokens: int = None,
+) -> tuple[list, list]:
     """
-    Dynamically chunk text by token count, summarize each chunk, and combine summaries.
+    Shrink each chunk to its most central sentences before the model reads it.
+
+    A chunk keeps about `ratio` of its tokens, and at most `max_tokens`
+    `tokenizer` tokens when that is set (either may be None). Sentences are
+    chosen by the extractive scorer's own word counts, so a chunk still over
+    `max_tokens` is filtered once more against the measured overshoot and
+    then cut at the limit. Returns the new texts and token counts.
+    """
+    texts, counts = [], []
+    for chunk, count in zip(chunks, token_counts):
+        over = bool(max_tokens) and count > max_tokens
+        keep = min(
+            ratio if ratio is not None else 1.0, max_tokens / count if over else 1.0
+        )
+        # A hard cap applies to chunks of any length, however few sentences they have
+        min_sentences = 1 if over else extractive.PREFILTER_MIN_SENTENCES
+        filtered = (
+            extractive.prefilter(chunk, ratio=keep, min_sentences=min_sentences)
+            if keep < 1.0
+            else chunk
+        )
+        if filtered is not chunk:
+            count = len(tokenizer(filtered, add_special_tokens=False)["input_ids"])
+        if over and count > max_tokens:
+            filtered = extractive.prefilter(
+                chunk, ratio=keep * max_tokens / count, min_sentences=1
+            )
+            filtered, count = _truncate_tokens(filtered, tokenizer, max_tokens)
+        texts.append(filtered)
+        counts.append(count)
+    return texts, counts
+
+
+def summarize_tree(
+    text: str,
+    tokenizer=None,
+    summarizer=None,
+    target_tokens_per_chunk=400,
+    batch_size=8,
+    cache=None,
+    fan_in=4,
+    max_input_tokens=1024,
+    reduce_threshold=512,
+    max_depth=16,
+    chunks=None,
+    prefilter_ratio=None,
+    prefilter_max_tokens=None,
+) -> SummaryTree:
+    """
+    Summarize text of any length by map-reduce over a tree of bounded fan-in.
+
+    Every token lands in exactly one chunk, cut on sentence boundaries, and the
+    text is tokenized once; only new summaries are ever measured again. Chunk
+    summaries form level 0. Each later level merges at most `fan_in`
+    neighbouring summaries that fit in `max_input_tokens`, and all nodes of a
+    level go through the model as one batched call. Reduction stops once the summaries of a level together fall
+    under `reduce_threshold` tokens, so depth grows as O(log n).
+
+    `chunks` takes TextChunks already produced by `chunk_text` for this text,
+    so a pipeline can chunk in a separate stage from inference.
+
+    With `prefilter_ratio` and/or `prefilter_max_tokens`, each chunk is first
+    cut down to its most central sentences (see `prefilter_chunks`), trading
+    some summary quality for fewer model input tokens; `tree.tokens_saved`
+    reports how many were dropped.
     """
+    tree = SummaryTree()
     if not text.strip():
-        return ""
+        return tree
 
-    # --- Setup tokenizer and summarizer if not provided ---
-    from transformers import pipeline, AutoTokenizer
+    # --- Use the selected backend and the tokenizer it measures lengths in ---
+    summarizer = backends.resolve(summarizer)
     if tokenizer is None:
-        tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
-    if summarizer is None:
-        summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-
-    # --- Token-based chunking ---
-    inputs = tokenizer(text, return_tensors="pt", truncation=False)
-    input_ids = inputs["input_ids"][0]
-    total_tokens = len(input_ids)
-
-    # Auto-determine number of chunks
-    num_chunks = max(1, total_tokens // target_tokens_per_chunk)
-    chunk_size = total_tokens // num_chunks
-
-    chunks = []
-    for i in range(num_chunks):
-        start = i * chunk_size
-        end = (i + 1) * chunk_size
-        chunk_ids = input_ids[start:end]
-        chunk_text = tokenizer.decode(chunk_ids, skip_special_tokens=True)
-        chunks.append(chunk_text)
-
-    # --- Summarize each chunk ---
-    from tqdm import tqdm
-    partial_summaries = []
-    for chunk in tqdm(chunks, desc="⏳ Summarizing chunks", unit="chunk", leave=False):
-        try:
-            token_len = len(tokenizer(chunk)["input_ids"])
-            max_len = max(80, int(token_len * 0.6))  # scale max_length
-            summary = summarizer(chunk, max_length=max_len, min_length=60, do_sample=False)[0]["summary_text"]
-            partial_summaries.append(summary)
-        except Exception as e:
-            print("❌ Error summarizing chunk:", e)
-
-    # --- Final summary if needed ---
-    combined_summary_input = " ".join(partial_summaries)
-    if len(tokenizer(combined_summary_input)["input_ids"]) < 512:
-        return combined_summary_input.strip()
-    
-    try:
-        final_max_len = min(300, int(len(tokenizer(combined_summary_input)["input_ids"]) * 0.6))
-        final_summary = summarizer(
-            combined_summary_input,
-            max_length=final_max_len,
-            min_length=100,
-            do_sample=False
-        )[0]["summary_text"]
-        return final_summary.strip()
-    except Exception as e:
-        print("❌ Error during final summary refinement:", e)
-        return combined_summary_input.strip()
+        tokenizer = getattr(summarizer, "tokenizer", None)
+    if tokenizer is None:
+        tokenizer = models.get_tokenizer()
+    cache = _resolve_cache(cache) or False
 
+    def count_tokens(summary):
+        count = len(tokenizer(summary, add_special_tokens=False)["input_ids"])
+        metrics.record("summarize", output_tokens=count, calls=0)
+        return count
 
+    # --- Sentence-aligned chunking that covers every token (tokenized once) ---
+    text_chunks = (
+        chunks
+        if chunks is not None
+        else chunk_text(text, tokenizer, max_tokens=target_tokens_per_chunk)
+    )
+    chunks = [chunk.text for chunk in text_chunks]
+    token_counts = [chunk.token_count for chunk in text_chunks]
+    tree.input_tokens = sum(token_counts)
 
-    
-def refine_summary(summary_text: str) -> str:
-    """Rewrite the summary into clear, expanded narrative prose."""
-    prompt = (
-        "Rewrite the following chapter summary into clear, expanded narrative prose "
-        "that preserves key events, character motivations, and emotional tone:\n\n"
-        + summary_text.strip()
+    # --- Optional extractive pre-filter: the model only reads the salient sentences ---
+    inputs, input_counts = chunks, token_counts
+    if prefilter_ratio is not None or prefilter_max_tokens is not None:
+        inputs, input_counts = prefilter_chunks(
+            chunks, token_counts, tokenizer, prefilter_ratio, prefilter_max_tokens
+        )
+        tree.tokens_saved = tree.input_tokens - sum(input_counts)
+        metrics.increment("prefilter_input_tokens", tree.input_tokens)
+        metrics.increment("prefilter_tokens_saved", tree.tokens_saved)
+
+    # --- Map: summarize chunks in batches ---
+    results = summarize_chunks(
+        inputs, input_counts, summarizer=summarizer, batch_size=batch_size, cache=cache
     )
+    level = [
+        SummaryNode(
+            text=summary, level=0, token_count=count_tokens(summary), source=chunk
+        )
+        for chunk, summary in zip(chunks, results)
+        if summary is not None
+    ]
+    tree.levels.append(level)
+    tree.failed = len(chunks) - len(level)
+
+    # --- Reduce: merge neighbouring summaries level by level ---
+    depth = 0
+    while (
+        len(level) > 1
+        and sum(node.token_count for node in level) >= reduce_threshold
+        and depth < max_depth
+    ):
+        depth += 1
+        groups = _group_for_reduction(level, fan_in, max_input_tokens)
+        # A node left alone in its group is carried up as is, unless nothing can be merged
+        merge = [len(group) > 1 for group in groups]
+        if not any(merge):
+            merge = [True] * len(groups)
+        to_merge = [group for group, flag in zip(groups, merge) if flag]
+
+        inputs = [" ".join(node.text for node in group) for group in to_merge]
+        input_counts = [sum(node.token_count for node in group) for group in to_merge]
+        max_lengths = [max(1, min(300, int(count * 0.6))) for count in input_counts]
+        merged = iter(
+            summarize_chunks(
+                inputs,
+                input_counts,
+                summarizer=summarizer,
+                batch_size=batch_size,
+                cache=cache,
+                min_length=min(100, min(max_lengths)),
+                max_lengths=max_lengths,
+            )
+        )
+
+        next_level = []
+        joined_inputs = iter(inputs)
+        for group, flag in zip(groups, merge):
+            if not flag:
+                node = group[0]
+                next_level.append(
+                    SummaryNode(
+                        text=node.text,
+                        level=depth,
+                        token_count=node.token_count,
+                        children=group,
+                    )
+                )
+                continue
+            joined, summary = next(joined_inputs), next(merged)
+            if summary is None:
+                print("❌ Error during summary reduction; keeping the unreduced text.")
+                summary = joined
+            next_level.append(
+                SummaryNode(
+                    text=summary.strip(),
+                    level=depth,
+                    token_count=count_tokens(summary),
+                    children=group,
+                )
+            )
+        level = next_level
+        tree.levels.append(level)
+
+    return tree
+
 
-    refined = summarizer_pipeline(
+def summarize_long_text(
+    text: str,
+    tokenizer=None,
+    summarizer=None,
+    target_tokens_per_chunk=400,
+    batch_size=8,
+    cache=None,
+    fan_in=4,
+    prefilter_ratio=None,
+    prefilter_max_tokens=None,
+) -> str:
+    """
+    Dynamically chunk text by token count, summarize each chunk, and combine summaries.
+    """
+    return summarize_tree(
+        text,
+        tokenizer=tokenizer,
+        summarizer=summarizer,
+        target_tokens_per_chunk=target_tokens_per_chunk,
+        batch_size=batch_size,
+        cache=cache,
+        fan_in=fan_in,
+        prefilter_ratio=prefilter_ratio,
+        prefilter_max_tokens=prefilter_max_tokens,
+    ).summary
+
+
+def refine_summary(summary_text: str, summarizer=None, cache=None) -> str:
+    """Rewrite the summary into clear, expanded narrative prose."""
+    summarizer = backends.resolve(summarizer)
+    prompt = _prompt(summarizer, REFINE_PROMPT, summary_text.strip())
+
+    return _cached_summarize(
+        summarizer,
         prompt,
+        _resolve_cache(cache),
+        template=REFINE_PROMPT,
         max_length=300,
         min_length=150,
         do_sample=False
     )
-    return refined[0]["summary_text"]
 
 
-def save_summaries(chapter_summaries, output_path):
-    """Save a list of (chapter_title, summary) tuples to a markdown file."""
-    with open(output_path, "w", encoding="utf-8") as f:
-        for chapter_title, summary in chapter_summaries:
-            f.write(f"## {chapter_title}\n\n")
-            f.write(textwrap.fill(summary, width=100))
-            f.write("\n\n")
+@metrics.instrument("write")
+def save_summaries(chapter_summaries, output_path, fmt=None):
+    """
+    Save a list of (chapter_title, summary) tuples, atomically.
+
+    The format follows the extension (.md, .jsonl, .html, .anki.csv), else Markdown.
+    For results that arrive one chapter at a time, use `export.ExportSession`.
+    """
+    export.write_summaries(chapter_summaries, output_path, fmt)
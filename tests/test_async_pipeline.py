@@ -0,0 +1,184 @@
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import chunking  # type: ignore
+import export  # type: ignore
+import pipeline  # type: ignore
+
+
+def _write_books(directory, names):
+    paths = []
+    for name in names:
+        path = directory / f"{name}.txt"
+        path.write_text(
+            "*** START OF THE PROJECT GUTENBERG EBOOK X ***\n"
+            f"Chapter 1. One\nThe {name} ship left port. It sailed north.\n"
+            f"Chapter 2. Two\nThe {name} crew saw ice. They were afraid.\n"
+            "*** END OF THE PROJECT GUTENBERG EBOOK X ***\n"
+        )
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("cpu_executor", ["thread", "process"])
+def test_pipeline_writes_every_book_and_isolates_failures(tmp_path, cpu_executor):
+    paths = _write_books(tmp_path, ["alpha", "beta", "gamma"])
+    paths.insert(1, str(tmp_path / "missing.txt"))
+
+    def fake_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        if any("beta crew" in t for t in texts):
+            raise RuntimeError("boom")
+        return [{"summary_text": t.split(".")[0] + "."} for t in texts]
+
+    results = pipeline.run_pipeline(
+        paths,
+        output_dir=str(tmp_path / "out"),
+        summarizer=fake_pipeline,
+        tokenizer=chunking.RegexTokenizer(),
+        queue_size=1,
+        cpu_executor=cpu_executor,
+        cache=False,
+    )
+
+    assert [r["status"] for r in results] == ["ok", "error", "ok", "ok"]
+    assert results[0]["structure"] == "chapter_number" and results[0]["chapters"] == 2
+    alpha = (tmp_path / "out" / "alpha.md").read_text()
+    assert alpha.index("## One") < alpha.index("## Two")
+    assert "The alpha ship left port." in alpha
+    # beta's second chapter failed every retry, so it is left out
+    beta = (tmp_path / "out" / "beta.md").read_text()
+    assert "The beta ship left port." in beta and "## Two" not in beta
+    assert [c["title"] for c in results[2]["failed_chapters"]] == ["Two"]
+
+
+def test_pipeline_cancellation_stops_promptly(tmp_path):
+    paths = _write_books(tmp_path, [f"book{i}" for i in range(20)])
+
+    def slow_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        time.sleep(0.05)
+        texts = [texts] if isinstance(texts, str) else texts
+        return [{"summary_text": t} for t in texts]
+
+    async def main():
+        run = asyncio.create_task(
+            pipeline.Pipeline(
+                output_dir=str(tmp_path / "out"),
+                summarizer=slow_pipeline,
+                tokenizer=chunking.RegexTokenizer(),
+                cpu_executor="thread",
+                cache=False,
+            ).run(paths)
+        )
+        await asyncio.sleep(0.2)
+        run.cancel()
+        started = time.perf_counter()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 1.0
+    assert len(os.listdir(tmp_path / "out")) < 20
+
+
+def test_write_and_finish_errors_mark_the_book_failed(tmp_path, monkeypatch):
+    paths = _write_books(tmp_path, ["full", "locked", "ok"])
+    add, finish = export.ExportSession.add, export.ExportSession.finish
+
+    def failing_add(self, index, title, summary):
+        if "full" in self.base_path:
+            raise OSError(28, "No space left on device")
+        return add(self, index, title, summary)
+
+    def failing_finish(self):
+        if "locked" in self.base_path:
+            raise PermissionError(13, "Permission denied")
+        return finish(self)
+
+    monkeypatch.setattr(export.ExportSession, "add", failing_add)
+    monkeypatch.setattr(export.ExportSession, "finish", failing_finish)
+    results = pipeline.run_pipeline(
+        paths,
+        output_dir=str(tmp_path / "out"),
+        summarizer=lambda texts, **kw: [{"summary_text": "S."} for t in texts],
+        tokenizer=chunking.RegexTokenizer(),
+        cpu_executor="thread",
+        cache=False,
+    )
+
+    assert [r["status"] for r in results] == ["error", "error", "ok"]
+    assert (
+        results[0]["error"].startswith("write: OSError")
+        and "Permission denied" in results[1]["error"]
+    )
+    assert not os.path.exists(tmp_path / "out" / "full.md") and os.path.exists(
+        tmp_path / "out" / "ok.md"
+    )
+
+
+def test_books_with_the_same_name_get_their_own_outputs(tmp_path):
+    (tmp_path / "sub").mkdir()
+    paths = _write_books(tmp_path, ["alpha"]) + _write_books(
+        tmp_path / "sub", ["alpha"]
+    )
+
+    results = pipeline.run_pipeline(
+        paths,
+        output_dir=str(tmp_path / "out"),
+        summarizer=lambda texts, **kw: [{"summary_text": "S."} for t in texts],
+        tokenizer=chunking.RegexTokenizer(),
+        cpu_executor="thread",
+        cache=False,
+    )
+
+    assert [r["output"] for r in results] == [
+        str(tmp_path / "out" / "alpha.md"),
+        str(tmp_path / "out" / "sub" / "alpha.md"),
+    ]
+
+
+def test_rerun_only_summarizes_chapters_missing_from_the_checkpoint(tmp_path):
+    paths = _write_books(tmp_path, ["delta"])
+    calls = []
+
+    def flaky_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        calls.extend(texts)
+        if any("crew" in t for t in texts) and len(calls) < 10:
+            raise RuntimeError("out of memory")
+        return [{"summary_text": t.split(".")[0] + "."} for t in texts]
+
+    options = dict(
+        output_dir=str(tmp_path / "out"),
+        summarizer=flaky_pipeline,
+        tokenizer=chunking.RegexTokenizer(),
+        cpu_executor="thread",
+        cache=False,
+        formats=("markdown", "jsonl"),
+    )
+    first = pipeline.run_pipeline(paths, **options)
+    assert "## Two" not in (tmp_path / "out" / "delta.md").read_text()
+    # Kept for the chapter that failed
+    assert os.path.exists(tmp_path / "out" / "delta.journal.jsonl")
+
+    calls.extend([""] * 10)  # the model recovers
+    before = len(calls)
+    second = pipeline.run_pipeline(paths, **options)
+    assert second[0]["resumed"] == 1
+    # Chapter one came from the checkpoint
+    assert not any("ship" in t for t in calls[before:])
+    markdown = (tmp_path / "out" / "delta.md").read_text()
+    assert markdown.index("The delta ship left port.") < markdown.index(
+        "The delta crew saw ice."
+    )
+    assert len((tmp_path / "out" / "delta.jsonl").read_text().splitlines()) == 2
+    assert not os.path.exists(tmp_path / "out" / "delta.journal.jsonl")
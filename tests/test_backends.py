@@ -0,0 +1,48 @@
+import sys
+import os
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import backends  # type: ignore
+import models  # type: ignore
+import summarizer  # type: ignore
+
+
+def test_backend_selectable_per_call_and_per_run(monkeypatch):
+    text = "The whale is a mammal. It breathes air. The whale lives in the sea."
+    monkeypatch.setattr(
+        models,
+        "_load_summarizer",
+        lambda *args: (_ for _ in ()).throw(AssertionError("loaded BART")),
+    )
+
+    # The extractive backend never sees the instruction prompt and never loads weights
+    result = summarizer.summarize_text(
+        text, max_length=8, min_length=1, summarizer="extractive", cache=False
+    )
+    assert result and "Summarize" not in result
+
+    monkeypatch.setenv("SUMMARIZER_BACKEND", "extractive")
+    assert isinstance(backends.get_backend(), backends.ExtractiveBackend)
+    backends.set_default_backend("bart")
+    try:
+        assert isinstance(backends.get_backend(), backends.BartBackend)
+    finally:
+        backends.set_default_backend(None)
+
+
+def test_extractive_backend_summarizes_long_text_without_models():
+    sentences = [
+        f"Sentence {i} tells of the voyage and the ice number {i % 7}."
+        for i in range(400)
+    ]
+    tree = summarizer.summarize_tree(
+        " ".join(sentences), summarizer="extractive", cache=False
+    )
+
+    assert tree.levels and tree.summary
+    assert len(tree.levels) >= 2
+    assert models.loaded_models() == []
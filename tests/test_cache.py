@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import cache  # type: ignore
+import summarizer  # type: ignore
+
+
+def test_cache_key_depends_on_text_model_and_params():
+    key = cache.SummaryCache.make_key("text", "bart", {"max_length": 200})
+    assert key == cache.SummaryCache.make_key("text", "bart", {"max_length": 200})
+    assert key != cache.SummaryCache.make_key("text!", "bart", {"max_length": 200})
+    assert key != cache.SummaryCache.make_key("text", "t5", {"max_length": 200})
+    assert key != cache.SummaryCache.make_key("text", "bart", {"max_length": 100})
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    store = cache.SummaryCache(str(tmp_path), max_entries=2)
+    store.put("aa1", "first")
+    store.put("bb2", "second")
+    past = time.time() - 100
+    os.utime(store._path("aa1"), (past, past))
+    os.utime(store._path("bb2"), (past + 1, past + 1))
+    assert store.get("aa1") == "first"  # touching makes bb2 the oldest
+
+    store.put("cc3", "third")
+
+    assert store.get("bb2") is None
+    assert store.get("aa1") == "first"
+    assert store.get("cc3") == "third"
+    stats = store.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_summarize_text_reuses_cached_summary(tmp_path):
+    calls = []
+
+    def fake_pipeline(prompt, **kwargs):
+        calls.append(prompt)
+        return [{"summary_text": "A whale."}]
+
+    store = cache.SummaryCache(str(tmp_path))
+    for _ in range(2):
+        assert (
+            summarizer.summarize_text(
+                "The whale.", summarizer=fake_pipeline, cache=store
+            )
+            == "A whale."
+        )
+
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 1
+
+
+def test_cache_ignores_temp_files_and_overwrites_keep_usage(tmp_path):
+    store = cache.SummaryCache(str(tmp_path), max_entries=2)
+    in_flight = tmp_path / "aa" / ".tmp-1234aa1.json"
+    in_flight.parent.mkdir()
+    in_flight.write_text("{}")
+
+    store.put("aa1", "first")
+    store.put("aa1", "first again")
+    store.put("bb2", "second")
+
+    assert store.stats()["evictions"] == 0
+    assert in_flight.exists()
+    assert store._usage[1] == 2
+
+
+def test_cache_write_failure_does_not_break_summarization(tmp_path):
+    class ReadOnlyCache(cache.SummaryCache):
+        def put(self, key, summary):
+            raise OSError("disk full")
+
+    fake_pipeline = lambda prompt, **kwargs: [{"summary_text": "A whale."}]
+    store = ReadOnlyCache(str(tmp_path))
+    assert (
+        summarizer.summarize_text("The whale.", summarizer=fake_pipeline, cache=store)
+        == "A whale."
+    )
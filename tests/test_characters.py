@@ -0,0 +1,54 @@
+import sys
+import os
+import xml.etree.ElementTree as ET
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import characters  # type: ignore
+
+CHAPTERS = [
+    {
+        "title": "One",
+        "content": (
+            "Elizabeth Bennet walked out. Mr. Darcy followed her. When Elizabeth turned, Darcy bowed.\n\n"
+            "Jane Bennet smiled at Elizabeth. Mr. Bennet laughed. Mrs. Bennet cried over Jane.\n"
+            "Elizabeth and Jane talked. Fitzwilliam Darcy wrote a letter. Mr. Bennet read. Mrs. Bennet sighed."
+        ),
+    },
+    {"title": "Two", "content": "Elizabeth met Darcy again. Jane was away."},
+]
+
+
+def test_aliases_fold_into_full_names_but_keep_titled_namesakes_apart():
+    network = characters.build_network(CHAPTERS, min_mentions=2)
+
+    assert network.names[:3] == ["Elizabeth Bennet", "Fitzwilliam Darcy", "Jane Bennet"]
+    assert {"Mr. Bennet", "Mrs. Bennet"} <= set(network.names)
+    assert network.aliases["Mr. Darcy"] == "Fitzwilliam Darcy"
+    assert network.aliases["Elizabeth"] == "Elizabeth Bennet"
+    assert "When Elizabeth" not in network.aliases
+
+
+def test_per_chapter_cumulative_and_exported_graphs(tmp_path):
+    network = characters.build_network(CHAPTERS, min_mentions=2)
+
+    # "Mr. Darcy followed her." is not split at the abbreviation
+    assert ("Elizabeth Bennet", "Jane Bennet", 2) in network.graph(0)
+    assert network.graph(1) == [("Elizabeth Bennet", "Fitzwilliam Darcy", 1)]
+    assert ("Elizabeth Bennet", "Fitzwilliam Darcy", 2) in network.graph(
+        1, cumulative=True
+    )
+    assert network.graph(1, cumulative=True) == network.graph()
+
+    paragraphs = characters.build_network(CHAPTERS, window="paragraph", min_mentions=2)
+    assert ("Mr. Bennet", "Mrs. Bennet", 1) in paragraphs.graph(0)
+
+    path = tmp_path / "network.graphml"
+    network.write_graphml(str(path))
+    ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    root = ET.parse(path).getroot()
+    assert len(root.findall(".//g:node", ns)) == len(network.names)
+    assert len(root.findall(".//g:edge", ns)) == len(network.graph())
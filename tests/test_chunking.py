@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import chunking  # type: ignore
+
+
+class _CountingTokenizer(chunking.RegexTokenizer):
+    calls = 0
+
+    def __call__(self, text, **kwargs):
+        self.calls += 1
+        return super().__call__(text, **kwargs)
+
+
+def test_chunk_text_cuts_on_sentences_and_tokenizes_once():
+    text = "The ship left port. It sailed north for days! Then a storm came. All hands were lost."
+    tokenizer = _CountingTokenizer()
+
+    chunks = chunking.chunk_text(text, tokenizer, max_tokens=12)
+
+    assert tokenizer.calls == 1
+    assert [c.text for c in chunks] == [
+        "The ship left port. It sailed north for days!",
+        "Then a storm came. All hands were lost.",
+    ]
+    assert all(c.token_count <= 12 for c in chunks)
+    assert text[chunks[1].start : chunks[1].end] == chunks[1].text
+    assert sum(c.token_count for c in chunks) == len(tokenizer(text)["input_ids"])
+
+
+def test_chunk_text_overlap_starts_at_a_sentence():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+
+    chunks = chunking.chunk_text(
+        text, chunking.RegexTokenizer(), max_tokens=8, overlap=4
+    )
+
+    assert chunks[0].text == "One two three. Four five six."
+    assert chunks[1].text.startswith("Four five six.")
+    assert chunks[-1].text.endswith("Ten eleven twelve.")
+
+
+def test_chunk_text_hard_cuts_overlong_sentences():
+    text = " ".join(f"w{i}" for i in range(25))
+    chunks = chunking.chunk_text(text, chunking.RegexTokenizer(), max_tokens=10)
+    assert [c.token_count for c in chunks] == [10, 10, 5]
+
+
+def test_regex_tokenizer_keeps_no_vocabulary():
+    tokenizer = chunking.RegexTokenizer()
+    first = tokenizer("The whale sank the ship.")["input_ids"]
+    tokenizer(" ".join(f"word{i}" for i in range(10_000)))
+
+    assert vars(tokenizer) == {}
+    assert tokenizer("The whale sank the ship.")["input_ids"] == first
+    assert chunking.RegexTokenizer()("ship")["input_ids"] == [first[4]]
@@ -0,0 +1,53 @@
+import sys
+import os
+import json
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import corpus  # type: ignore
+
+
+def test_ingest_corpus_streams_records_and_isolates_failures(tmp_path):
+    books = tmp_path / "books"
+    books.mkdir()
+    for name in ("alpha", "beta"):
+        (books / f"{name}.txt").write_text(
+            "*** START OF THE PROJECT GUTENBERG EBOOK X ***\n"
+            "Chapter 1. One\nText.\nChapter 2. Two\nMore text.\n"
+            "*** END OF THE PROJECT GUTENBERG EBOOK X ***\n"
+        )
+    # Legacy encodings now decode, so the unreadable book is a truncated archive
+    (books / "broken.txt.gz").write_bytes(b"\x1f\x8b\x08\x00 truncated")
+    manifest = tmp_path / "manifest.jsonl"
+
+    counts = corpus.ingest_corpus(str(books), str(manifest), workers=2)
+
+    records = {
+        os.path.basename(r["path"]): r
+        for r in map(json.loads, manifest.read_text().splitlines())
+    }
+    assert counts == {"books": 3, "ok": 2, "error": 1}
+    assert records["alpha.txt"]["structure"] == "chapter_number"
+    assert records["alpha.txt"]["chapters"] == 2
+    assert "total" in records["beta.txt"]["timings"]
+    assert records["broken.txt.gz"]["status"] == "error"
+
+
+def test_output_names_follow_the_path_under_the_root_and_never_collide():
+    root = os.path.join("books")
+    paths = [
+        os.path.join(root, name)
+        for name in ("a.txt", "a.txt.gz", "b.txt.bz2", os.path.join("sub", "a.txt"))
+    ]
+
+    names = corpus.output_names(paths, root)
+
+    assert names == {
+        paths[0]: "a.txt",
+        paths[1]: "a.txt.gz",
+        paths[2]: "b",
+        paths[3]: os.path.join("sub", "a"),
+    }
@@ -0,0 +1,121 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import chunking  # type: ignore
+import daemon  # type: ignore
+
+
+class FakeModel:
+    """Pipeline double that records how many texts each call carried."""
+
+    model_name = "fake-model"
+    tokenizer = chunking.RegexTokenizer()
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        self.batches.append(len(texts))
+        time.sleep(0.02)
+        return [
+            {"summary_text": t.split(":")[-1].strip().split(".")[0] + "."}
+            for t in texts
+        ]
+
+
+@pytest.fixture
+def served(tmp_path):
+    model = FakeModel()
+    server = daemon.SummarizerDaemon(model, max_wait=0.02)
+    address = str(tmp_path / "daemon.sock")
+    thread = threading.Thread(
+        target=asyncio.run, args=(server.serve(address),), daemon=True
+    )
+    thread.start()
+    assert server.wait_ready(5)
+    yield model, address
+    server.stop()
+    thread.join(5)
+    assert not os.path.exists(address)
+
+
+def test_concurrent_clients_share_batches(served):
+    model, address = served
+    model.batches.clear()  # drop the warm-up call
+
+    def ask(i):
+        client = daemon.DaemonClient(address, timeout=5)
+        try:
+            summary = client.summarize_text(
+                f"Ship {i} sailed. It was cold.",
+                max_length=60,
+                min_length=5,
+                cache=False,
+            )
+            return summary, client.last_latency
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(ask, range(8)))
+
+    assert [summary for summary, _ in results] == [
+        f"Ship {i} sailed." for i in range(8)
+    ]
+    assert all(latency > 0 for _, latency in results)
+    assert sum(model.batches) == 8 and max(model.batches) > 1
+
+
+def test_client_is_a_drop_in_for_long_texts(served, monkeypatch):
+    model, address = served
+    client = daemon.DaemonClient(address, timeout=5)
+    text = " ".join(f"Sentence {i} is here." for i in range(300))
+    assert client.summarize_long_text(text, target_tokens_per_chunk=100, cache=False)
+    assert client.stats()["batches"] >= 1
+    with pytest.raises(daemon.DaemonError):
+        client.request("explode")
+    client.close()
+
+    # With no daemon listening, the module-level helpers summarize in-process
+    monkeypatch.setenv("SUMMARIZER_DAEMON", address + ".missing")
+    monkeypatch.setattr(daemon, "_client", None)
+    monkeypatch.setattr(daemon.local, "summarize_text", lambda text, **kwargs: "local")
+    assert daemon.summarize_text("The whale.") == "local"
+
+
+def test_module_helpers_accept_local_signatures(served, monkeypatch):
+    model, address = served
+    monkeypatch.setenv("SUMMARIZER_DAEMON", address)
+    monkeypatch.setattr(daemon, "_client", None)
+    text = " ".join(f"Sentence {i} is here." for i in range(100))
+
+    # Positional arguments, as with summarizer.summarize_long_text
+    before = model.batches[:]
+    assert daemon.summarize_long_text(text, None, None, 50, 4, False)
+    assert len(model.batches) > len(before)  # served by the daemon
+
+    # Objects that live in this process are summarized locally instead of serialized
+    calls = []
+    monkeypatch.setattr(
+        daemon.local,
+        "summarize_long_text",
+        lambda text, **kwargs: calls.append(kwargs) or "local",
+    )
+    tokenizer = chunking.RegexTokenizer()
+    assert daemon.summarize_long_text(text, tokenizer, cache=False) == "local"
+    assert calls[0]["tokenizer"] is tokenizer
+    with pytest.raises(ValueError, match="tokenizer"):
+        daemon.DaemonClient(address).summarize_long_text(text, tokenizer)
+    daemon._client.close()
@@ -0,0 +1,77 @@
+import sys
+import os
+import random
+
+import numpy as np
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import dedup  # type: ignore
+
+
+def _text(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def test_minhash_agreement_tracks_jaccard_similarity():
+    assert np.array_equal(
+        dedup.shingles("The Ship, sailed north -- at dawn!"),
+        dedup.shingles("the ship\nsailed north at dawn"),
+    )
+    assert len(dedup.shingles("too short")) == 0
+
+    base = dedup.shingles(_text(0))
+    rng = np.random.default_rng(0)
+    for keep in (1.0, 0.9, 0.6, 0.3, 0.0):
+        # Replace part of the set with fresh hashes to hit a known overlap
+        kept = rng.choice(base, size=int(len(base) * keep), replace=False)
+        other = np.unique(
+            np.concatenate(
+                [
+                    kept,
+                    rng.integers(1, 2**63, size=len(base) - len(kept), dtype=np.uint64),
+                ]
+            )
+        )
+        jaccard = len(np.intersect1d(base, other)) / len(np.union1d(base, other))
+        estimate = dedup.similarity(dedup.minhash(base), dedup.minhash(other))
+        assert abs(estimate - jaccard) < 0.15, (keep, jaccard, estimate)
+
+
+def test_lsh_query_finds_edited_copies_and_rejects_unrelated_chapters():
+    index = dedup.DedupIndex(threshold=0.5)
+    original = _text(1)
+    index.add("original", index.fingerprint(original))
+    index.add("unrelated", index.fingerprint(_text(2)))
+    assert len(index) == 2 and "original" in index
+
+    words = original.split()
+    words[100:103] = ["edited", "words", "here"]
+    # Re-wrapped too
+    edited = "\n".join(
+        " ".join(words[i : i + 12]) for i in range(0, len(words), 12)
+    ).upper()
+    matches = index.query(index.fingerprint(edited))
+    assert [key for key, _ in matches] == ["original"] and matches[0][1] > 0.8
+    assert index.query(index.fingerprint(_text(3))) == []
+    assert index.fingerprint("THE END") is None and index.query(None) == []
+
+
+def test_index_round_trips_through_npz(tmp_path):
+    path = str(tmp_path / "dedup.npz")
+    index = dedup.DedupIndex(path)
+    for i in range(100):  # more than the initial signature capacity
+        index.add(f"chapter{i}", index.fingerprint(_text(i)))
+    index.save()
+
+    loaded = dedup.DedupIndex(path)
+    assert loaded.keys == index.keys
+    assert np.array_equal(loaded.signature("chapter42"), index.signature("chapter42"))
+    assert loaded.query(loaded.fingerprint(_text(42)))[0] == ("chapter42", 1.0)
+    # An index built with other MinHash parameters is not trusted
+    assert len(dedup.DedupIndex(path, num_perm=64, bands=8)) == 0
@@ -0,0 +1,58 @@
+import sys
+import os
+
+import pytest
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import chunking  # type: ignore
+import evaluation  # type: ignore
+
+
+def test_rouge_scores():
+    assert evaluation.rouge("The whale swam.", "the whale swam") == {
+        "rouge1": 1.0,
+        "rouge2": 1.0,
+        "rougeL": 1.0,
+    }
+    assert evaluation.rouge("ice", "the whale") == {
+        "rouge1": 0.0,
+        "rouge2": 0.0,
+        "rougeL": 0.0,
+    }
+
+    scores = evaluation.rouge_n("the cat sat on the mat", "the cat lay on the mat", 1)
+    assert scores["precision"] == scores["recall"] == pytest.approx(5 / 6)
+    # LCS "the cat on the mat" (5) vs a 7-word reference
+    assert evaluation.rouge_l("the cat sat on the mat", "the cat did lie on the mat")[
+        "recall"
+    ] == pytest.approx(5 / 7)
+
+
+def test_compare_backends_reports_speed_and_overlap():
+    def full(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        return [{"summary_text": " ".join(t.split()[:6])} for t in texts]
+
+    def quantized(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        return [{"summary_text": " ".join(t.split()[:5])} for t in texts]
+
+    texts = [
+        f"Chapter {i} tells how the crew sailed north into the ice." for i in range(3)
+    ]
+    report = evaluation.compare_backends(
+        texts,
+        baseline=full,
+        candidates=[quantized],
+        tokenizer=chunking.RegexTokenizer(),
+    )
+
+    candidate = report["candidates"][0]
+    assert report["texts"] == 3 and len(candidate["outputs"]) == 3
+    assert candidate["backend"] == "quantized" and candidate["speedup"] > 0
+    assert 0.8 < candidate["rouge"]["rouge1"] < 1.0
+    assert candidate["latency"]["max"] >= candidate["latency"]["median"] >= 0
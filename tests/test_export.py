@@ -0,0 +1,96 @@
+import sys
+import os
+import csv
+import json
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import export  # type: ignore
+
+FORMATS = ("markdown", "jsonl", "html", "anki")
+
+
+def test_results_stream_in_chapter_order_to_every_format(tmp_path):
+    base = str(tmp_path / "book")
+    session = export.ExportSession(base, FORMATS, book_title="Moby Dick", chapters=3)
+    assert not os.path.exists(base + ".md")  # nothing written before the first result
+
+    session.add(1, "Two", "The whale appears.")
+    assert open(base + ".md").read() == ""  # waits for chapter one
+    session.add(0, "One", "Ishmael goes to sea.")
+    assert open(base + ".md").read().index("## One") < open(base + ".md").read().index(
+        "## Two"
+    )
+    session.add(2, "Three", "The ship <sinks> & all.")
+    outputs = session.finish()
+
+    assert sorted(outputs) == sorted(
+        base + ext for ext in (".md", ".jsonl", ".html", ".anki.csv")
+    )
+    assert not os.path.exists(base + ".journal.jsonl")
+    assert [json.loads(line)["index"] for line in open(base + ".jsonl")] == [0, 1, 2]
+    page = open(base + ".html").read()
+    assert page.endswith("</html>\n") and "&lt;sinks&gt; &amp; all" in page
+    rows = [
+        row
+        for row in csv.reader(open(base + ".anki.csv"))
+        if not row[0].startswith("#")
+    ]
+    assert rows[0] == [
+        "What happens in Moby Dick: One?",
+        "Ishmael goes to sea.",
+        "Moby_Dick",
+    ]
+    # One-shot writes produce the same documents
+    assert (
+        export.render([("One", "Ishmael goes to sea.")])
+        == "## One\n\nIshmael goes to sea.\n\n"
+    )
+
+
+def test_interrupted_session_resumes_from_the_journal(tmp_path):
+    base = str(tmp_path / "book")
+    first = export.ExportSession(base, ("markdown", "html"), chapters=3)
+    first.add(0, "One", "First.")
+    first.add(2, "Three", "Third.")
+    del first  # crash: no finish
+    with open(base + ".journal.jsonl", "a") as f:
+        f.write('{"index": 1, "title": "Tw')  # torn write
+
+    second = export.ExportSession(base, ("markdown", "html"), chapters=3)
+    assert sorted(second.completed) == [0, 2]
+    second.add(1, "Two", "Second.")
+    second.finish()
+    markdown = open(base + ".md").read()
+    assert markdown.count("## ") == 3 and markdown.index("First.") < markdown.index(
+        "Second."
+    ) < markdown.index("Third.")
+    assert open(base + ".html").read().count("</html>") == 1
+
+    # A journal for a different book layout is not trusted
+    export.ExportSession(base, ("markdown",), chapters=3).add(0, "One", "First.")
+    assert export.ExportSession(base, ("markdown",), chapters=5).completed == {}
+
+
+def test_resume_discards_summaries_of_edited_chapters(tmp_path):
+    base = str(tmp_path / "book")
+    first = export.ExportSession(base, ("markdown",), fingerprints=["a", "b", "c"])
+    first.add(0, "One", "Old first.")
+    first.add(1, "Two", "Old second.")
+    del first  # crash: no finish
+
+    # Chapter two was edited before the rerun; the chapter count is the same
+    second = export.ExportSession(base, ("markdown",), fingerprints=["a", "B", "c"])
+    assert sorted(second.completed) == [0]
+    second.add(1, "Two", "New second.")
+    second.add(2, "Three", "Third.")
+    second.finish()
+    markdown = open(base + ".md").read()
+    assert (
+        "Old first." in markdown
+        and "New second." in markdown
+        and "Old second." not in markdown
+    )
@@ -0,0 +1,58 @@
+import sys
+import os
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import extractive  # type: ignore
+
+
+def test_textrank_prefers_central_sentences():
+    sentences = [
+        "The whale swam in the cold sea.",
+        "The whale and the sea were cold and vast.",
+        "A cold sea hid the whale.",
+        "Breakfast was toast.",
+    ]
+    scores = extractive.rank_sentences(sentences)
+
+    assert scores.shape == (4,)
+    assert abs(float(scores.sum()) - 1.0) < 1e-4
+    assert scores.argmin() == 3  # shares no words with the rest
+
+
+def test_extract_summary_respects_budget_and_reading_order():
+    text = (
+        "Ahab hunted the white whale. The crew feared the white whale. "
+        "Lunch was served at noon. Ahab and the crew chased the whale for years."
+    )
+    summary = extractive.extract_summary(text, max_tokens=14)
+
+    assert extractive.count_tokens(summary) <= 14
+    assert "Lunch" not in summary
+    picked = [s for s in text.split(". ") if s.rstrip(".") in summary]
+    assert [text.index(s) for s in picked] == sorted(text.index(s) for s in picked)
+    assert extractive.extract_summary("Short text.", max_tokens=50) == "Short text."
+    assert (
+        extractive.count_tokens(extractive.extract_summary("word " * 40, max_tokens=5))
+        == 5
+    )
+
+
+def test_prefilter_keeps_central_sentences_in_order():
+    text = (
+        "Ahab hunted the white whale. Lunch was served at noon. The crew feared the white whale.\n\n"
+        "Ahab and the crew chased the whale for years. Someone coughed."
+    )
+    kept = extractive.prefilter(text, ratio=0.75)
+
+    assert extractive.count_tokens(kept) <= 0.75 * extractive.count_tokens(text) + 1
+    assert "Lunch" not in kept and "coughed" not in kept
+    assert kept.index("Ahab hunted") < kept.index("chased")
+    assert extractive.prefilter(text, ratio=1.0) is text
+    assert (
+        extractive.prefilter("Too short. To filter.", ratio=0.1)
+        == "Too short. To filter."
+    )
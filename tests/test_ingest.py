@@ -29,3 +29,105 @@ def test_clean_gutenberg_text_returns_full_when_no_markers():
     raw_text = "This is a short story without any Gutenberg markers."
     cleaned = ingest.clean_gutenberg_text(raw_text)
     assert cleaned == raw_text
+
+
+def test_iter_clean_book_matches_clean_gutenberg_text(tmp_path):
+    raw = (
+        "Header junk\r\n"
+        "*** START OF THE PROJECT GUTENBERG EBOOK CAFÉ ***\r\n\r\n"
+        "CONTENTS\r\nCHAPTER 1. The Start\r\n\r\n"
+        "CHAPTER 1. The Start\r\nIt was a dark night — “très” dark.\r\n\r\n"
+        "CHAPTER 2. The End\r\nFin.\r\n\r\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK CAFÉ ***\r\n"
+        "Footer junk"
+    )
+    test_file = tmp_path / "book.txt"
+    test_file.write_bytes(raw.encode("utf-8"))
+
+    expected = ingest.clean_gutenberg_text(ingest.load_book(str(test_file)))
+    for window_size in (3, 7, 64, 1 << 20):
+        assert (
+            "".join(ingest.iter_clean_book(str(test_file), window_size=window_size))
+            == expected
+        )
+
+
+def test_iter_clean_book_without_markers(tmp_path):
+    test_file = tmp_path / "plain.txt"
+    test_file.write_text("\n  Just a short story.\n\n")
+    assert "".join(ingest.iter_clean_book(str(test_file))) == "Just a short story."
+
+
+def test_load_book_reads_compressed_and_legacy_encodings(tmp_path):
+    import bz2, gzip, zipfile
+
+    text = (
+        "Title: Café Society\nCharacter set encoding: ISO-8859-1\n\n"
+        "*** START OF THE PROJECT GUTENBERG EBOOK CAFÉ ***\n\n"
+        "CHAPTER 1. Début\n“Naïve,” she said.\n\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK CAFÉ ***\n"
+    )
+    legacy = text.encode("cp1252")
+    (tmp_path / "cafe.txt").write_bytes(legacy.replace(b"\n", b"\r\n"))
+    (tmp_path / "cafe.txt.gz").write_bytes(gzip.compress(legacy))
+    (tmp_path / "cafe.txt.bz2").write_bytes(bz2.compress(text.encode("utf-8")))
+    with zipfile.ZipFile(tmp_path / "cafe.zip", "w") as archive:
+        archive.writestr("README", "not the book")
+        archive.writestr("cafe/cafe.txt", legacy)
+
+    for name in ("cafe.txt", "cafe.txt.gz", "cafe.txt.bz2", "cafe.zip"):
+        path = str(tmp_path / name)
+        assert ingest.load_book(path) == text, name
+        assert (
+            "".join(ingest.iter_clean_book(path, window_size=5))
+            == "CHAPTER 1. Début\n“Naïve,” she said."
+        )
+        assert ingest.book_stem(path) == "cafe"
+
+
+def test_detect_encoding():
+    assert ingest.detect_encoding("naïve".encode("utf-8")) == "utf-8"
+    # Cut mid-character
+    assert ingest.detect_encoding("naïve".encode("utf-8")[:3]) == "utf-8"
+    assert ingest.detect_encoding("“naïve”".encode("cp1252")) == "cp1252"
+    assert (
+        ingest.detect_encoding(b"Character set encoding: ISO-8859-1\r\nplain ascii")
+        == "cp1252"
+    )
+    assert ingest.detect_encoding(b"\xef\xbb\xbfx") == "utf-8-sig"
+    # A UTF-8 book with a stray Windows-1252 byte still loads
+    assert (b"caf\xc3\xa9 \x93quoted\x94").decode(
+        "utf-8", "book-fallback"
+    ) == "café “quoted”"
+
+
+def test_strip_gutenberg_marker_variants():
+    modern = (
+        "Header\n*** START OF THE PROJECT GUTENBERG EBOOK A VERY\nLONG TITLE ***\n\n"
+        "Preface.\n\nCHAPTER 1. Begin\nText *** with stars.\n\n"
+        "End of the Project Gutenberg EBook of A Very Long Title\n\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK A VERY LONG TITLE ***\nLicense"
+    )
+    body = ingest.strip_gutenberg(modern)
+    assert body.text == "CHAPTER 1. Begin\nText *** with stars."
+    assert (body.header, body.footer, body.chapter_one) == (
+        "start",
+        "end-of-ebook",
+        True,
+    )
+    assert modern[body.start : body.end] == body.text
+
+    old = (
+        "**The Project Gutenberg Etext of Old Tales**\nSmall print...\n"
+        "*END*THE SMALL PRINT! FOR PUBLIC DOMAIN ETEXTS*Ver.04.29.93*END*\r\n\r\n"
+        "Once upon a time.\r\n\r\n*END OF THE PROJECT GUTENBERG ETEXT OF OLD TALES*\r\n"
+    )
+    body = ingest.strip_gutenberg(old)
+    assert body.text == "Once upon a time."
+    assert body.rule == "small-print/end"
+    assert ingest.find_gutenberg_body(old.encode("ascii")) == (body.start, body.end)
+
+    # A missing END marker keeps the rest of the text instead of giving up on both markers
+    truncated = "*** START OF THIS PROJECT GUTENBERG EBOOK X ***\nAll of it.\n"
+    assert ingest.strip_gutenberg(truncated).rule == "start/no-footer"
+    assert ingest.clean_gutenberg_text(truncated) == "All of it."
@@ -0,0 +1,202 @@
+import sys
+import os
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import manifest  # type: ignore
+from chunking import RegexTokenizer  # type: ignore
+from summarizer import SummaryNode, SummaryTree  # type: ignore
+
+
+def _tree(summary):
+    return SummaryTree(
+        levels=[[SummaryNode(text=summary, level=0, token_count=len(summary.split()))]]
+    )
+
+
+def _book(chapter_two):
+    return (
+        "*** START OF THE PROJECT GUTENBERG EBOOK X ***\n"
+        "Chapter 1. One\nThe ship left port.\n"
+        f"Chapter 2. Two\n{chapter_two}\n"
+        "Chapter 3. Three\nThe ice closed in.\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK X ***\n"
+    )
+
+
+def test_refresh_only_resummarizes_changed_chapters(tmp_path, monkeypatch):
+    seen = []
+
+    def fake_summarize(text, summarizer=None):
+        seen.append(text)
+        return f"summary of {text.split()[-1]}"
+
+    monkeypatch.setattr(
+        manifest, "summarize_tree", lambda *a, **k: _tree(fake_summarize(*a, **k))
+    )
+    book = tmp_path / "book.txt"
+    output = str(tmp_path / "book.md")
+    path = str(tmp_path / "manifest.json")
+    book.write_text(_book("A storm rose."))
+
+    first = manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=lambda *a, **k: None
+    )
+    assert (first["summarized"], first["reused"]) == (3, 0)
+
+    # Same file: nothing is summarized; a missing output is rebuilt from the manifest
+    os.remove(output)
+    again = manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=lambda *a, **k: None
+    )
+    assert again["unchanged"] and len(seen) == 3
+    assert "summary of rose." in open(output).read()
+
+    book.write_text(_book("A storm rose and the mast broke."))
+    changed = manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=lambda *a, **k: None
+    )
+    assert (changed["summarized"], changed["reused"]) == (1, 2)
+    assert seen[-1].endswith("broke.")
+    entry = manifest.Manifest(path).get(str(book))
+    assert entry["structure"] == "chapter_number"
+    assert [ch["summary"] for ch in entry["chapters"]][1] == "summary of broke."
+
+
+def test_a_chapter_with_a_failed_chunk_is_counted_as_failed_and_retried(tmp_path):
+    calls = []
+
+    def flaky_model(texts, **kwargs):
+        texts = [texts] if isinstance(texts, str) else texts
+        calls.extend(texts)
+        if any("storm" in t for t in texts):
+            raise RuntimeError("out of memory")
+        return [{"summary_text": "summary"} for _ in texts]
+
+    flaky_model.tokenizer = RegexTokenizer()
+    book = tmp_path / "book.txt"
+    book.write_text(_book("A storm rose."))
+    path, output = str(tmp_path / "manifest.json"), str(tmp_path / "book.md")
+
+    first = manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=flaky_model
+    )
+    assert (first["summarized"], first["failed"]) == (2, 1)
+    assert [ch["summary"] for ch in manifest.Manifest(path).get(str(book))["chapters"]][
+        1
+    ] is None
+
+    before = len(calls)
+    second = manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=flaky_model
+    )
+    assert not second["unchanged"] and (second["reused"], second["failed"]) == (2, 1)
+    assert any("storm" in t for t in calls[before:])
+
+
+def test_books_with_the_same_name_get_their_own_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        manifest,
+        "summarize_tree",
+        lambda text, **k: _tree(f"summary of {text.split()[-1]}"),
+    )
+    books = tmp_path / "books"
+    (books / "sub").mkdir(parents=True)
+    (books / "a.txt").write_text(_book("A storm rose."))
+    (books / "sub" / "a.txt").write_text(_book("A calm sea."))
+
+    manifest.refresh_corpus(
+        str(books),
+        str(tmp_path / "manifest.json"),
+        str(tmp_path / "out"),
+        summarizer=lambda *a, **k: None,
+    )
+
+    assert "rose." in (tmp_path / "out" / "a.md").read_text()
+    assert "sea." in (tmp_path / "out" / "sub" / "a.md").read_text()
+
+
+def test_generation_options_are_part_of_the_reuse_key(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_summarize(text, summarizer=None, **options):
+        calls.append(options)
+        return _tree("summary")
+
+    monkeypatch.setattr(manifest, "summarize_tree", fake_summarize)
+    book = tmp_path / "book.txt"
+    book.write_text(_book("A storm rose."))
+    path, output = str(tmp_path / "manifest.json"), str(tmp_path / "book.md")
+    manifest.refresh_book(
+        str(book), manifest.Manifest(path), output, summarizer=lambda *a, **k: None
+    )
+
+    # Other generation options: nothing recorded is reused, even for an unchanged file
+    options = {"target_tokens_per_chunk": 200}
+    second = manifest.refresh_book(
+        str(book),
+        manifest.Manifest(path),
+        output,
+        summarizer=lambda *a, **k: None,
+        generation=options,
+    )
+    assert (second["summarized"], second["reused"], second["failed"]) == (3, 0, 0)
+    assert calls[-1] == options
+    third = manifest.refresh_book(
+        str(book),
+        manifest.Manifest(path),
+        output,
+        summarizer=lambda *a, **k: None,
+        generation=options,
+    )
+    assert third["unchanged"]
+
+
+def test_near_duplicate_chapters_reuse_summaries_across_editions(tmp_path, monkeypatch):
+    seen = []
+
+    def fake_summarize(text, summarizer=None):
+        seen.append(text)
+        return f"summary {len(seen)}"
+
+    monkeypatch.setattr(
+        manifest, "summarize_tree", lambda *a, **k: _tree(fake_summarize(*a, **k))
+    )
+    voyage = " ".join(
+        f"the crew sailed past island {i} and counted {i * 7} gulls before dusk."
+        for i in range(40)
+    )
+    chapter_two = "A storm rose."
+    (tmp_path / "books").mkdir()
+    (tmp_path / "books" / "a.txt").write_text(
+        _book("A calm sea.").replace("The ship left port.", voyage)
+    )
+    # Another edition: re-wrapped, different punctuation and one changed sentence
+    edition = (
+        voyage.replace(" gulls", "\nGulls")
+        .replace(". ", "; ")
+        .replace("island 3 ", "islet 3 ")
+    )
+    (tmp_path / "books" / "b.txt").write_text(
+        _book(chapter_two).replace("The ship left port.", edition)
+    )
+
+    results = manifest.refresh_corpus(
+        str(tmp_path / "books"),
+        str(tmp_path / "manifest.json"),
+        str(tmp_path / "out"),
+        summarizer=lambda *a, **k: None,
+        dedup_path=str(tmp_path / "dedup.npz"),
+        dedup_threshold=0.5,
+    )
+    # b: chapter 1 is a near duplicate, chapter 3 an exact one; chapter 2 is new (and too short to fingerprint)
+    assert (results[0]["summarized"], results[0]["deduplicated"]) == (3, 0)
+    assert (results[1]["summarized"], results[1]["deduplicated"]) == (1, 2)
+    entry = manifest.Manifest(str(tmp_path / "manifest.json")).get(
+        str(tmp_path / "books" / "b.txt")
+    )
+    assert entry["chapters"][0]["summary"] == "summary 1"
+    assert os.path.exists(tmp_path / "dedup.npz")
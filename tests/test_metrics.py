@@ -0,0 +1,58 @@
+import sys
+import os
+import json
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import chunking  # type: ignore
+import metrics  # type: ignore
+import summarizer  # type: ignore
+
+
+def _fake_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+    texts = [texts] if isinstance(texts, str) else texts
+    return [{"summary_text": " ".join(t.split()[:5])} for t in texts]
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.disable()
+    metrics.reset()
+    chunking.chunk_text("One. Two. Three.", chunking.RegexTokenizer(), max_tokens=2)
+    metrics.record("summarize", 1.0)
+    assert metrics.snapshot()["stages"] == {}
+
+
+def test_stages_tokens_and_batches_are_exported(tmp_path):
+    metrics.reset()
+    metrics.enable()
+    try:
+        text = " ".join(f"Sentence {i} is here." for i in range(200))
+        summarizer.summarize_tree(
+            text,
+            tokenizer=chunking.RegexTokenizer(),
+            summarizer=_fake_pipeline,
+            target_tokens_per_chunk=100,
+            cache=False,
+        )
+        summarizer.save_summaries([("One", "A summary.")], str(tmp_path / "out.md"))
+        metrics.write_json(str(tmp_path / "metrics.json"))
+        metrics.write_prometheus(str(tmp_path / "metrics.prom"))
+    finally:
+        metrics.disable()
+
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    chunk, summarize = data["stages"]["chunk"], data["stages"]["summarize"]
+    assert (
+        chunk["calls"] == 1 and chunk["input_tokens"] == 1000 and chunk["items"] == 10
+    )
+    assert summarize["input_tokens"] >= 1000 and summarize["output_tokens"] > 0
+    assert summarize["tokens_per_second"] > 0 and summarize["mean_batch_size"] > 1
+    assert data["stages"]["write"]["calls"] == 1
+
+    prom = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE book_ingestor_stage_seconds_total counter" in prom
+    assert 'book_ingestor_stage_calls_total{stage="write"} 1' in prom
+    assert 'book_ingestor_batch_size_bucket{stage="summarize",le="+Inf"}' in prom
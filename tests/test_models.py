@@ -0,0 +1,90 @@
+import sys
+import os
+
+import pytest
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import models  # type: ignore
+
+
+def test_summarizer_is_loaded_once_and_shared(monkeypatch):
+    loads = []
+    monkeypatch.setattr(models, "_load_tokenizer", lambda name: f"tok:{name}")
+    monkeypatch.setattr(
+        models,
+        "_load_summarizer",
+        lambda name, device, dtype, tokenizer: loads.append((name, device, dtype))
+        or object(),
+    )
+    models.unload()
+
+    first = models.get_summarizer("some/model")
+    second = models.get_summarizer("some/model")
+    other_dtype = models.get_summarizer("some/model", dtype="bfloat16")
+
+    assert first is second
+    assert other_dtype is not first
+    assert loads == [("some/model", None, None), ("some/model", None, "bfloat16")]
+    assert models.get_tokenizer("some/model") == "tok:some/model"
+
+    models.unload("some/model")
+    assert models.loaded_models() == []
+
+
+def test_quantized_models_are_separate_registry_entries(monkeypatch):
+    import backends  # type: ignore
+
+    monkeypatch.setattr(models, "_load_tokenizer", lambda name: f"tok:{name}")
+    monkeypatch.setattr(
+        models,
+        "_load_summarizer",
+        lambda name, device, dtype, tokenizer: {"name": name},
+    )
+    monkeypatch.setattr(
+        models,
+        "_quantize",
+        lambda summarizer, mode: dict(summarizer, quantization=mode),
+    )
+    models.unload()
+
+    full = models.get_summarizer("some/model")
+    int8 = models.get_summarizer("some/model", quantization="int8")
+    assert (
+        int8 == {"name": "some/model", "quantization": "int8"}
+        and "quantization" not in full
+    )
+    assert models.get_summarizer("some/model", quantization="int8") is int8
+    assert ("some/model", None, None, "int8") in models.loaded_models()
+    with pytest.raises(ValueError):
+        models.get_summarizer("some/model", device="cuda", quantization="int8")
+
+    # Quantized backends keep their summaries apart in the cache
+    monkeypatch.setenv("SUMMARIZER_QUANTIZATION", "bf16")
+    assert backends.BartBackend().model_name == models.DEFAULT_MODEL + "@bf16"
+    assert (
+        backends.model_name(backends.BartBackend(quantization="int8"))
+        == models.DEFAULT_MODEL + "@int8"
+    )
+    models.unload()
+
+
+def test_summarizer_module_uses_registered_pipeline():
+    import summarizer  # type: ignore
+
+    calls = []
+
+    def fake_pipeline(prompt, **kwargs):
+        calls.append(prompt)
+        return [{"summary_text": "A whale."}]
+
+    models.register(summarizer=fake_pipeline)
+    try:
+        assert summarizer.summarize_text("The whale is a mammal.") == "A whale."
+        assert summarizer.summarizer_pipeline is fake_pipeline
+        assert "The whale is a mammal." in calls[0]
+    finally:
+        models.unload()
@@ -0,0 +1,83 @@
+import sys
+import os
+
+import numpy as np
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import search_index  # type: ignore
+
+MOBY = [
+    {
+        "title": "Loomings",
+        "content": "Call me Ishmael. The white whale swam on. Ahab hunted the white whale.",
+    },
+    {
+        "title": "The Chart",
+        "content": "The whale was white and old. Naïve café talk of the whale!",
+    },
+]
+
+
+def test_vbyte_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2**32 + 5], dtype=np.uint64)
+    stream, lengths = search_index._vbyte_encode(values)
+    assert lengths.tolist() == [1, 1, 1, 2, 2, 2, 3, 5]
+    assert search_index._vbyte_decode(stream).tolist() == values.tolist()
+
+
+def test_phrase_proximity_and_snippets(tmp_path):
+    index = search_index.SearchIndex(str(tmp_path / "idx"))
+    index.add_book("moby", MOBY)
+    index.add_book("other", [{"title": "One", "content": "A whale. White sails."}])
+    index.commit()
+
+    hits = index.search('"white whale"')
+    assert [(h.book, h.chapter, h.hits) for h in hits] == [("moby", 0, 2)]
+    assert MOBY[0]["content"][hits[0].offset :].startswith("white whale")
+    assert "white whale" in hits[0].snippet
+
+    near = index.search('"whale white"~3')
+    assert [(h.book, h.chapter) for h in near] == [
+        ("moby", 0),
+        ("moby", 1),
+        ("other", 0),
+    ]
+    cafe = index.search("café ahab")
+    assert cafe == []
+    cafe = index.search("café")[0]
+    assert MOBY[1]["content"][cafe.offset :].startswith("café")
+    index.close()
+
+
+def test_books_are_added_incrementally_and_replaced(tmp_path):
+    path = str(tmp_path / "idx")
+    index = search_index.SearchIndex(path)
+    index.add_book("moby", MOBY, fingerprint="v1")
+    index.commit()
+    index.add_book("other", [{"title": "One", "content": "Ice and fog."}])
+    index.commit()
+    assert len(index.meta["segments"]) == 2
+
+    reopened = search_index.SearchIndex(path)
+    assert reopened.fingerprint("moby") == "v1"
+    reopened.add_book(
+        "moby",
+        [{"title": "Loomings", "content": "Rewritten chapter about fog."}],
+        fingerprint="v2",
+    )
+    reopened.commit()
+    assert reopened.search("ishmael") == []
+    assert {h.book for h in reopened.search("fog")} == {"moby", "other"}
+
+    reopened.compact()
+    assert len(reopened.meta["segments"]) == 1
+    assert {h.book for h in reopened.search("fog")} == {"moby", "other"}
+    assert sorted(os.listdir(path)) == [
+        "index.json",
+        reopened.meta["segments"][0]["name"],
+    ]
+    reopened.close()
@@ -0,0 +1,62 @@
+import sys
+import os
+
+import numpy as np
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import sentiment  # type: ignore
+
+
+def test_scores_follow_the_lexicon_and_negation():
+    scores = sentiment.score_tokens("We were happy. We were not happy. Terror!")
+    valence = scores[:, sentiment.DIMENSIONS.index("valence")]
+    fear = scores[:, sentiment.DIMENSIONS.index("fear")]
+
+    assert scores.shape == (8, len(sentiment.DIMENSIONS))
+    assert valence[2] == 1.0 and valence[6] == -1.0  # "happy", then "not happy"
+    assert fear[7] == 1.0 and valence[7] == -1.0
+
+
+def test_timeline_arcs_and_round_trip(tmp_path):
+    chapters = [
+        {"title": "Joy", "content": "happy glad delight laugh " * 50},
+        {"title": "Grief", "content": "sorrow grief tears despair " * 50},
+        {"title": "Empty", "content": ""},
+    ]
+    timeline = sentiment.build_timeline(
+        chapters, window=20, chapter_resolution=5, book_resolution=10
+    )
+
+    assert timeline.chapter_arcs.shape == (3, 5, len(sentiment.DIMENSIONS))
+    assert timeline.token_counts.tolist() == [200, 200, 0]
+    arc = timeline.arc("valence")
+    assert arc[0] > 0 > arc[-1]  # the book darkens
+    assert timeline.chapter_means[1, sentiment.DIMENSIONS.index("sadness")] == 1.0
+
+    path = str(tmp_path / "book.npz")
+    sentiment.save_timeline(timeline, path)
+    loaded = sentiment.load_timeline(path)
+    assert loaded.titles == ["Joy", "Grief", "Empty"]
+    assert loaded.dimensions == timeline.dimensions
+    assert np.array_equal(loaded.book_arc, timeline.book_arc)
+
+
+def test_books_with_the_same_name_get_their_own_timelines(tmp_path):
+    book = "*** START OF THE PROJECT GUTENBERG EBOOK X ***\nChapter 1. One\n{}\n*** END OF THE PROJECT GUTENBERG EBOOK X ***\n"
+    (tmp_path / "books" / "sub").mkdir(parents=True)
+    (tmp_path / "books" / "a.txt").write_text(book.format("happy glad"))
+    (tmp_path / "books" / "sub" / "a.txt").write_text(book.format("sorrow grief"))
+
+    records = sentiment.score_corpus(
+        str(tmp_path / "books"), str(tmp_path / "out"), workers=1
+    )
+
+    assert [r["status"] for r in records] == ["ok", "ok"]
+    happy = sentiment.load_timeline(str(tmp_path / "out" / "a.npz"))
+    sad = sentiment.load_timeline(str(tmp_path / "out" / "sub" / "a.npz"))
+    valence = sentiment.DIMENSIONS.index("valence")
+    assert happy.chapter_means[0, valence] > 0 > sad.chapter_means[0, valence]
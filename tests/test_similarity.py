@@ -0,0 +1,128 @@
+import sys
+import os
+
+import numpy as np
+
+# Dynamically add the src directory to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+import similarity  # type: ignore
+
+TOPICS = {
+    "sea": "whale harpoon ship sail ocean captain crew storm wave deck mast",
+    "ice": "glacier frost snow sledge polar cold ice floe blizzard tundra",
+    "court": "judge trial jury verdict lawyer witness court appeal sentence",
+}
+
+
+def _chapter(topic: str, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    words = (
+        rng.choice(TOPICS[topic].split(), 200).tolist()
+        + rng.choice(["the", "and", "of", "a"], 100).tolist()
+    )
+    return {
+        "title": f"{topic} {seed}",
+        "content": " ".join(rng.permutation(words).tolist()),
+    }
+
+
+def test_similar_chapters_persist_and_books_can_be_replaced(tmp_path):
+    path = str(tmp_path / "vec")
+    index = similarity.SimilarityIndex(path)
+    index.add_book(
+        "one",
+        [_chapter("sea", 1), _chapter("ice", 2), _chapter("court", 3)],
+        fingerprint="v1",
+    )
+    index.add_book(
+        "two", [_chapter("court", 4), _chapter("sea", 5), _chapter("ice", 6)]
+    )
+    assert index.commit() == 6
+
+    hits = index.similar("one", 0, k=2)
+    assert hits[0].title == "sea 5" and hits[0].score > 0.8 > hits[1].score
+    assert [h.title for h in index.similar("one", 1, k=1, other_books=True)] == [
+        "ice 6"
+    ]
+    assert index.query("a blizzard on the polar floe", k=1)[0].title in (
+        "ice 2",
+        "ice 6",
+    )
+
+    reopened = similarity.SimilarityIndex(path)
+    assert len(reopened) == 6 and reopened.fingerprint("one") == "v1"
+    assert np.allclose(reopened.vector("two", 1), index.vector("two", 1))
+    assert reopened._vectors.dtype == np.float16
+
+    # Re-adding a book hides its old rows; more rows than live ones are never invented
+    reopened.add_book("two", [_chapter("court", 7)], fingerprint="v2")
+    reopened.commit()
+    titles = [h.title for h in reopened.similar("one", 0, k=10)]
+    assert "sea 5" not in titles and len(titles) == 3
+    assert reopened.similar("one", 2, k=1)[0].title == "court 7"
+
+    # ...and stops counting towards the document frequencies, which move with index.json
+    live = [
+        _chapter("sea", 1),
+        _chapter("ice", 2),
+        _chapter("court", 3),
+        _chapter("court", 7),
+    ]
+    expected = np.zeros(similarity.HASH_BUCKETS, dtype=np.int32)
+    for chapter in live:
+        expected[
+            np.unique(
+                similarity.term_hashes(chapter["content"])[0] % similarity.HASH_BUCKETS
+            )
+        ] += 1
+    assert (
+        reopened.meta["documents"] == 4
+        and (reopened._document_frequencies() == expected).all()
+    )
+    assert [name for name in os.listdir(path) if name.startswith("df.")] == [
+        reopened.meta["df"]
+    ]
+
+
+def test_similar_cli_reports_a_missing_chapter(tmp_path, capsys):
+    index = similarity.SimilarityIndex(str(tmp_path / "vec"))
+    index.add_book("one", [_chapter("sea", 1)])
+    index.commit()
+
+    assert similarity.main(["similar", str(tmp_path / "vec"), "one", "5"]) == 1
+    assert "one has no chapter 5" in capsys.readouterr().out
+
+
+def test_clustered_search_matches_exact_and_assigns_appends(tmp_path):
+    index = similarity.SimilarityIndex(str(tmp_path / "vec"))
+    topics = list(TOPICS)
+    index.add_book("lib", [_chapter(topics[i % 3], i) for i in range(30)])
+    index.commit()
+    assert index.train(clusters=3, seed=1) == 3
+
+    queries = np.stack([index.vector("lib", i) for i in range(3)])
+    exact_rows, exact_scores = index.search_vectors(queries, k=5, nprobe=0)
+    rows, scores = index.search_vectors(queries, k=5, nprobe=1)
+    assert (rows[:, 0] == [0, 1, 2]).all() and (np.diff(scores, axis=1) <= 0).all()
+    full = np.asarray(index._vectors, dtype=np.float32)
+    assert np.allclose(
+        scores, np.take_along_axis(queries @ full.T, rows, axis=1), atol=1e-3
+    )
+    every_rows, _ = index.search_vectors(queries, k=5, nprobe=3)
+    assert (every_rows == exact_rows).all()
+
+    # A crashed commit's tail is cut off; appended chapters land in clusters too
+    with open(os.path.join(index.directory, "vectors.f16"), "ab") as f:
+        f.write(b"\x00" * 100)
+    index.add_book("more", [_chapter("ice", 99)])
+    index.commit()
+    assert (
+        os.path.getsize(os.path.join(index.directory, "vectors.f16"))
+        == 31 * similarity.DIM * 2
+    )
+    assert index.similar("more", 0, k=1, nprobe=1)[0].title.startswith("ice")
+    rows, _ = index.search_vectors(queries[:1], k=40, nprobe=0)
+    assert (rows[0, 31:] == -1).all()
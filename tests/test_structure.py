@@ -19,3 +19,58 @@ def test_split_into_chapters_detects_multiple():
     assert chapters[0][0].lower().startswith("chapter 1")
     assert "ishmael" in chapters[0][1].lower()
     assert "some years ago" in chapters[1][1].lower()
+
+
+def test_split_into_chapters_skips_repeated_headings():
+    sample_text = (
+        "I. The Ship\nWe set sail at dawn.\n"
+        "II. The Storm\nThe sky darkened.\n"
+        "I. The Ship\nThe mast split.\n"
+    )
+
+    structure_type, chapters = structure.detect_and_split(sample_text)
+
+    assert structure_type == "roman_numeral"
+    assert [ch["title"] for ch in chapters] == ["The Ship", "The Storm"]
+    assert chapters[1]["content"] == "The sky darkened.\nThe mast split."
+
+
+def test_split_into_chapters_multi_tier_parts():
+    sample_text = (
+        "PART I\n\nChapter 1. Arrival\nThe coach stopped.\n"
+        "Chapter 2. Dinner\nSoup was served.\n\n"
+        "PART II\nChapter 3. Departure\nWe left at noon.\n"
+    )
+
+    chapters = structure.split_into_chapters(sample_text)
+
+    assert [(ch["part"], ch["title"]) for ch in chapters] == [
+        ("PART I", "Arrival"),
+        ("PART I", "Dinner"),
+        ("PART II", "Departure"),
+    ]
+    assert chapters[1]["content"] == "Soup was served."
+
+
+def test_chapters_are_spans_over_the_shared_text():
+    sample_text = "Letter 1\nDear sister,\n\nLetter 2\nStill at sea.\n"
+
+    chapters = structure.split_into_chapters(sample_text)
+
+    first = chapters[0]
+    assert first.buffer is sample_text
+    assert sample_text[first.start : first.end] == "Dear sister,"
+    assert first == {"title": "Letter 1", "content": "Dear sister,"}
+    assert dict(first.items()) == {"title": "Letter 1", "content": "Dear sister,"}
+    assert "part" not in first
+
+    first["summary"] = "A letter."
+    assert first["summary"] == "A letter."
+
+    byte_chapters = structure.split_into_chapters(sample_text.encode("utf-8"))
+    assert bytes(byte_chapters[1].view()) == b"Still at sea."
+    assert byte_chapters[1]["content"] == "Still at sea."
+
+    legacy = "Letter 1\nCher frère,\n\nLetter 2\nÀ bientôt.\n".encode("cp1252")
+    legacy_chapters = structure.split_into_chapters(legacy, encoding="cp1252")
+    assert legacy_chapters[1]["content"] == "À bientôt."
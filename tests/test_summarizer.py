@@ -4,7 +4,9 @@ import os
 # Dynamically add the src directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
 
-import summarizer # type: ignore
+import chunking  # type: ignore
+import summarizer  # type: ignore
+
 
 def test_summarize_text_short_sample():
     text = (
@@ -16,3 +18,118 @@ def test_summarize_text_short_sample():
     result = summarizer.summarize_text(text)
     assert isinstance(result, str)
     assert len(result) > 20
+
+
+def test_summarize_chunks_batches_and_keeps_order():
+    batches = []
+
+    def fake_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        if isinstance(texts, str):
+            texts = [texts]
+        if "bad" in texts:
+            raise RuntimeError("boom")
+        batches.append(len(texts))
+        return [{"summary_text": t.upper()} for t in texts]
+
+    chunks = ["a", "bb", "bad", "cccc", "d"]
+    counts = [300, 310, 305, 600, 290]
+    results = summarizer.summarize_chunks(
+        chunks, counts, summarizer=fake_pipeline, batch_size=2
+    )
+
+    assert results == ["A", "BB", None, "CCCC", "D"]
+    # "cccc" is too long to share a batch; the batch holding "bad" was retried item by item
+    assert batches == [1, 1, 2]
+
+
+def test_summarize_tree_covers_every_token_and_reduces_in_levels():
+    seen = []
+
+    def fake_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        seen.extend(texts)
+        # Keep the first max_length words, like a compressive summary would
+        return [{"summary_text": " ".join(t.split()[:max_length])} for t in texts]
+
+    text = " ".join(f"w{i}" for i in range(4010))
+    tree = summarizer.summarize_tree(
+        text,
+        tokenizer=chunking.RegexTokenizer(),
+        summarizer=fake_pipeline,
+        target_tokens_per_chunk=400,
+        cache=False,
+    )
+
+    leaves = tree.levels[0]
+    assert len(leaves) == 11
+    assert " ".join(node.source for node in leaves) == text  # no tail tokens dropped
+    assert len(tree.levels) >= 3
+    assert all(len(node.children) <= 4 for level in tree.levels[1:] for node in level)
+    assert sum(node.token_count for node in tree.top) < 512 or len(tree.top) == 1
+    assert tree.summary
+
+
+def test_summarize_tree_prefilter_halves_model_input():
+    seen = []
+
+    def fake_pipeline(texts, max_length, min_length, do_sample, batch_size=1):
+        texts = [texts] if isinstance(texts, str) else texts
+        seen.extend(texts)
+        return [{"summary_text": t.split(".")[0] + "."} for t in texts]
+
+    topics = ["whale", "ship", "storm", "harpoon"]
+    text = " ".join(
+        (
+            f"The {topics[i % 4]} and the {topics[(i + 1) % 4]} filled the captain's thoughts that morning."
+            if i % 3
+            else f"Hm, {i}, he said."
+        )
+        for i in range(120)
+    )
+    tokenizer = chunking.RegexTokenizer()
+    full = summarizer.summarize_tree(
+        text, tokenizer=tokenizer, summarizer=fake_pipeline, cache=False
+    )
+    full_input = sum(len(tokenizer(t)["input_ids"]) for t in seen)
+    assert full.tokens_saved == 0 and full.input_tokens == full_input
+
+    seen.clear()
+    tree = summarizer.summarize_tree(
+        text,
+        tokenizer=tokenizer,
+        summarizer=fake_pipeline,
+        cache=False,
+        prefilter_ratio=0.5,
+    )
+    leaves = seen[: len(tree.levels[0])]
+    assert tree.input_tokens == full.input_tokens
+    assert tree.tokens_saved == tree.input_tokens - sum(
+        len(tokenizer(t)["input_ids"]) for t in leaves
+    )
+    assert 0.4 < tree.tokens_saved / tree.input_tokens <= 0.55
+    # Most of the 40 filler lines go first
+    assert sum(t.count("he said") for t in leaves) < 10
+    # Leaves still point at the full chunks
+    assert " ".join(node.source for node in tree.levels[0]) == text
+
+    capped = summarizer.summarize_tree(
+        text,
+        tokenizer=tokenizer,
+        summarizer=fake_pipeline,
+        cache=False,
+        prefilter_max_tokens=100,
+    )
+    assert all(node.token_count <= 100 for node in capped.levels[0])
+
+
+def test_prefilter_cap_holds_for_short_chunks_of_long_sentences():
+    tokenizer = chunking.RegexTokenizer()
+    long_sentence = "The whale " + " ".join(["swam"] * 40) + " far away."
+    text = f"{long_sentence} The ship " + " ".join(["sailed"] * 40) + " home."
+
+    texts, counts = summarizer.prefilter_chunks(
+        [text], [len(tokenizer(text)["input_ids"])], tokenizer, max_tokens=12
+    )
+
+    assert counts == [12] == [len(tokenizer(texts[0])["input_ids"])]
+    assert texts[0].startswith(("The whale swam", "The ship sailed"))